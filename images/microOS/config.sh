@@ -176,6 +176,7 @@ fi
 if [[ "$kiwi_profiles" == *"Ceph"* ]]; then
   pip install fastapi uvicorn
   baseInsertService aquarium
+  baseInsertService aquarium-cephadm-helper
 fi
 
 # Not compatible with set -e
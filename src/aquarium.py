@@ -33,6 +33,8 @@ from gravel.api import orch
 from gravel.api import status
 from gravel.api import services
 from gravel.api import nodes
+from gravel.api import jobs
+from gravel.api import storage
 
 
 logger: logging.Logger = fastapi_logger
@@ -68,6 +70,8 @@ api.include_router(orch.router)
 api.include_router(status.router)
 api.include_router(services.router)
 api.include_router(nodes.router)
+api.include_router(jobs.router)
+api.include_router(storage.router)
 
 
 #
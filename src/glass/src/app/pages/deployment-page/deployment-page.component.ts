@@ -10,7 +10,8 @@ import { DialogComponent } from '~/app/shared/components/dialog/dialog.component
 import { DatatableColumn } from '~/app/shared/models/datatable-column.type';
 import { BytesToSizePipe } from '~/app/shared/pipes/bytes-to-size.pipe';
 import { BootstrapService } from '~/app/shared/services/api/bootstrap.service';
-import { Device, OrchService } from '~/app/shared/services/api/orch.service';
+import { Job, JobsService } from '~/app/shared/services/api/jobs.service';
+import { AssimilateReply, Device, OrchService } from '~/app/shared/services/api/orch.service';
 import { ServiceDesc, ServicesService } from '~/app/shared/services/api/services.service';
 import { NotificationService } from '~/app/shared/services/notification.service';
 import { PollService } from '~/app/shared/services/poll.service';
@@ -73,7 +74,8 @@ export class DeploymentPageComponent implements OnInit {
     private orchService: OrchService,
     private services: ServicesService,
     private pollService: PollService,
-    private bootstrapService: BootstrapService
+    private bootstrapService: BootstrapService,
+    private jobsService: JobsService
   ) {}
 
   ngOnInit(): void {
@@ -131,9 +133,9 @@ export class DeploymentPageComponent implements OnInit {
   startAssimilation(): void {
     this.startBlockUI(translate(TEXT('Please wait, device deployment in progress ...')));
     this.orchService.assimilateDevices().subscribe(
-      (success) => {
-        if (success) {
-          this.pollAssimilationStatus();
+      (reply: AssimilateReply) => {
+        if (reply.success && reply.job) {
+          this.pollAssimilationJob(reply.job);
         } else {
           this.handleError(TEXT('Failed to start device deployment.'));
         }
@@ -144,6 +146,24 @@ export class DeploymentPageComponent implements OnInit {
     );
   }
 
+  pollAssimilationJob(id: string): void {
+    this.jobsService
+      .get(id)
+      .pipe(this.pollService.poll(JobsService.isActive, undefined, 'Failed to deploy devices.'))
+      .subscribe(
+        (job: Job) => {
+          if (job.state === 'done') {
+            this.pollAssimilationStatus();
+          } else {
+            this.handleError(job.error ?? TEXT('Failed to deploy devices.'));
+          }
+        },
+        (err) => {
+          this.handleError(err);
+        }
+      );
+  }
+
   pollAssimilationStatus(): void {
     this.orchService
       .assimilateStatus()
@@ -0,0 +1,34 @@
+import { HttpClientTestingModule, HttpTestingController } from '@angular/common/http/testing';
+import { TestBed } from '@angular/core/testing';
+
+import { Job, JobsService } from '~/app/shared/services/api/jobs.service';
+
+describe('JobsService', () => {
+  let service: JobsService;
+  let httpTesting: HttpTestingController;
+
+  beforeEach(() => {
+    TestBed.configureTestingModule({
+      imports: [HttpClientTestingModule]
+    });
+    service = TestBed.inject(JobsService);
+    httpTesting = TestBed.inject(HttpTestingController);
+  });
+
+  it('should be created', () => {
+    expect(service).toBeTruthy();
+  });
+
+  it('should call get', () => {
+    service.get('foo').subscribe();
+    const req = httpTesting.expectOne('api/jobs/foo');
+    expect(req.request.method).toBe('GET');
+  });
+
+  it('should tell active jobs', () => {
+    const job = { id: 'foo', state: 'running' } as Job;
+    expect(JobsService.isActive(job)).toBe(true);
+    job.state = 'failed';
+    expect(JobsService.isActive(job)).toBe(false);
+  });
+});
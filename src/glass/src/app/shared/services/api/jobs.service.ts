@@ -0,0 +1,41 @@
+import { HttpClient } from '@angular/common/http';
+import { Injectable } from '@angular/core';
+import { Observable } from 'rxjs';
+
+export declare type JobState = 'queued' | 'running' | 'done' | 'failed' | 'cancelled';
+
+export type Job = {
+  id: string;
+  name: string;
+  state: JobState;
+  progress: number;
+  progress_msg?: string;
+  created: number;
+  started?: number;
+  finished?: number;
+  result?: any;
+  error?: string;
+};
+
+@Injectable({
+  providedIn: 'root'
+})
+export class JobsService {
+  private url = 'api/jobs';
+
+  constructor(private http: HttpClient) {}
+
+  /**
+   * Get a job, to follow its progress and outcome.
+   */
+  get(id: string): Observable<Job> {
+    return this.http.get<Job>(`${this.url}/${id}`);
+  }
+
+  /**
+   * Whether the job is still to finish.
+   */
+  static isActive(job: Job): boolean {
+    return job.state === 'queued' || job.state === 'running';
+  }
+}
@@ -20,6 +20,11 @@ export type Device = {
   rejected_reasons: string[];
 };
 
+export type AssimilateReply = {
+  success: boolean;
+  job?: string;
+};
+
 export type HostDevices = {
   address: string;
   hostname: string;
@@ -201,8 +206,8 @@ export class OrchService {
   /**
    * Assimilate all devices
    */
-  assimilateDevices(): Observable<boolean> {
-    return this.http.post<boolean>(`${this.url}/devices/assimilate`, null, {});
+  assimilateDevices(): Observable<AssimilateReply> {
+    return this.http.post<AssimilateReply>(`${this.url}/devices/assimilate`, null, {});
   }
 
   /**
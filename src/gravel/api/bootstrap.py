@@ -12,9 +12,11 @@
 # GNU General Public License for more details.
 
 from logging import Logger
+from typing import Optional
 from fastapi.routing import APIRouter
 from fastapi.logger import logger as fastapi_logger
 from fastapi import HTTPException, status
+from fastapi import WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
 
 from gravel.controllers.bootstrap import (
@@ -48,6 +50,7 @@ class StartReplyModel(BaseModel):
 
 class StatusReplyModel(BaseModel):
     stage: BootstrapStage = Field(title="Current bootstrapping stage")
+    step: Optional[str] = Field(None, title="Last step taken by bootstrap")
 
 
 @router.post("/start", response_model=StartReplyModel)
@@ -60,7 +63,28 @@ async def start_bootstrap() -> StartReplyModel:
 @router.get("/status", response_model=StatusReplyModel)
 async def get_status() -> StatusReplyModel:
     stage: BootstrapStage = await bootstrap.get_stage()
-    return StatusReplyModel(stage=stage)
+    step = bootstrap.progress.last_step if bootstrap.progress else None
+    return StatusReplyModel(stage=stage, step=step)
+
+
+@router.websocket("/events")
+async def bootstrap_events(websocket: WebSocket, since: int = 0) -> None:
+    """ Stream bootstrap progress events, as JSON, until it is done.
+
+    Events still retained from before connecting are sent first; pass
+    'since' to skip those already seen.
+    """
+    await websocket.accept()
+    progress = bootstrap.progress
+    if progress is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    try:
+        async for event in progress.events(since):
+            await websocket.send_text(event.json())
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
 
 
 @router.post("/finished", response_model=bool)
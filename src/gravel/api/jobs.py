@@ -0,0 +1,57 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from logging import Logger
+from typing import List
+from fastapi import HTTPException, status
+from fastapi.logger import logger as fastapi_logger
+from fastapi.routing import APIRouter
+
+from gravel.controllers.jobs import (
+    JobModel,
+    JobNotFoundError,
+    get_job_mgr
+)
+
+
+logger: Logger = fastapi_logger
+
+router: APIRouter = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"]
+)
+
+
+@router.get("/", response_model=List[JobModel])
+async def get_jobs() -> List[JobModel]:
+    return get_job_mgr().ls()
+
+
+@router.get("/{job_id}", response_model=JobModel)
+async def get_job(job_id: str) -> JobModel:
+    try:
+        return get_job_mgr().get(job_id).model
+    except JobNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND,
+                            detail=f"unknown job {job_id}")
+
+
+@router.post("/{job_id}/cancel", response_model=bool)
+async def cancel_job(job_id: str) -> bool:
+    """ Whether the job was cancelled; jobs already finished, or running in
+    a thread or process, can't be. """
+    try:
+        return get_job_mgr().cancel(job_id)
+    except JobNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND,
+                            detail=f"unknown job {job_id}")
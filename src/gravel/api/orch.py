@@ -9,16 +9,22 @@
 from logging import Logger
 from fastapi.routing import APIRouter
 from fastapi.logger import logger as fastapi_logger
-from fastapi import HTTPException, status
-from pydantic import BaseModel
-from typing import Dict, List
-from gravel.cephadm.cephadm import Cephadm
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from gravel.cephadm.models import HostFactsModel, NodeInfoModel, VolumeDeviceModel
 from gravel.controllers.orch.models import OrchDevicesPerHostModel
+from gravel.controllers.gstate import gstate
+from gravel.controllers.jobs import Job, get_job_mgr
 
 from gravel.controllers.orch.orchestrator \
     import Orchestrator
 from gravel.controllers.resources import inventory
+from gravel.controllers.resources.disks import DiskStatsModel, get_disk_stats
+from gravel.controllers.resources.network import (
+    NICStatsModel,
+    get_network_stats
+)
 
 
 logger: Logger = fastapi_logger
@@ -51,6 +57,11 @@ class HostsDevicesModel(BaseModel):
     devices: List[DeviceModel]
 
 
+class AssimilateReplyModel(BaseModel):
+    success: bool = Field(title="Assimilation has started")
+    job: Optional[str] = Field(None, title="ID of the job to follow")
+
+
 @router.get("/hosts", response_model=List[HostModel])
 def get_hosts() -> List[HostModel]:
     orch = Orchestrator()
@@ -62,9 +73,10 @@ def get_hosts() -> List[HostModel]:
 
 
 @router.get("/devices", response_model=Dict[str, HostsDevicesModel])
-def get_devices() -> Dict[str, HostsDevicesModel]:
+async def get_devices() -> Dict[str, HostsDevicesModel]:
     orch = Orchestrator()
-    orch_devs_per_host: List[OrchDevicesPerHostModel] = orch.devices_ls()
+    orch_devs_per_host: List[OrchDevicesPerHostModel] = \
+        await orch.devices_ls_async()
     host_devs: Dict[str, HostsDevicesModel] = {}
     for orch_host in orch_devs_per_host:
 
@@ -95,20 +107,32 @@ def get_devices() -> Dict[str, HostsDevicesModel]:
 
 @router.get("/facts", response_model=HostFactsModel)
 async def get_facts() -> HostFactsModel:
-    cephadm = Cephadm()
-    return await cephadm.gather_facts()
+    return await inventory.get_inventory().get_facts()
 
 
 @router.get("/volumes", response_model=List[VolumeDeviceModel])
 async def get_volumes() -> List[VolumeDeviceModel]:
-    cephadm = Cephadm()
-    return await cephadm.get_volume_inventory()
+    return await inventory.get_inventory().get_volumes()
+
+
+@router.get("/volumes/stats", response_model=Dict[str, DiskStatsModel])
+async def get_volumes_stats() -> Dict[str, DiskStatsModel]:
+    return get_disk_stats().get_latest()
+
+
+@router.get(
+    "/volumes/stats/history",
+    response_model=Dict[str, List[DiskStatsModel]]
+)
+async def get_volumes_stats_history(
+    path: Optional[str] = None
+) -> Dict[str, List[DiskStatsModel]]:
+    return get_disk_stats().get_history(path)
 
 
 @router.get("/nodeinfo", response_model=NodeInfoModel)
 async def get_node_info() -> NodeInfoModel:
-    cephadm = Cephadm()
-    return await cephadm.get_node_info()
+    return await inventory.get_inventory().get_node_info()
 
 
 @router.get("/inventory", response_model=NodeInfoModel)
@@ -120,24 +144,61 @@ async def get_inventory() -> NodeInfoModel:
     return latest
 
 
-@router.post("/devices/assimilate", response_model=bool)
-async def assimilate_devices() -> bool:
+@router.get(
+    "/inventory/history",
+    response_model=List[inventory.InventoryHistoryPointModel]
+)
+async def get_inventory_history(
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    points: Optional[int] = Query(None, gt=0)
+) -> List[inventory.InventoryHistoryPointModel]:
+    """ Numeric parts of past probes, between 'start' and 'end' seconds
+    since the epoch; averaged down to at most 'points' if specified. """
+    return inventory.get_inventory().get_history(start, end, points)
+
+
+@router.get("/inventory/network", response_model=Dict[str, NICStatsModel])
+async def get_inventory_network() -> Dict[str, NICStatsModel]:
+    return get_network_stats().get_latest()
+
+
+@router.get(
+    "/inventory/network/history",
+    response_model=Dict[str, List[NICStatsModel]]
+)
+async def get_inventory_network_history(
+    name: Optional[str] = None
+) -> Dict[str, List[NICStatsModel]]:
+    return get_network_stats().get_history(name)
+
+
+@router.post("/devices/assimilate", response_model=AssimilateReplyModel)
+async def assimilate_devices() -> AssimilateReplyModel:
+    """ Start assimilating all available devices, as a job to be followed
+    through '/api/jobs/{job}'; once done, '/devices/all_assimilated' tells
+    when the devices have become OSDs. """
 
     try:
         orch = Orchestrator()
-        orch.assimilate_all_devices()
     except Exception as e:
         logger.error(str(e))
-        return False
+        return AssimilateReplyModel(success=False)
+
+    async def _assimilate(job: Job) -> None:
+        await orch.assimilate_all_devices_async()
 
-    return True
+    job = get_job_mgr().submit("assimilate devices", _assimilate)
+    # devices turn into OSDs over the next few minutes.
+    gstate.fast_probe("inventory", "storage")
+    return AssimilateReplyModel(success=True, job=job.id)
 
 
 @router.get("/devices/all_assimilated", response_model=bool)
 async def all_devices_assimilated() -> bool:
     try:
         orch = Orchestrator()
-        return orch.all_devices_assimilated()
+        return await orch.all_devices_assimilated_async()
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=str(e))
@@ -147,7 +208,7 @@ async def all_devices_assimilated() -> bool:
 async def get_pubkey() -> str:
     try:
         orch = Orchestrator()
-        return orch.get_public_key()
+        return await orch.get_public_key_async()
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=str(e))
@@ -2,13 +2,14 @@
 # Copyright (C) 2021 SUSE, LLC.
 
 from logging import Logger
-from typing import List
+from typing import List, Optional
 from fastapi.logger import logger as fastapi_logger
 from fastapi.routing import APIRouter
 from fastapi import HTTPException, status
 from pydantic import BaseModel
 from pydantic.fields import Field
 
+from gravel.controllers.jobs import Job, get_job_mgr
 from gravel.controllers.services import (
     NotEnoughSpaceError,
     ServiceError,
@@ -50,6 +51,7 @@ class CreateRequest(BaseModel):
 
 class CreateReply(BaseModel):
     success: bool
+    job: Optional[str] = Field(None, title="ID of the job creating it")
 
 
 @router.get("/reservations", response_model=ReservationsReply)
@@ -90,8 +92,20 @@ async def check_requirements(
 async def create_service(req: CreateRequest) -> CreateReply:
 
     services = Services()
+
+    async def _create(job: Job) -> ServiceModel:
+        return await services.create(
+            req.name, req.type, req.size, req.replicas, reserved=True
+        )
+
     try:
-        services.create(req.name, req.type, req.size, req.replicas)
+        services.check_create(
+            req.name, req.type, req.size, req.replicas, reserve=True
+        )
+        job = get_job_mgr().submit(f"create service {req.name}", _create)
+        job.add_done_callback(lambda _: services.release(req.name))
+        # tracked as a job, but we reply with how it went.
+        await job.wait()
     except NotImplementedError:
         raise HTTPException(status.HTTP_501_NOT_IMPLEMENTED,
                             detail="service type not supported")
@@ -103,4 +117,4 @@ async def create_service(req: CreateRequest) -> CreateReply:
     except Exception as e:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=str(e))
-    return CreateReply(success=True)
+    return CreateReply(success=True, job=job.id)
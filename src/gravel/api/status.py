@@ -12,17 +12,26 @@
 # GNU General Public License for more details.
 
 from logging import Logger
-from typing import Optional
+from typing import Dict, List, Optional
 from fastapi.routing import APIRouter
 from fastapi.logger import logger as fastapi_logger
 from pydantic import BaseModel, Field
 
+from gravel.cephadm.scheduler import (
+    CephadmSchedulerStatsModel,
+    get_cephadm_scheduler
+)
+from gravel.controllers.gstate import TickerStatsModel, gstate
 from gravel.controllers.nodes.mgr import (
     NodeMgr,
     NodeStageEnum,
     get_node_mgr
 )
-from gravel.controllers.orch.ceph import Mon
+from gravel.controllers.orch.ceph import (
+    CephClientStatusModel,
+    Mon,
+    get_ceph_conn_mgr
+)
 from gravel.controllers.orch.models import CephStatusModel
 
 
@@ -51,7 +60,7 @@ async def get_status() -> StatusModel:
        stage != NodeStageEnum.JOINING:
         mon = Mon()
         try:
-            cluster = mon.status
+            cluster = await mon.status_async()
         except Exception:
             logger.error("unable to obtain cluster status!")
             pass
@@ -61,3 +70,18 @@ async def get_status() -> StatusModel:
         cluster=cluster
     )
     return status
+
+
+@router.get("/ceph", response_model=List[CephClientStatusModel])
+async def get_ceph_client_status() -> List[CephClientStatusModel]:
+    return get_ceph_conn_mgr().get_status()
+
+
+@router.get("/cephadm", response_model=CephadmSchedulerStatsModel)
+async def get_cephadm_status() -> CephadmSchedulerStatsModel:
+    return get_cephadm_scheduler().get_stats()
+
+
+@router.get("/tickers", response_model=Dict[str, TickerStatsModel])
+async def get_tickers_status() -> Dict[str, TickerStatsModel]:
+    return gstate.get_ticker_stats()
@@ -0,0 +1,95 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import time
+from logging import Logger
+from typing import Dict, List, Optional
+from fastapi import HTTPException, status
+from fastapi.logger import logger as fastapi_logger
+from fastapi.routing import APIRouter
+from pydantic import Field
+
+from gravel.controllers.resources.storage import (
+    CapacityHistoryModel,
+    CapacitySeriesModel,
+    StorageForecastModel,
+    StorageModel,
+    StoragePoolEventModel,
+    get_storage
+)
+from gravel.controllers.services import ServiceForecastModel, Services
+
+
+logger: Logger = fastapi_logger
+
+router: APIRouter = APIRouter(
+    prefix="/storage",
+    tags=["storage"]
+)
+
+
+class ForecastReplyModel(StorageForecastModel):
+    services: Dict[str, ServiceForecastModel] = \
+        Field(title="Forecast by service name")
+
+
+@router.get("/", response_model=StorageModel)
+async def get_usage() -> StorageModel:
+    return await get_storage().usage()
+
+
+@router.get("/events", response_model=List[StoragePoolEventModel])
+async def get_events(since: int = 0) -> List[StoragePoolEventModel]:
+    """ Pool events after storage revision 'since'; nothing new to fetch if
+    'since' is the current revision. """
+    return get_storage().events(since)
+
+
+@router.get("/history", response_model=CapacitySeriesModel)
+async def get_history_series() -> CapacitySeriesModel:
+    """ Series kept, e.g. 'cluster.used' or 'pool.<id>.max_available';
+    and those dropped once 'capacity_max_series' were all in use. """
+    try:
+        return get_storage().capacity_series()
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=str(e))
+
+
+@router.get("/history/{series}", response_model=CapacityHistoryModel)
+async def get_history(
+    series: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None
+) -> CapacityHistoryModel:
+    """ Series between 'start' and 'end' seconds since the epoch, by default
+    the last day, at the finest resolution still covering 'start'. """
+    end = time.time() if end is None else end
+    start = end - 86400 if start is None else start
+    try:
+        return get_storage().capacity_history(series, start, end)
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=str(e))
+
+
+@router.get("/forecast", response_model=ForecastReplyModel)
+async def get_forecast() -> ForecastReplyModel:
+    """ Time to full of the cluster, each pool and each service, at the
+    rate they have recently been growing. """
+    storage = get_storage().forecast()
+    return ForecastReplyModel(
+        cluster=storage.cluster,
+        pools=storage.pools,
+        services=Services().forecast(storage)
+    )
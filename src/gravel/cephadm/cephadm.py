@@ -7,16 +7,24 @@
 # version 2.1 of the License, or (at your option) any later version.
 
 import asyncio
+import contextvars
+from contextlib import asynccontextmanager
 from logging import Logger
 import os
 import json
-from io import StringIO
-from typing import List, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 
-import pydantic
-from pydantic.tools import parse_obj_as
 from fastapi.logger import logger as fastapi_logger
 
+from gravel.controllers.orch.decode import DecodeError, get_parse_offloader
+from .helper import HELPER_SOCKET, is_helper_command
+from .output import (
+    OUTPUT_CHUNK_SIZE,
+    CephadmProgress,
+    LineSplitter,
+    OutputBuffer
+)
+from .scheduler import CephadmPriorityEnum, get_cephadm_scheduler
 from .models import HostFactsModel, NodeCPUInfoModel, \
     NodeCPULoadModel, NodeInfoModel, NodeMemoryInfoModel, \
     VolumeDeviceModel
@@ -25,13 +33,37 @@ from .models import HostFactsModel, NodeCPUInfoModel, \
 logger: Logger = fastapi_logger
 
 
+GATHER_FACTS_TIMEOUT = 60.0
+VOLUME_INVENTORY_TIMEOUT = 120.0
+TERMINATE_GRACE_PERIOD = 5.0
+
+# whether we already hold a scheduler slot, so we don't wait for another.
+_in_slot: contextvars.ContextVar[bool] = \
+    contextvars.ContextVar("cephadm_in_slot", default=False)
+
+
 class CephadmError(Exception):
     pass
 
 
+class CephadmTimeoutError(CephadmError):
+    pass
+
+
+class CephadmHelperUnavailableError(CephadmError):
+    pass
+
+
 class Cephadm:
 
-    def __init__(self):
+    helper_socket: Optional[str]
+    priority: CephadmPriorityEnum
+
+    def __init__(
+        self,
+        helper_socket: Optional[str] = HELPER_SOCKET,
+        priority: CephadmPriorityEnum = CephadmPriorityEnum.INTERACTIVE
+    ):
 
         if os.path.exists("./gravel/cephadm/cephadm.bin"):
             # dev environment
@@ -40,9 +72,74 @@ class Cephadm:
             # deployment environment
             self.cephadm = "sudo cephadm"
 
-        pass
+        self.helper_socket = helper_socket
+        self.priority = priority
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        if _in_slot.get():
+            yield
+            return
+        async with get_cephadm_scheduler().slot(self.priority):
+            token = _in_slot.set(True)
+            try:
+                yield
+            finally:
+                _in_slot.reset(token)
 
-    async def call(self, cmd: str) -> Tuple[str, str, int]:
+    async def call(
+        self,
+        cmd: str,
+        progress: Optional[CephadmProgress] = None
+    ) -> Tuple[str, str, int]:
+        """ Run a cephadm command, through the helper if it can serve it.
+
+        Output lines are fed to 'progress' as they come, if provided. Waits
+        for the scheduler to let us run, according to our priority.
+        """
+        async with self._slot():
+            args: List[str] = cmd.split()
+            if self.helper_socket and is_helper_command(args) and \
+               not progress:
+                try:
+                    return await self._call_helper(args)
+                except CephadmHelperUnavailableError as e:
+                    logger.debug(f"=> cephadm -- helper unavailable: {e}")
+            return await self._exec(cmd, progress)
+
+    async def _call_helper(self, args: List[str]) -> Tuple[str, str, int]:
+        assert self.helper_socket
+        try:
+            reader, writer = \
+                await asyncio.open_unix_connection(self.helper_socket)
+        except OSError as e:
+            raise CephadmHelperUnavailableError(str(e)) from e
+
+        try:
+            request = json.dumps({"args": args}) + "\n"
+            writer.write(request.encode("utf-8"))
+            await writer.drain()
+            # the helper closes the connection once it has replied
+            data = await reader.read()
+        except ConnectionError as e:
+            raise CephadmHelperUnavailableError(str(e)) from e
+        finally:
+            # closing on cancellation terminates the command on the helper
+            writer.close()
+
+        try:
+            reply = json.loads(data)
+            return reply["stdout"], reply["stderr"], reply["rc"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise CephadmHelperUnavailableError(
+                f"bad reply from helper: {e}"
+            ) from e
+
+    async def _exec(
+        self,
+        cmd: str,
+        progress: Optional[CephadmProgress] = None
+    ) -> Tuple[str, str, int]:
 
         cmdlst: List[str] = f"{self.cephadm} {cmd}".split()
 
@@ -54,55 +151,118 @@ class Cephadm:
         assert process.stdout
         assert process.stderr
 
-        stdout, stderr = await asyncio.gather(
-            self._tee(process.stdout), self._tee(process.stderr)
-        )
-        retcode = await asyncio.wait_for(process.wait(), None)
+        try:
+            stdout, stderr = await asyncio.gather(
+                self._tee(process.stdout, "stdout", progress),
+                self._tee(process.stderr, "stderr", progress)
+            )
+            retcode = await process.wait()
+        except asyncio.CancelledError:
+            # don't leave the child behind if we're no longer waiting on it
+            await self._terminate(process)
+            raise
 
         return stdout, stderr, retcode
 
+    async def _terminate(self, process: asyncio.subprocess.Process) -> None:
+        # sudo relays SIGTERM to cephadm, but can't relay SIGKILL.
+        try:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), TERMINATE_GRACE_PERIOD)
+                return
+            except asyncio.TimeoutError:
+                logger.info(f"=> cephadm -- killing pid {process.pid}")
+            process.kill()
+            await process.wait()
+        except ProcessLookupError:
+            pass  # already gone
+
     async def run_in_background(self, cmd: List[str]) -> None:
         pass
 
-    async def _tee(self, reader: asyncio.StreamReader) -> str:
-        collected = StringIO()
-        async for line in reader:
-            msg = line.decode("utf-8")
-            collected.write(msg)
+    async def _tee(
+        self,
+        reader: asyncio.StreamReader,
+        stream: str,
+        progress: Optional[CephadmProgress]
+    ) -> str:
+        collected = OutputBuffer()
+        splitter = LineSplitter() if progress else None
+        while True:
+            chunk = await reader.read(OUTPUT_CHUNK_SIZE)
+            if not chunk:
+                break
+            collected.append(chunk)
+            if progress and splitter:
+                for line in splitter.feed(chunk):
+                    progress.add_line(stream, line)
+        if progress and splitter:
+            for line in splitter.flush():
+                progress.add_line(stream, line)
+        if collected.truncated:
+            logger.info(
+                f"=> cephadm -- {stream} truncated to {len(collected)} bytes"
+            )
         return collected.getvalue()
 
     #
     # command wrappers
     #
 
-    async def bootstrap(self, addr: str) -> Tuple[str, str, int]:
+    async def bootstrap(
+        self,
+        addr: str,
+        progress: Optional[CephadmProgress] = None
+    ) -> Tuple[str, str, int]:
 
         if not addr:
             raise CephadmError("address not specified")
 
         cmd = f"bootstrap --skip-prepare-host --mon-ip {addr}"
-        return await self.call(cmd)
+        return await self.call(cmd, progress=progress)
 
-    async def gather_facts(self) -> HostFactsModel:
-        stdout, stderr, rc = await self.call("gather-facts")
+    async def _call_with_timeout(
+        self, cmd: str, timeout: Optional[float]
+    ) -> Tuple[str, str, int]:
+        # don't count the time spent waiting to run against the command.
+        async with self._slot():
+            try:
+                return await asyncio.wait_for(self.call(cmd), timeout)
+            except asyncio.TimeoutError as e:
+                raise CephadmTimeoutError(
+                    f"'{cmd}' timed out after {timeout} seconds"
+                ) from e
+
+    async def gather_facts(
+        self, timeout: Optional[float] = GATHER_FACTS_TIMEOUT
+    ) -> HostFactsModel:
+        stdout, stderr, rc = \
+            await self._call_with_timeout("gather-facts", timeout)
         if rc != 0:
             raise CephadmError(stderr)
         try:
-            return HostFactsModel.parse_raw(stdout)
-        except pydantic.error_wrappers.ValidationError:
+            return await get_parse_offloader().parse_json_as(
+                HostFactsModel, stdout
+            )
+        except DecodeError:
             raise CephadmError("format error while obtaining facts")
 
-    async def get_volume_inventory(self) -> List[VolumeDeviceModel]:
+    async def get_volume_inventory(
+        self, timeout: Optional[float] = VOLUME_INVENTORY_TIMEOUT
+    ) -> List[VolumeDeviceModel]:
         cmd = "ceph-volume inventory --format=json"
-        stdout, stderr, rc = await self.call(cmd)
+        stdout, stderr, rc = await self._call_with_timeout(cmd, timeout)
         if rc != 0:
             raise CephadmError(stderr)
         try:
-            devs = json.loads(stdout)
-            logger.debug(json.dumps(devs, indent=2))
-        except json.decoder.JSONDecodeError as e:
+            inventory: List[VolumeDeviceModel] = \
+                await get_parse_offloader().parse_json_as(
+                    List[VolumeDeviceModel], stdout
+                )
+        except DecodeError as e:
             raise CephadmError("format error while obtaining inventory") from e
-        inventory = parse_obj_as(List[VolumeDeviceModel], devs)
+        logger.debug(f"=> cephadm -- inventory has {len(inventory)} devices")
         for d in inventory:
             if not d.human_readable_type:
                 if d.sys_api.rotational:
@@ -112,11 +272,33 @@ class Cephadm:
         return inventory
 
     async def get_node_info(self) -> NodeInfoModel:
-        try:
-            facts = await self.gather_facts()
-            inventory = await self.get_volume_inventory()
-        except CephadmError as e:
-            raise CephadmError("error obtaining node info") from e
+        """ Obtain facts and the volume inventory, concurrently.
+
+        Should we obtain facts but not the inventory, the result has no
+        disks and is flagged with 'disks_stale'.
+        """
+        facts_res, inventory_res = await asyncio.gather(
+            self.gather_facts(),
+            self.get_volume_inventory(),
+            return_exceptions=True
+        )
+        if isinstance(facts_res, BaseException):
+            if not isinstance(facts_res, CephadmError):
+                raise facts_res
+            raise CephadmError("error obtaining node info") from facts_res
+        facts: HostFactsModel = facts_res
+
+        inventory: List[VolumeDeviceModel] = []
+        disks_stale: bool = False
+        if isinstance(inventory_res, BaseException):
+            if not isinstance(inventory_res, CephadmError):
+                raise inventory_res
+            logger.error(
+                f"=> cephadm -- unable to obtain inventory: {inventory_res}"
+            )
+            disks_stale = True
+        else:
+            inventory = inventory_res
 
         return NodeInfoModel(
             hostname=facts.hostname,
@@ -143,5 +325,6 @@ class Cephadm:
                 free_kb=facts.memory_free_kb,
                 total_kb=facts.memory_total_kb
             ),
-            disks=inventory
+            disks=inventory,
+            disks_stale=disks_stale
         )
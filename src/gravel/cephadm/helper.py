@@ -0,0 +1,178 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+"""
+Privileged helper keeping cephadm loaded.
+
+Running cephadm means going through sudo, starting an interpreter and
+importing the whole cephadm script before doing any real work. This helper
+imports cephadm once and serves read-only requests over a unix socket,
+forking a child per request. It is optional: when it is not running,
+'Cephadm.call()' simply executes cephadm.
+
+It is meant to run as root, e.g.
+
+    python3 -m gravel.cephadm.helper --cephadm /usr/sbin/cephadm
+
+Requests and replies are JSON objects. A request is a single line,
+'{"args": [...]}'; the reply, '{"stdout": ..., "stderr": ..., "rc": ...}',
+is followed by the helper closing the connection. Should the client go away
+before a reply is sent, the command is terminated.
+"""
+
+import argparse
+import contextlib
+import importlib.machinery
+import importlib.util
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+from io import StringIO
+from types import ModuleType
+from typing import Any, Dict, List, Tuple
+
+
+HELPER_SOCKET = "/run/aquarium/cephadm.sock"
+HELPER_MAX_REQUEST = 4096
+
+# only read-only commands, as issued by 'Cephadm', are served.
+HELPER_COMMANDS = {
+    ("gather-facts",),
+    ("ceph-volume", "inventory", "--format=json"),
+}
+
+
+def is_helper_command(args: List[str]) -> bool:
+    return tuple(args) in HELPER_COMMANDS
+
+
+def load_cephadm(path: str) -> ModuleType:
+    """ Import the cephadm script at 'path', which lacks a '.py' suffix. """
+    loader = importlib.machinery.SourceFileLoader("cephadm", path)
+    spec = importlib.util.spec_from_loader("cephadm", loader)
+    assert spec
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def run_cephadm(cephadm: ModuleType, args: List[str]) -> Tuple[str, str, int]:
+    """ Run cephadm's main with 'args', capturing its output. """
+    stdout, stderr = StringIO(), StringIO()
+    rc: Any = 0
+    sys.argv = ["cephadm"] + args
+    with contextlib.redirect_stdout(stdout), \
+            contextlib.redirect_stderr(stderr):
+        try:
+            ret = cephadm.main()
+            rc = ret if ret is not None else 0
+        except SystemExit as e:
+            rc = e.code if e.code is not None else 0
+        except Exception as e:
+            print(f"error: {e}", file=sys.stderr)
+            rc = 1
+    if not isinstance(rc, int):
+        print(rc, file=stderr)
+        rc = 1
+    return stdout.getvalue(), stderr.getvalue(), rc
+
+
+class CephadmHelperHandler(socketserver.StreamRequestHandler):
+
+    server: "CephadmHelperServer"
+
+    def handle(self) -> None:
+        # we are a forked child; have our own group so that everything we
+        # spawn can be terminated should the client go away.
+        os.setpgid(0, 0)
+        line = self.rfile.readline(HELPER_MAX_REQUEST)
+        try:
+            request = json.loads(line)
+            args = request["args"]
+            assert isinstance(args, list)
+            assert all(isinstance(a, str) for a in args)
+        except Exception:
+            self._reply("", "malformed request", 1)
+            return
+
+        if not is_helper_command(args):
+            self._reply("", f"command not allowed: {' '.join(args)}", 1)
+            return
+
+        self._done = False
+        watcher = threading.Thread(target=self._watch_client, daemon=True)
+        watcher.start()
+
+        out, err, rc = run_cephadm(self.server.cephadm, args)
+        self._done = True
+        self._reply(out, err, rc)
+
+    def _watch_client(self) -> None:
+        # the client sends nothing else; EOF means it's gone. Don't go
+        # through 'rfile', which is closed under us once we're done.
+        try:
+            self.connection.recv(1)
+        except OSError:
+            pass
+        if not self._done:
+            os.killpg(0, signal.SIGTERM)
+
+    def _reply(self, stdout: str, stderr: str, rc: int) -> None:
+        reply: Dict[str, Any] = {"stdout": stdout, "stderr": stderr, "rc": rc}
+        try:
+            self.wfile.write(json.dumps(reply).encode("utf-8"))
+        except OSError:
+            pass  # client is gone
+
+
+class CephadmHelperServer(
+    socketserver.ForkingMixIn,
+    socketserver.UnixStreamServer
+):
+
+    cephadm: ModuleType
+
+    def __init__(self, path: str, cephadm: ModuleType):
+        self.cephadm = cephadm
+        if os.path.exists(path):
+            os.unlink(path)
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, CephadmHelperHandler)
+        finally:
+            os.umask(old_umask)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="aquarium's cephadm helper")
+    parser.add_argument(
+        "--cephadm", type=str, default="/usr/sbin/cephadm",
+        help="path to the cephadm script"
+    )
+    parser.add_argument(
+        "--socket", type=str, default=HELPER_SOCKET,
+        help="unix socket to listen on"
+    )
+    args = parser.parse_args()
+
+    cephadm = load_cephadm(args.cephadm)
+    with CephadmHelperServer(args.socket, cephadm) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
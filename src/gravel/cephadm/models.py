@@ -1,7 +1,8 @@
 # project aquarium's backend
 # Copyright (C) 2021 SUSE, LLC.
 
-from typing import Any, Dict, List
+from enum import Enum
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 from pydantic.fields import Field
 
@@ -106,6 +107,7 @@ class NodeCPUInfoModel(BaseModel):
     count: int
     threads: int
     load: NodeCPULoadModel
+    utilization: Optional[float] = Field(None, title="CPU utilization, in %")
 
 
 class NodeMemoryInfoModel(BaseModel):
@@ -126,3 +128,18 @@ class NodeInfoModel(BaseModel):
     nics: Dict[str, NICModel]
     memory: NodeMemoryInfoModel
     disks: List[VolumeDeviceModel]
+    disks_stale: bool = Field(False, title="Disks are not up to date")
+
+
+class CephadmEventTypeEnum(str, Enum):
+    OUTPUT = "output"
+    STEP = "step"
+    DONE = "done"
+
+
+class CephadmEventModel(BaseModel):
+    seq: int = Field(title="Event sequence number")
+    type: CephadmEventTypeEnum = Field(title="Event type")
+    stream: Optional[str] = Field(None, title="Output stream")
+    msg: str = Field("", title="Event message")
+    rc: Optional[int] = Field(None, title="Return code, when done")
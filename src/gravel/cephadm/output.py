@@ -0,0 +1,148 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+import asyncio
+import codecs
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional
+
+from .models import CephadmEventModel, CephadmEventTypeEnum
+
+
+OUTPUT_CHUNK_SIZE = 64 * 1024
+OUTPUT_MAX_BYTES = 16 * 1024 * 1024
+PROGRESS_MAX_EVENTS = 1000
+
+
+class OutputBuffer:
+    """ Retains the last 'max_bytes' of a stream, as it is read in chunks. """
+
+    _chunks: Deque[bytes]
+    _size: int
+    _max_bytes: int
+    truncated: bool
+
+    def __init__(self, max_bytes: int = OUTPUT_MAX_BYTES):
+        self._chunks = deque()
+        self._size = 0
+        self._max_bytes = max_bytes
+        self.truncated = False
+
+    def append(self, chunk: bytes) -> None:
+        self._chunks.append(chunk)
+        self._size += len(chunk)
+        while self._size > self._max_bytes:
+            excess = self._size - self._max_bytes
+            first = self._chunks[0]
+            if len(first) <= excess:
+                self._chunks.popleft()
+                self._size -= len(first)
+            else:
+                self._chunks[0] = first[excess:]
+                self._size -= excess
+            self.truncated = True
+
+    def __len__(self) -> int:
+        return self._size
+
+    def getvalue(self) -> str:
+        return b"".join(self._chunks).decode("utf-8", errors="replace")
+
+
+def parse_line(line: str) -> CephadmEventTypeEnum:
+    """ cephadm announces each step it takes as 'Doing something...' """
+    if line.rstrip().endswith("..."):
+        return CephadmEventTypeEnum.STEP
+    return CephadmEventTypeEnum.OUTPUT
+
+
+class LineSplitter:
+    """ Incrementally decodes chunks of a stream into complete lines. """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+
+    def feed(self, chunk: bytes) -> List[str]:
+        data = self._pending + self._decoder.decode(chunk)
+        lines = data.split("\n")
+        self._pending = lines.pop()
+        return lines
+
+    def flush(self) -> List[str]:
+        data = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        return [data] if data else []
+
+
+class CephadmProgress:
+    """ Progress events of a running cephadm command.
+
+    Keeps the last 'max_events' events, so that late subscribers get to
+    know how we got here. Subscribers falling that far behind miss events.
+    """
+
+    _events: Deque[CephadmEventModel]
+    _seq: int
+    _done: bool
+    _changed: asyncio.Event
+
+    def __init__(self, max_events: int = PROGRESS_MAX_EVENTS):
+        self._events = deque(maxlen=max_events)
+        self._seq = 0
+        self._done = False
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def last_step(self) -> Optional[str]:
+        for event in reversed(self._events):
+            if event.type == CephadmEventTypeEnum.STEP:
+                return event.msg
+        return None
+
+    def _push(self, event: CephadmEventModel) -> None:
+        self._events.append(event)
+        self._seq += 1
+        # wake everyone waiting, and have new waiters wait anew.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def add_line(self, stream: str, line: str) -> None:
+        line = line.rstrip()
+        if not line:
+            return
+        evtype = parse_line(line)
+        msg = line[:-3] if evtype == CephadmEventTypeEnum.STEP else line
+        self._push(CephadmEventModel(
+            seq=self._seq, type=evtype, stream=stream, msg=msg
+        ))
+
+    def finish(self, rc: int) -> None:
+        if self._done:
+            return
+        self._push(CephadmEventModel(
+            seq=self._seq, type=CephadmEventTypeEnum.DONE, rc=rc
+        ))
+        self._done = True
+
+    async def events(self, since: int = 0) -> AsyncIterator[CephadmEventModel]:
+        """ Iterate over events from 'since' on, until the command is done. """
+        seq = since
+        while True:
+            for event in list(self._events):
+                if event.seq >= seq:
+                    yield event
+                    seq = event.seq + 1
+            if self._done and seq >= self._seq:
+                return
+            if seq >= self._seq:
+                await self._changed.wait()
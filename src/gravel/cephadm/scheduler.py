@@ -0,0 +1,144 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+import asyncio
+import heapq
+import time
+from contextlib import asynccontextmanager
+from enum import Enum
+from logging import Logger
+from typing import AsyncIterator, Dict, List, Tuple
+
+from fastapi.logger import logger as fastapi_logger
+from pydantic import BaseModel, Field
+
+
+logger: Logger = fastapi_logger
+
+
+CEPHADM_MAX_CONCURRENT = 2
+
+
+class CephadmPriorityEnum(int, Enum):
+    INTERACTIVE = 0
+    BOOTSTRAP = 1
+    BACKGROUND = 2
+
+
+class CephadmQueueStatsModel(BaseModel):
+    queued: int = Field(0, title="Commands waiting to run")
+    started: int = Field(0, title="Commands started")
+    wait_total: float = Field(0, title="Seconds spent waiting, in total")
+    wait_max: float = Field(0, title="Longest wait, in seconds")
+
+
+class CephadmSchedulerStatsModel(BaseModel):
+    max_concurrent: int = Field(title="Commands allowed to run at once")
+    running: int = Field(title="Commands running")
+    queues: Dict[CephadmPriorityEnum, CephadmQueueStatsModel] = \
+        Field(title="Per priority queue statistics")
+
+
+class CephadmScheduler:
+    """ Limits how many cephadm commands run at once.
+
+    Commands wait for a slot in priority order, and in arrival order within
+    the same priority.
+    """
+
+    _max_concurrent: int
+    _running: int
+    _waiting: List[Tuple[int, int, "asyncio.Future[None]"]]
+    _seq: int
+    _stats: Dict[CephadmPriorityEnum, CephadmQueueStatsModel]
+
+    def __init__(self, max_concurrent: int = CEPHADM_MAX_CONCURRENT):
+        self._max_concurrent = max_concurrent
+        self._running = 0
+        self._waiting = []
+        self._seq = 0
+        self._stats = {
+            prio: CephadmQueueStatsModel() for prio in CephadmPriorityEnum
+        }
+
+    @property
+    def max_concurrent(self) -> int:
+        return self._max_concurrent
+
+    @max_concurrent.setter
+    def max_concurrent(self, value: int) -> None:
+        self._max_concurrent = value
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        while self._waiting and self._running < self._max_concurrent:
+            _, _, fut = heapq.heappop(self._waiting)
+            if fut.done():  # cancelled while waiting
+                continue
+            self._running += 1
+            fut.set_result(None)
+
+    async def _acquire(self, priority: CephadmPriorityEnum) -> None:
+        stats = self._stats[priority]
+        start = time.monotonic()
+        if self._running < self._max_concurrent and not self._waiting:
+            self._running += 1
+        else:
+            fut: "asyncio.Future[None]" = \
+                asyncio.get_event_loop().create_future()
+            heapq.heappush(self._waiting, (priority, self._seq, fut))
+            self._seq += 1
+            stats.queued += 1
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # got the slot just as we were cancelled; pass it on.
+                    self._release()
+                raise
+            finally:
+                stats.queued -= 1
+
+        waited = time.monotonic() - start
+        stats.started += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+        if waited > 1.0:
+            logger.debug(
+                f"=> cephadm -- {priority.name.lower()} command "
+                f"waited {waited:.1f} seconds"
+            )
+
+    def _release(self) -> None:
+        self._running -= 1
+        self._wakeup()
+
+    @asynccontextmanager
+    async def slot(self, priority: CephadmPriorityEnum) -> AsyncIterator[None]:
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def get_stats(self) -> CephadmSchedulerStatsModel:
+        return CephadmSchedulerStatsModel(
+            max_concurrent=self._max_concurrent,
+            running=self._running,
+            queues={
+                prio: stats.copy() for prio, stats in self._stats.items()
+            }
+        )
+
+
+_scheduler = CephadmScheduler()
+
+
+def get_cephadm_scheduler() -> CephadmScheduler:
+    global _scheduler
+    return _scheduler
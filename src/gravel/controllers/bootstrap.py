@@ -14,9 +14,12 @@
 import asyncio
 from enum import Enum
 from logging import Logger
+from typing import Optional
 from fastapi.logger import logger as fastapi_logger
 
 from gravel.cephadm.cephadm import Cephadm
+from gravel.cephadm.output import CephadmProgress
+from gravel.cephadm.scheduler import CephadmPriorityEnum
 from gravel.controllers.nodes.errors import (
     NodeCantBootstrapError,
     NodeNotStartedError
@@ -49,10 +52,11 @@ class BootstrapStage(int, Enum):
 class Bootstrap:
 
     stage: BootstrapStage
+    progress: Optional[CephadmProgress]
 
     def __init__(self):
         self.stage = BootstrapStage.NONE
-        pass
+        self.progress = None
 
     async def _should_bootstrap(self) -> bool:
         nodemgr = get_node_mgr()
@@ -103,13 +107,18 @@ class Bootstrap:
         await mgr.start_bootstrap()  # XXX: needs hostname
 
         self.stage = BootstrapStage.RUNNING
+        self.progress = CephadmProgress()
 
-        retcode: int = 0
+        retcode: int = -1
         try:
-            cephadm: Cephadm = Cephadm()
-            _, _, retcode = await cephadm.bootstrap(address)
+            cephadm: Cephadm = Cephadm(
+                priority=CephadmPriorityEnum.BOOTSTRAP
+            )
+            _, _, retcode = await cephadm.bootstrap(address, self.progress)
         except Exception as e:
             raise BootstrapError(e) from e
+        finally:
+            self.progress.finish(retcode)
 
         if retcode != 0:
             raise BootstrapError(f"error bootstrapping: rc = {retcode}")
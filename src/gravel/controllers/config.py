@@ -14,6 +14,7 @@
 import os
 from logging import Logger
 from pathlib import Path
+from typing import List
 from pydantic import BaseModel, Field
 from fastapi.logger import logger as fastapi_logger
 
@@ -29,18 +30,119 @@ config_dir: str = _config_dir_env if _config_dir_env else '/etc/aquarium'
 
 
 class InventoryOptionsModel(BaseModel):
-    probe_interval: int = Field(60, title="Inventory Probe Interval")
+    probe_interval: int = Field(60, title="Inventory Probe Interval", gt=0)
+    min_probe_interval: float = \
+        Field(15.0, title="Shortest Inventory Probe Interval", gt=0)
+    max_probe_interval: float = \
+        Field(300.0, title="Longest Inventory Probe Interval", gt=0)
+    max_age: float = Field(10.0, title="Max Age of Served Inventory Results")
+    subscriber_timeout: float = Field(
+        30.0, title="Seconds an Inventory Subscriber may take"
+    )
+    history_size: int = \
+        Field(1440, title="Inventory Probes Kept in History", gt=0)
+
+
+class HostOptionsModel(BaseModel):
+    probe_interval: float = \
+        Field(2.0, title="Host Metrics Probe Interval", gt=0)
+
+
+class DisksOptionsModel(BaseModel):
+    probe_interval: float = \
+        Field(5.0, title="Disk Statistics Probe Interval", gt=0)
+    history_size: int = \
+        Field(120, title="Disk Statistics Samples Kept", gt=0)
+
+
+class NetworkOptionsModel(BaseModel):
+    probe_interval: float = \
+        Field(5.0, title="NIC Statistics Probe Interval", gt=0)
+    history_size: int = \
+        Field(120, title="NIC Statistics Samples Kept", gt=0)
+
+
+class CapacityTierOptionsModel(BaseModel):
+    step: int = Field(title="Seconds per Capacity History Slot", gt=0)
+    rows: int = Field(title="Capacity History Slots Kept", gt=0)
 
 
 class StorageOptionsModel(BaseModel):
-    probe_interval: float = Field(30.0, title="Storage Probe Interval")
+    probe_interval: float = \
+        Field(30.0, title="Storage Probe Interval", gt=0)
+    min_probe_interval: float = \
+        Field(10.0, title="Shortest Storage Probe Interval", gt=0)
+    max_probe_interval: float = \
+        Field(120.0, title="Longest Storage Probe Interval", gt=0)
+    capacity_tiers: List[CapacityTierOptionsModel] = Field([
+        CapacityTierOptionsModel(step=30, rows=2880),  # a day
+        CapacityTierOptionsModel(step=300, rows=8640),  # a month
+        CapacityTierOptionsModel(step=3600, rows=8760)  # a year
+    ], title="Capacity History Resolutions")
+    # the store's file takes about rows * max_series * 12 bytes, rows summed
+    # over all tiers: 128 series over the tiers above are 30MB, and fit the
+    # cluster's four series plus two per pool for up to 62 pools.
+    capacity_max_series: int = Field(
+        128, title="Capacity History Series Kept", gt=0
+    )
+    capacity_flush_interval: float = Field(
+        300.0, title="Seconds Between Capacity History Flushes to Disk"
+    )
+    forecast_half_life: float = Field(
+        7 * 86400, title="Seconds for Past Usage to Weigh Half in Forecasts"
+    )
+
+
+class CephOptionsModel(BaseModel):
+    cache_ttl: float = Field(5.0, title="Cluster Query Cache TTL")
+    trusted_models: bool = Field(
+        False, title="Skip validation of cluster replies"
+    )
+    connect_timeout: float = Field(10.0, title="Cluster Connect Timeout")
+    breaker_threshold: int = Field(
+        3, title="Connection failures before failing fast"
+    )
+    breaker_cooldown: float = Field(
+        30.0, title="Seconds failing fast before retrying"
+    )
+
+
+class CephadmOptionsModel(BaseModel):
+    max_concurrent: int = Field(
+        2, title="cephadm commands allowed to run at once"
+    )
+
+
+class JobsOptionsModel(BaseModel):
+    max_threads: int = Field(4, title="Threads running background jobs")
+    max_processes: int = Field(2, title="Processes running background jobs")
+    retention: int = Field(100, title="Finished jobs kept")
+
+
+class ParseOptionsModel(BaseModel):
+    offload: bool = Field(
+        False, title="Parse large replies in a separate process"
+    )
+    offload_min_bytes: int = Field(
+        256 * 1024, title="Smallest cephadm output parsed separately"
+    )
+    offload_min_items: int = Field(
+        64, title="Fewest orchestrator devices parsed separately"
+    )
 
 
 class OptionsModel(BaseModel):
     service_state_path: Path = Field(Path(config_dir).joinpath("storage.json"),
                                      title="Path to Service State file")
     inventory: InventoryOptionsModel = Field(InventoryOptionsModel())
+    host: HostOptionsModel = Field(HostOptionsModel())
+    disks: DisksOptionsModel = Field(DisksOptionsModel())
+    network: NetworkOptionsModel = Field(NetworkOptionsModel())
     storage: StorageOptionsModel = Field(StorageOptionsModel())
+    ceph: CephOptionsModel = Field(CephOptionsModel())
+    cephadm: CephadmOptionsModel = Field(CephadmOptionsModel())
+    jobs: JobsOptionsModel = Field(JobsOptionsModel())
+    parse: ParseOptionsModel = Field(ParseOptionsModel())
 
 
 class ConfigModel(BaseModel):
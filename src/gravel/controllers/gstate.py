@@ -12,25 +12,104 @@
 # GNU General Public License for more details.
 
 import asyncio
+import heapq
+import random
 import time
 from abc import ABC, abstractmethod
-from concurrent.futures.thread import ThreadPoolExecutor
 from logging import Logger
-from typing import Callable, Any, Dict
+from collections import deque
+from typing import Callable, Any, Deque, Dict, List, Optional, Set, Tuple
 from fastapi.logger import logger as fastapi_logger
+from pydantic import BaseModel, Field
 
+from gravel.cephadm.scheduler import get_cephadm_scheduler
+from gravel.controllers.jobs import Job, get_job_mgr
 from gravel.controllers.config import Config
+from gravel.controllers.orch.ceph import get_ceph_conn_mgr
+from gravel.controllers.orch.decode import get_parse_offloader
 
 
 logger: Logger = fastapi_logger
 
 
+TICKER_JITTER = 0.1  # fraction of the interval
+TICKER_MAX_BACKOFF = 300.0
+TICKER_MAX_SLEEP = 60.0
+TICKER_STATS_WINDOW = 100  # durations kept for percentiles
+# adaptive tickers: how the interval moves as results change, or don't.
+TICKER_SPEEDUP = 0.5
+TICKER_SLOWDOWN = 1.25
+TICKER_FAST_WINDOW = 300.0  # seconds ticking fast after a cluster event
+
+
+class TickerStatsModel(BaseModel):
+    interval: float = Field(title="Tick interval, in seconds")
+    min_interval: float = Field(title="Shortest tick interval")
+    max_interval: float = Field(title="Longest tick interval")
+    fast_remaining: float = \
+        Field(0, title="Seconds left ticking at the shortest interval")
+    is_ticking: bool = Field(title="Currently ticking")
+    ticks: int = Field(0, title="Ticks run")
+    failures: int = Field(0, title="Ticks failed")
+    consecutive_failures: int = Field(0, title="Ticks failed in a row")
+    skipped_running: int = Field(0, title="Ticks skipped, already ticking")
+    skipped_idle: int = Field(0, title="Ticks skipped, nothing to do")
+    last_duration: Optional[float] = \
+        Field(None, title="Duration of the last tick, in seconds")
+    duration_p50: Optional[float] = Field(None, title="Median tick duration")
+    duration_p90: Optional[float] = \
+        Field(None, title="90th percentile tick duration")
+    duration_p99: Optional[float] = \
+        Field(None, title="99th percentile tick duration")
+    since_success: Optional[float] = \
+        Field(None, title="Seconds since the last successful tick")
+    last_lag: Optional[float] = \
+        Field(None, title="Seconds the last tick started past its deadline")
+    max_lag: float = Field(0, title="Largest lag seen, in seconds")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """ Nearest-rank percentile of sorted 'values'. """
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, int(round(pct * len(values))) - 1))
+    return values[rank]
+
+
 class Ticker(ABC):
+    """ Something to be done periodically, every 'tick_interval' seconds.
+
+    Given 'min_interval' and 'max_interval', the interval adapts within them
+    to how much results change, as reported through 'record_change()': it
+    shortens as they change and grows as they don't. Cluster events may
+    also have it tick at 'min_interval' for a while, with 'fast_probe()'.
+    """
 
-    def __init__(self, name: str, tick_interval: float):
+    def __init__(
+        self,
+        name: str,
+        tick_interval: float,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None
+    ):
+        self._name: str = name
         self._last_tick: float = 0
-        self._tick_interval: float = tick_interval
+        self._tick_interval: float = float(tick_interval)
+        self._min_interval: float = self._tick_interval \
+            if min_interval is None else float(min_interval)
+        self._max_interval: float = self._tick_interval \
+            if max_interval is None else float(max_interval)
+        self._fast_until: float = 0
         self._is_ticking: bool = False
+        self._failures: int = 0
+        self._durations: Deque[float] = deque(maxlen=TICKER_STATS_WINDOW)
+        self._ticks: int = 0
+        self._failures_total: int = 0
+        self._skipped_running: int = 0
+        self._skipped_idle: int = 0
+        self._last_success: Optional[float] = None
+        self._last_lag: Optional[float] = None
+        self._max_lag: float = 0
         gstate.add_ticker(name, self)
 
     @abstractmethod
@@ -41,71 +120,252 @@ class Ticker(ABC):
     async def _should_tick(self) -> bool:
         pass
 
-    async def tick(self) -> None:
-        now: float = time.monotonic()
-        diff: float = (now - self._last_tick)
-        if diff < self._tick_interval or self._is_ticking:
-            return
+    @property
+    def is_ticking(self) -> bool:
+        return self._is_ticking
 
-        if not await self._should_tick():
+    @property
+    def interval(self) -> float:
+        """ Current interval, before backing off or jitter. """
+        if time.monotonic() < self._fast_until:
+            return self._min_interval
+        return self._tick_interval
+
+    def record_change(self, changed: bool) -> None:
+        """ Whether the last results changed from those before. """
+        if changed:
+            interval = self._tick_interval * TICKER_SPEEDUP
+        else:
+            interval = self._tick_interval * TICKER_SLOWDOWN
+        self._tick_interval = \
+            min(self._max_interval, max(self._min_interval, interval))
+
+    def fast_probe(self, duration: float = TICKER_FAST_WINDOW) -> None:
+        """ Tick now, and at the shortest interval for 'duration' seconds,
+        e.g. because the cluster is about to change. """
+        self._fast_until = max(self._fast_until, time.monotonic() + duration)
+        self.trigger()
+
+    def next_interval(self) -> float:
+        """ Seconds until we should tick again, backing off on failures. """
+        interval = self.interval
+        if self._failures > 0:
+            backoff = interval * (2 ** min(self._failures, 10))
+            interval = max(interval, min(backoff, TICKER_MAX_BACKOFF))
+        jitter = interval * TICKER_JITTER
+        return max(0.0, interval + random.uniform(-jitter, jitter))
+
+    async def tick(self) -> None:
+        if self._is_ticking:
+            self._skipped_running += 1
             return
 
         self._is_ticking = True
-        await self._do_tick()
-        self._is_ticking = False
-        self._last_tick = time.monotonic()
+        start = time.monotonic()
+        try:
+            if not await self._should_tick():
+                self._skipped_idle += 1
+                return
+            self._ticks += 1
+            await self._do_tick()
+            self._failures = 0
+            self._last_success = time.monotonic()
+        except Exception as e:
+            self._failures += 1
+            self._failures_total += 1
+            logger.error(
+                f"=> tick {self._name} -- failed "
+                f"({self._failures} in a row): {e}"
+            )
+        finally:
+            self._is_ticking = False
+            self._last_tick = time.monotonic()
+        self._durations.append(self._last_tick - start)
+
+    def record_lag(self, lag: float) -> None:
+        """ How late, in seconds, we were scheduled to tick. """
+        self._last_lag = lag
+        self._max_lag = max(self._max_lag, lag)
+
+    def get_stats(self) -> TickerStatsModel:
+        durations = sorted(self._durations)
+        since_success: Optional[float] = None
+        if self._last_success is not None:
+            since_success = time.monotonic() - self._last_success
+        return TickerStatsModel(
+            interval=self.interval,
+            min_interval=self._min_interval,
+            max_interval=self._max_interval,
+            fast_remaining=max(0.0, self._fast_until - time.monotonic()),
+            is_ticking=self._is_ticking,
+            ticks=self._ticks,
+            failures=self._failures_total,
+            consecutive_failures=self._failures,
+            skipped_running=self._skipped_running,
+            skipped_idle=self._skipped_idle,
+            last_duration=self._durations[-1] if self._durations else None,
+            duration_p50=_percentile(durations, 0.5),
+            duration_p90=_percentile(durations, 0.9),
+            duration_p99=_percentile(durations, 0.99),
+            since_success=since_success,
+            last_lag=self._last_lag,
+            max_lag=self._max_lag
+        )
+
+    def trigger(self) -> None:
+        """ Tick as soon as possible, instead of waiting for our deadline. """
+        gstate.trigger_ticker(self._name)
+
+    def shutdown(self) -> None:
+        """ Release what we hold; called once we no longer tick. """
+        pass
 
 
 class GlobalState:
 
-    executor: ThreadPoolExecutor
     config: Config
     is_shutting_down: bool
     tickers: Dict[str, Ticker]
 
+    # deadlines of tickers not currently ticking, soonest first.
+    _schedule: List[Tuple[float, int, str]]
+    _deadlines: Dict[str, float]
+    _triggered: Set[str]
+    _seq: int
+    _wakeup: Optional[asyncio.Event]
+
     def __init__(self):
-        self.executor = ThreadPoolExecutor()
         self.config = Config()
         self.is_shutting_down = False
         self.tickers = {}
+        self._schedule = []
+        self._deadlines = {}
+        self._triggered = set()
+        self._seq = 0
+        self._wakeup = None
 
     async def start(self) -> None:
         if self.is_shutting_down:
             return
+        get_ceph_conn_mgr().configure(self.config.options.ceph)
+        get_cephadm_scheduler().max_concurrent = \
+            self.config.options.cephadm.max_concurrent
+        get_job_mgr().configure(self.config.options.jobs)
+        get_parse_offloader().configure(self.config.options.parse)
         self.tick_task = asyncio.create_task(self.tick())
 
     async def shutdown(self) -> None:
         self.is_shutting_down = True
         logger.info("shutdown!")
+        self._wake()
         await self.tick_task
+        for desc, ticker in self.tickers.items():
+            try:
+                ticker.shutdown()
+            except Exception as e:
+                logger.error(f"=> tick {desc} -- error shutting down: {e}")
+        # release cluster handles only once nothing else will tick
+        await get_job_mgr().submit_thread(
+            "ceph shutdown", get_ceph_conn_mgr().shutdown
+        ).wait()
+        get_job_mgr().shutdown()
 
     async def run_in_background(self,
-                                func: Callable[[Any, Any], Any],
+                                func: Callable[..., Any],
                                 *args: Any
-                                ):
-        loop = asyncio.get_event_loop()
-        loop.run_in_executor(self.executor, func, *args)
+                                ) -> Job:
+        """ Run 'func' as a tracked job, in the job manager's thread pool. """
+        return get_job_mgr().submit_thread(
+            getattr(func, "__name__", "background"), func, *args
+        )
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _schedule_ticker(self, desc: str, deadline: float) -> None:
+        self._deadlines[desc] = deadline
+        heapq.heappush(self._schedule, (deadline, self._seq, desc))
+        self._seq += 1
+        self._wake()
 
     async def tick(self) -> None:
+        self._wakeup = asyncio.Event()
         while not self.is_shutting_down:
-            logger.debug("=> tick")
-            await asyncio.sleep(1)
             await self._do_ticks()
 
+            timeout = TICKER_MAX_SLEEP
+            if self._schedule:
+                timeout = min(
+                    timeout, self._schedule[0][0] - time.monotonic()
+                )
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
         logger.info("=> tick shutting down")
 
     async def _do_ticks(self) -> None:
-        for desc, ticker in self.tickers.items():
+        now = time.monotonic()
+        while self._schedule and self._schedule[0][0] <= now:
+            deadline, _, desc = heapq.heappop(self._schedule)
+            if self._deadlines.get(desc) != deadline:
+                continue  # removed, or rescheduled since
+            del self._deadlines[desc]
+            ticker = self.tickers[desc]
             logger.debug(f"=> tick {desc}")
-            asyncio.create_task(ticker.tick())
+            ticker.record_lag(now - deadline)
+            asyncio.create_task(self._run_ticker(desc, ticker))
+
+    async def _run_ticker(self, desc: str, ticker: Ticker) -> None:
+        self._triggered.discard(desc)
+        try:
+            await ticker.tick()
+        finally:
+            if self.tickers.get(desc) is ticker:
+                delay = 0.0 if desc in self._triggered \
+                    else ticker.next_interval()
+                self._triggered.discard(desc)
+                self._schedule_ticker(desc, time.monotonic() + delay)
+
+    def trigger_ticker(self, desc: str) -> None:
+        if desc not in self.tickers:
+            return
+        if desc not in self._deadlines:
+            # ticking right now; tick again once done.
+            self._triggered.add(desc)
+            return
+        self._schedule_ticker(desc, time.monotonic())
+
+    def fast_probe(
+        self,
+        *descs: str,
+        duration: float = TICKER_FAST_WINDOW
+    ) -> None:
+        """ Have tickers 'descs', or all of them, tick at their shortest
+        interval for a while; e.g., after changing the cluster. """
+        for desc, ticker in self.tickers.items():
+            if not descs or desc in descs:
+                ticker.fast_probe(duration)
+
+    def get_ticker_stats(self) -> Dict[str, TickerStatsModel]:
+        return {
+            desc: ticker.get_stats() for desc, ticker in self.tickers.items()
+        }
 
     def add_ticker(self, desc: str, whom: Ticker) -> None:
         if desc not in self.tickers:
             self.tickers[desc] = whom
+            self._schedule_ticker(desc, time.monotonic())
 
     def rm_ticker(self, desc: str) -> None:
         if desc in self.tickers:
             del self.tickers[desc]
+            self._deadlines.pop(desc, None)
+            self._triggered.discard(desc)
 
 
 gstate: GlobalState = GlobalState()
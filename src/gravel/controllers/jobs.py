@@ -0,0 +1,283 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import asyncio
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
+from enum import Enum
+from logging import Logger
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi.logger import logger as fastapi_logger
+from pydantic import BaseModel, Field
+
+from gravel.controllers.config import JobsOptionsModel
+
+
+logger: Logger = fastapi_logger
+
+
+class JobError(Exception):
+    pass
+
+
+class JobNotFoundError(JobError):
+    pass
+
+
+class JobStateEnum(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobModel(BaseModel):
+    id: str = Field(title="Job ID")
+    name: str = Field(title="Job name")
+    state: JobStateEnum = Field(JobStateEnum.QUEUED, title="Job state")
+    progress: float = Field(0, title="Progress, from 0 to 1")
+    progress_msg: Optional[str] = Field(None, title="What the job is doing")
+    created: float = Field(title="Creation time, since the epoch")
+    started: Optional[float] = Field(None, title="Start time")
+    finished: Optional[float] = Field(None, title="Finish time")
+    result: Optional[Any] = Field(None, title="Job result, once done")
+    error: Optional[str] = Field(None, title="Why the job failed")
+
+
+class Job:
+    """ Tracks a unit of work run by the job manager. """
+
+    _model: JobModel
+    _task: Optional["asyncio.Future[Any]"]
+    _cfuture: Optional["Future[Any]"]
+
+    def __init__(self, name: str):
+        self._model = JobModel(
+            id=str(uuid.uuid4()),
+            name=name,
+            created=time.time()
+        )
+        self._task = None
+        self._cfuture = None
+
+    @property
+    def id(self) -> str:
+        return self._model.id
+
+    @property
+    def model(self) -> JobModel:
+        return self._model
+
+    @property
+    def is_finished(self) -> bool:
+        return self._model.finished is not None
+
+    def set_progress(self, progress: float, msg: Optional[str] = None) -> None:
+        self._model.progress = min(1.0, max(0.0, progress))
+        if msg is not None:
+            self._model.progress_msg = msg
+
+    def _set_started(self) -> None:
+        if self._model.state == JobStateEnum.QUEUED:
+            self._model.state = JobStateEnum.RUNNING
+            self._model.started = time.time()
+
+    def _set_finished(self, fut: "asyncio.Future[Any]") -> None:
+        self._model.finished = time.time()
+        if fut.cancelled():
+            self._model.state = JobStateEnum.CANCELLED
+        elif fut.exception() is not None:
+            self._model.state = JobStateEnum.FAILED
+            self._model.error = str(fut.exception())
+            logger.error(
+                f"=> jobs -- {self._model.name} ({self.id}) failed: "
+                f"{self._model.error}"
+            )
+        else:
+            self._model.state = JobStateEnum.DONE
+            self._model.progress = 1.0
+            self._model.result = fut.result()
+
+    def add_done_callback(self, func: Callable[["Job"], None]) -> None:
+        """ Call 'func' once the job finishes, even if cancelled before it
+        got to run. """
+        assert self._task
+        self._task.add_done_callback(lambda _: func(self))
+
+    async def wait(self) -> Any:
+        """ Wait for the job's result, or its error, without cancelling the
+        job should we stop waiting. """
+        assert self._task
+        return await asyncio.shield(self._task)
+
+
+class JobMgr:
+    """ Runs and keeps track of jobs, coroutines or functions run in bounded
+    thread and process pools.
+
+    Only the last 'retention' finished jobs are kept.
+    """
+
+    _jobs: Dict[str, Job]
+    _options: JobsOptionsModel
+    _threads: Optional[ThreadPoolExecutor]
+    _processes: Optional[ProcessPoolExecutor]
+
+    def __init__(self):
+        self._jobs = {}
+        self._options = JobsOptionsModel()
+        self._threads = None
+        self._processes = None
+
+    def configure(self, options: JobsOptionsModel) -> None:
+        self._options = options
+
+    def _get_threads(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self._options.max_threads,
+                thread_name_prefix="job"
+            )
+        return self._threads
+
+    def _get_processes(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # by now we have threads and librados state a fork would copy,
+            # locks held included; start workers from a clean process.
+            self._processes = ProcessPoolExecutor(
+                max_workers=self._options.max_processes,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._processes
+
+    def _track(
+        self,
+        job: Job,
+        coro: Awaitable[Any]
+    ) -> Job:
+        self._jobs[job.id] = job
+        task = asyncio.ensure_future(coro)
+        job._task = task
+        task.add_done_callback(job._set_finished)
+        task.add_done_callback(lambda _: self._prune())
+        return job
+
+    def submit(
+        self,
+        name: str,
+        func: Callable[[Job], Awaitable[Any]]
+    ) -> Job:
+        """ Run coroutine function 'func', which is given the job so it can
+        report its progress. """
+        job = Job(name)
+
+        async def _run() -> Any:
+            job._set_started()
+            return await func(job)
+
+        return self._track(job, _run())
+
+    def _submit_to(
+        self,
+        executor: Executor,
+        name: str,
+        func: Callable[..., Any],
+        *args: Any
+    ) -> Job:
+        job = Job(name)
+        if isinstance(executor, ProcessPoolExecutor):
+            job._cfuture = executor.submit(func, *args)
+            job._set_started()  # no telling when a process picks it up
+        else:
+            loop = asyncio.get_event_loop()
+
+            def _run() -> Any:
+                loop.call_soon_threadsafe(job._set_started)
+                return func(*args)
+
+            job._cfuture = executor.submit(_run)
+        return self._track(job, asyncio.wrap_future(job._cfuture))
+
+    def submit_thread(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        *args: Any
+    ) -> Job:
+        """ Run 'func' in the job thread pool. """
+        return self._submit_to(self._get_threads(), name, func, *args)
+
+    def submit_process(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        *args: Any
+    ) -> Job:
+        """ Run 'func' in the job process pool; 'func', its arguments and
+        result must be picklable. """
+        return self._submit_to(self._get_processes(), name, func, *args)
+
+    async def run_in_process(self, func: Callable[..., Any], *args: Any) -> Any:
+        """ Run 'func' in the job process pool, without tracking it as a job;
+        meant for short, CPU bound work that would stall the event loop. """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._get_processes(), func, *args)
+
+    def get(self, job_id: str) -> Job:
+        if job_id not in self._jobs:
+            raise JobNotFoundError(job_id)
+        return self._jobs[job_id]
+
+    def ls(self) -> List[JobModel]:
+        return [job.model for job in self._jobs.values()]
+
+    def cancel(self, job_id: str) -> bool:
+        """ Cancel a job; functions already running in a pool can't be. """
+        job = self.get(job_id)
+        if job.is_finished:
+            return False
+        if job._cfuture is not None:
+            return job._cfuture.cancel()
+        assert job._task
+        return job._task.cancel()
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.is_finished]
+        excess = len(finished) - self._options.retention
+        for job_id in finished[:max(0, excess)]:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        for job in self._jobs.values():
+            if not job.is_finished:
+                self.cancel(job.id)
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False)
+
+
+_job_mgr = JobMgr()
+
+
+def get_job_mgr() -> JobMgr:
+    global _job_mgr
+    return _job_mgr
@@ -325,6 +325,8 @@ class NodeMgr:
         tokenfile.write_text(token.json())
 
         self._load()
+        # the cluster is only starting to take shape.
+        gstate.fast_probe("inventory", "storage")
 
     async def finish_deployment(self) -> None:
         assert self._state
@@ -513,7 +515,7 @@ class NodeMgr:
             return
 
         orch = Orchestrator()
-        pubkey: str = orch.get_public_key()
+        pubkey: str = await orch.get_public_key_async()
 
         logger.debug(f"=> mgr -- handle join > pubkey: {pubkey}")
 
@@ -561,7 +563,7 @@ class NodeMgr:
         logger.info("=> mgr -- handle ready to add > "
                     f"hostname: {node.hostname}, address: {node.address}")
         orch = Orchestrator()
-        if not orch.host_add(node.hostname, node.address):
+        if not await orch.host_add_async(node.hostname, node.address):
             logger.error("=> mgr -- handle ready > failed adding host to orch")
 
 
@@ -0,0 +1,177 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import asyncio
+import threading
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar
+)
+
+
+T = TypeVar("T")
+
+
+class _InFlight:
+    """ A fetch being run by one caller, on behalf of everyone asking. """
+
+    done: threading.Event
+    value: Any
+    error: Optional[BaseException]
+    generation: int
+
+    def __init__(self, generation: int):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.generation = generation
+
+
+class TTLCache:
+    """ Thread-safe, coalescing cache for read-only queries.
+
+    Values are kept for 'ttl' seconds. Concurrent callers asking for a key
+    that is not cached share a single fetch, run by the first of them.
+    Cached values are shared between callers and must be treated as
+    read-only.
+    """
+
+    _ttl: float
+    _entries: Dict[Hashable, Tuple[float, Any]]
+    _inflight: Dict[Hashable, _InFlight]
+    _generation: int
+    _lock: threading.Lock
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._entries = {}
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    @ttl.setter
+    def ttl(self, value: float) -> None:
+        with self._lock:
+            self._ttl = value
+            self._entries.clear()
+
+    def get(self, key: Hashable, fetch: Callable[[], T]) -> T:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stamp, value = entry
+                if time.monotonic() - stamp < self._ttl:
+                    return value
+                del self._entries[key]
+
+            inflight = self._inflight.get(key)
+            is_leader = inflight is None
+            if inflight is None:
+                inflight = _InFlight(self._generation)
+                self._inflight[key] = inflight
+
+        if not is_leader:
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            inflight.value = fetch()
+        except BaseException as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+                # don't keep results that may predate an invalidation.
+                if inflight.error is None and self._ttl > 0 and \
+                   inflight.generation == self._generation:
+                    self._entries[key] = (time.monotonic(), inflight.value)
+            inflight.done.set()
+        return inflight.value
+
+    def invalidate(self) -> None:
+        """ Drop all entries, and have fetches in flight not be kept. """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._inflight.clear()
+
+
+class AsyncTTLCache:
+    """ Coalescing cache for coroutines, to be used from the event loop.
+
+    Like 'TTLCache', but fetches are run as tasks shared by all callers
+    asking for the same key. A caller going away does not cancel the fetch
+    for the others.
+    """
+
+    _ttl: float
+    _entries: Dict[Hashable, Tuple[float, Any]]
+    _inflight: Dict[Hashable, "asyncio.Future[Any]"]
+    _generation: int
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._entries = {}
+        self._inflight = {}
+        self._generation = 0
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    @ttl.setter
+    def ttl(self, value: float) -> None:
+        self._ttl = value
+        self._entries.clear()
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """ Record a value obtained by other means. """
+        if self._ttl > 0:
+            self._entries[key] = (time.monotonic(), value)
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        entry = self._entries.get(key)
+        if entry is not None:
+            stamp, value = entry
+            if time.monotonic() - stamp < self._ttl:
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            generation = self._generation
+
+            def _done(fut: "asyncio.Future[Any]") -> None:
+                if self._inflight.get(key) is fut:
+                    del self._inflight[key]
+                if fut.cancelled() or fut.exception() is not None:
+                    return
+                if generation == self._generation:
+                    self.put(key, fut.result())
+
+            task.add_done_callback(_done)
+
+        return await asyncio.shield(task)
+
+    def invalidate(self) -> None:
+        """ Drop all entries, and have fetches in flight not be kept. """
+        self._generation += 1
+        self._entries.clear()
+        self._inflight.clear()
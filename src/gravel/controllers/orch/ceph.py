@@ -1,17 +1,75 @@
 # project aquarium's backend
 # Copyright (C) 2021 SUSE, LLC.
 
+import asyncio
+import errno
+import math
+import threading
+import time
+from concurrent.futures import Future, wait as wait_futures
+from concurrent.futures.thread import ThreadPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
 from json.decoder import JSONDecodeError
-from gravel.controllers.orch.models \
-    import CephDFModel, CephOSDMapModel, CephOSDPoolEntryModel, CephStatusModel
+from pydantic import BaseModel, Field
+from pydantic.tools import parse_obj_as
+from logging import Logger
+from fastapi.logger import logger as fastapi_logger
+from gravel.controllers.config import CephOptionsModel
+from gravel.controllers.orch.cache import TTLCache
+from gravel.controllers.orch.decode import (
+    construct_list,
+    construct_model,
+    json_loads
+)
+from gravel.controllers.orch.models import (
+    CephDFModel,
+    CephOSDMapModel,
+    CephOSDPoolEntryModel,
+    CephOSDStatModel,
+    CephStatusModel
+)
 import rados
 import json
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Callable, Dict, Any, List
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar
+)
+
+
+logger: Logger = fastapi_logger
 
 
 CEPH_CONF_FILE = '/etc/ceph/ceph.conf'
+CEPH_POOL_SIZE = 2
+CEPH_EXECUTOR_WORKERS = 4
+CEPH_CMD_TIMEOUT = 30.0
+CEPH_CONNECT_TIMEOUT = 10.0
+# how long commands under way get to finish once shutting down.
+CEPH_SHUTDOWN_TIMEOUT = 10.0
+CEPH_BREAKER_THRESHOLD = 3
+CEPH_BREAKER_COOLDOWN = 30.0
+
+# return codes from librados that tell us the handle itself is no longer
+# usable, as opposed to the command having failed.
+_CONN_ERRNOS = (-errno.ETIMEDOUT, -errno.ENOTCONN, -errno.ESHUTDOWN)
+
+# deadline, in monotonic time, of the command being run by this thread, if
+# any; set when running commands on behalf of 'run_async()'.
+_cmd_deadline = threading.local()
+
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
 
 
 class CephError(Exception):
@@ -26,88 +84,718 @@ class CephCommandError(CephError):
     pass
 
 
-class Ceph(ABC):
+class CephTimeoutError(CephCommandError):
+    pass
 
-    cluster: rados.Rados
 
-    def __init__(self, conf_file: str = CEPH_CONF_FILE):
+class CephPoolNotFoundError(CephError):
+    pass
 
-        path = Path(conf_file)
-        if not path.exists():
-            raise FileNotFoundError(conf_file)
 
-        self.cluster = rados.Rados(conffile=conf_file)
-        if not self.cluster:
+def _get_cmd_timeout() -> int:
+    """ librados timeout, in seconds, for the command about to be run. """
+    deadline: Optional[float] = getattr(_cmd_deadline, "value", None)
+    if deadline is None:
+        return 0  # no timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise CephTimeoutError("deadline exceeded")
+    return max(1, math.ceil(remaining))
+
+
+class CephCircuitStateEnum(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CephCircuitModel(BaseModel):
+    state: CephCircuitStateEnum = Field(title="Circuit state")
+    failures: int = Field(title="Consecutive failures")
+    threshold: int = Field(title="Failures before opening")
+    cooldown: float = Field(title="Seconds to wait before probing again")
+    retry_in: float = Field(title="Seconds until the next probe")
+
+
+class CephClientStatusModel(BaseModel):
+    conf_file: str = Field(title="Cluster configuration file")
+    connected: bool = Field(title="Has connected cluster handles")
+    circuit: CephCircuitModel = Field(title="Circuit breaker")
+
+
+class CephCircuitBreaker:
+    """ Stops us from hammering a cluster we can't talk to.
+
+    After 'threshold' consecutive connection failures the circuit opens and
+    requests fail fast with 'CephNotConnectedError'. Once 'cooldown' seconds
+    have passed, a single request is let through to probe the cluster: the
+    circuit closes if it succeeds, and opens again if it fails.
+    """
+
+    _state: CephCircuitStateEnum
+    _failures: int
+    _opened_at: float
+    _probe_started: Optional[float]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        threshold: int = CEPH_BREAKER_THRESHOLD,
+        cooldown: float = CEPH_BREAKER_COOLDOWN
+    ):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._state = CephCircuitStateEnum.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CephCircuitStateEnum:
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """ Whether requests are currently failing fast. """
+        with self._lock:
+            return self._state == CephCircuitStateEnum.OPEN and \
+                time.monotonic() - self._opened_at < self.cooldown
+
+    def allow_request(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == CephCircuitStateEnum.CLOSED:
+                return
+            elif self._state == CephCircuitStateEnum.OPEN:
+                if now - self._opened_at < self.cooldown:
+                    raise CephNotConnectedError("circuit open")
+                logger.info("=> ceph -- circuit > probing cluster")
+                self._state = CephCircuitStateEnum.HALF_OPEN
+                self._probe_started = now
+                return
+
+            assert self._state == CephCircuitStateEnum.HALF_OPEN
+            # let another probe through should the previous one never have
+            # reported back.
+            if self._probe_started is not None and \
+               now - self._probe_started < self.cooldown:
+                raise CephNotConnectedError("circuit open, probing")
+            self._probe_started = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CephCircuitStateEnum.CLOSED:
+                logger.info("=> ceph -- circuit > closed")
+            self._state = CephCircuitStateEnum.CLOSED
+            self._failures = 0
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._state == CephCircuitStateEnum.HALF_OPEN or \
+               self._failures >= self.threshold:
+                if self._state != CephCircuitStateEnum.OPEN:
+                    logger.error(
+                        "=> ceph -- circuit > open after "
+                        f"{self._failures} failures"
+                    )
+                self._state = CephCircuitStateEnum.OPEN
+                self._opened_at = time.monotonic()
+
+    def get_status(self) -> CephCircuitModel:
+        with self._lock:
+            retry_in: float = 0
+            if self._state == CephCircuitStateEnum.OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                retry_in = max(0, self.cooldown - elapsed)
+            return CephCircuitModel(
+                state=self._state,
+                failures=self._failures,
+                threshold=self.threshold,
+                cooldown=self.cooldown,
+                retry_in=retry_in
+            )
+
+
+class CephConnectionPool:
+    """ Small set of long-lived cluster handles for a given config file.
+
+    Handles are connected lazily, handed out round-robin, health-checked
+    before being handed out, and replaced whenever they are found broken.
+    librados handles are thread-safe, so a handle may be shared by several
+    callers at the same time.
+
+    Handles are counted in use from 'get()' until 'put()'. One found
+    broken, or the pool shutting down, takes a handle out of rotation at
+    once, but it is only shut down once its last user is done with it.
+    """
+
+    _conf_file: str
+    _handles: List[Optional[rados.Rados]]
+    _next: int
+    _connecting: Set[int]
+    # users of each handle given out, and those retired, by handle id.
+    _users: Dict[int, int]
+    _retired: Dict[int, rados.Rados]
+    _lock: threading.Lock
+    _cond: threading.Condition
+    _is_shutdown: bool
+    connect_timeout: float
+    breaker: CephCircuitBreaker
+
+    def __init__(
+        self,
+        conf_file: str,
+        size: int = CEPH_POOL_SIZE,
+        connect_timeout: float = CEPH_CONNECT_TIMEOUT
+    ):
+        assert size > 0
+        self._conf_file = conf_file
+        self._handles = [None] * size
+        self._next = 0
+        self._connecting = set()
+        self._users = {}
+        self._retired = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._is_shutdown = False
+        self.connect_timeout = connect_timeout
+        self.breaker = CephCircuitBreaker()
+
+    def _connect(self) -> rados.Rados:
+        cluster = rados.Rados(conffile=self._conf_file)
+        if not cluster:
             raise CephError("error creating cluster handle")
 
         # apparently we can't rely on argument "timeout" because it's not really
         # supported by the C API, and thus the python bindings simply expose it
         # until some day when it's supposed to be dropped.
-        # This is mighty annoying because we can, technically, get stuck here
-        # forever.
+        # So we ask librados to give up on its own, and connect from a
+        # watchdog thread we stop waiting for once our own timeout expires;
+        # should the connection complete after that, it's shut down.
+        timeout = self.connect_timeout
         try:
-            self.cluster.connect()
+            cluster.conf_set("client_mount_timeout", str(math.ceil(timeout)))
         except Exception as e:
-            raise CephError(e) from e
+            logger.debug(f"=> ceph -- pool > unable to set timeout: {e}")
+
+        lock = threading.Lock()
+        done = threading.Event()
+        state: Dict[str, Any] = {"abandoned": False, "error": None}
+
+        def _watchdog() -> None:
+            try:
+                cluster.connect()
+            except Exception as e:
+                state["error"] = e
+            with lock:
+                done.set()
+                if not state["abandoned"]:
+                    return
+            logger.info("=> ceph -- pool > dropping late connection")
+            self._disconnect(cluster)
+
+        threading.Thread(
+            target=_watchdog, name="ceph-connect", daemon=True
+        ).start()
+
+        done.wait(timeout)
+        with lock:
+            if not done.is_set():
+                state["abandoned"] = True
+                raise CephNotConnectedError(
+                    f"timed out connecting after {timeout} seconds"
+                )
+        if state["error"] is not None:
+            raise CephError(state["error"]) from state["error"]
 
         try:
-            self.cluster.require_state("connected")
-        except rados.RadosStateError as e:
+            cluster.require_state("connected")
+        except rados.Error as e:
             raise CephError(e) from e
 
-        self._is_connected = True
+        logger.debug(f"=> ceph -- pool > connected to {self._conf_file}")
+        return cluster
 
-    def __del__(self):
-        if hasattr(self, 'cluster') and self.cluster:
-            self.cluster.shutdown()
-            self._is_connected = False
+    def _is_healthy(self, cluster: rados.Rados) -> bool:
+        try:
+            cluster.require_state("connected")
+        except rados.Error:
+            return False
+        return True
 
-    def is_connected(self):
-        return self._is_connected
+    def _disconnect(self, cluster: rados.Rados) -> None:
+        try:
+            cluster.shutdown()
+        except Exception as e:
+            logger.debug(f"=> ceph -- pool > error shutting down handle: {e}")
+
+    def _acquire(self, cluster: rados.Rados) -> rados.Rados:
+        # with the lock held.
+        self._users[id(cluster)] = self._users.get(id(cluster), 0) + 1
+        return cluster
+
+    def _retire(self, cluster: rados.Rados) -> bool:
+        """ With the lock held, take 'cluster' out of rotation; whether it
+        is unused, and may be shut down right away. """
+        for idx, handle in enumerate(self._handles):
+            if handle is cluster:
+                self._handles[idx] = None
+        if self._users.get(id(cluster), 0) > 0:
+            self._retired[id(cluster)] = cluster
+            return False
+        return True
+
+    def get(self) -> rados.Rados:
+        """ A handle, in use until given back with 'put()'. """
+        stale: Optional[rados.Rados] = None
+        with self._lock:
+            while True:
+                if self._is_shutdown:
+                    raise CephNotConnectedError(
+                        "connection pool has shut down"
+                    )
+                self.breaker.allow_request()
+
+                idx = self._next
+                self._next = (self._next + 1) % len(self._handles)
+                if idx not in self._connecting:
+                    break
+                # someone else is connecting it; see how that went.
+                self._cond.wait()
+
+            cluster = self._handles[idx]
+            if cluster is not None and not self._is_healthy(cluster):
+                logger.info("=> ceph -- pool > reconnecting unhealthy handle")
+                if self._retire(cluster):
+                    stale = cluster
+                cluster = None
+            if cluster is not None:
+                return self._acquire(cluster)
+            # connecting may take a while; don't keep others waiting.
+            self._connecting.add(idx)
+
+        if stale is not None:
+            self._disconnect(stale)
+        cluster = None
+        published = False
+        try:
+            cluster = self._connect()
+        except CephError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            with self._lock:
+                self._connecting.discard(idx)
+                self._cond.notify_all()
+                if cluster is not None and not self._is_shutdown:
+                    self._handles[idx] = self._acquire(cluster)
+                    published = True
+        if not published:
+            self._disconnect(cluster)
+            raise CephNotConnectedError("connection pool has shut down")
+        return cluster
+
+    def put(self, cluster: rados.Rados) -> None:
+        """ Done using a handle obtained with 'get()'. """
+        with self._lock:
+            users = self._users.get(id(cluster), 0) - 1
+            if users > 0:
+                self._users[id(cluster)] = users
+                return
+            self._users.pop(id(cluster), None)
+            if self._retired.pop(id(cluster), None) is None:
+                return
+        self._disconnect(cluster)
+
+    @contextmanager
+    def use(self) -> Iterator[rados.Rados]:
+        """ A handle, for the duration of the 'with' block. """
+        cluster = self.get()
+        try:
+            yield cluster
+        finally:
+            self.put(cluster)
+
+    def invalidate(self, cluster: rados.Rados) -> None:
+        """ Drop a handle found broken; it will be replaced on next use, and
+        shut down once no one is using it. """
+        with self._lock:
+            if not any(h is cluster for h in self._handles):
+                return
+            unused = self._retire(cluster)
+        if unused:
+            self._disconnect(cluster)
+
+    def is_connected(self) -> bool:
+        # no lock: this is read from the event loop, and shouldn't wait on
+        # those connecting.
+        return any(h is not None for h in self._handles)
 
-    def assert_is_ready(self):
-        if not self.cluster or not self.is_connected():
-            raise CephNotConnectedError()
+    @property
+    def is_shutdown(self) -> bool:
+        return self._is_shutdown
+
+    def get_status(self) -> CephClientStatusModel:
+        return CephClientStatusModel(
+            conf_file=self._conf_file,
+            connected=self.is_connected(),
+            circuit=self.breaker.get_status()
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._is_shutdown = True
+            handles = [h for h in self._handles if h is not None]
+            handles = [h for h in handles if self._retire(h)]
+            self._cond.notify_all()
+        for cluster in handles:
+            self._disconnect(cluster)
+
+
+class CephOSDMap:
+    """ Parsed OSD map for a given epoch, indexed for pool lookups. """
+
+    osdmap: CephOSDMapModel
+    pools_by_id: Dict[int, CephOSDPoolEntryModel]
+    pools_by_name: Dict[str, CephOSDPoolEntryModel]
+
+    def __init__(self, osdmap: CephOSDMapModel):
+        self.osdmap = osdmap
+        self.pools_by_id = {p.pool: p for p in osdmap.pools}
+        self.pools_by_name = {p.pool_name: p for p in osdmap.pools}
 
     @property
-    def fsid(self) -> str:
-        self.assert_is_ready()
+    def epoch(self) -> int:
+        return self.osdmap.epoch
+
+
+class CephConnMgr:
+    """ Process-wide registry of connection pools, one per config file.
+
+    Also owns the executor on which blocking cluster commands are run when
+    called from the event loop, and the per-cluster cache of read-only
+    query results.
+    """
+
+    _pools: Dict[str, CephConnectionPool]
+    _caches: Dict[str, TTLCache]
+    _osdmaps: Dict[str, CephOSDMap]
+    _options: CephOptionsModel
+    _lock: threading.Lock
+    _is_shutdown: bool
+    _executor: ThreadPoolExecutor
+    _running: Set["Future[Any]"]
+
+    def __init__(
+        self,
+        pool_size: int = CEPH_POOL_SIZE,
+        workers: int = CEPH_EXECUTOR_WORKERS
+    ):
+        self._pools = {}
+        self._pool_size = pool_size
+        self._caches = {}
+        self._osdmaps = {}
+        self._options = CephOptionsModel()
+        self._lock = threading.Lock()
+        self._is_shutdown = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="ceph"
+        )
+        self._running = set()
+
+    def get_pool(self, conf_file: str) -> CephConnectionPool:
+        with self._lock:
+            if self._is_shutdown:
+                raise CephNotConnectedError("connection manager has shut down")
+            if conf_file not in self._pools:
+                pool = CephConnectionPool(conf_file, self._pool_size)
+                self._configure_pool(pool)
+                self._pools[conf_file] = pool
+            return self._pools[conf_file]
+
+    def _configure_pool(self, pool: CephConnectionPool) -> None:
+        pool.connect_timeout = self._options.connect_timeout
+        pool.breaker.threshold = self._options.breaker_threshold
+        pool.breaker.cooldown = self._options.breaker_cooldown
+
+    def get_cache(self, conf_file: str) -> TTLCache:
+        with self._lock:
+            if conf_file not in self._caches:
+                self._caches[conf_file] = TTLCache(self._options.cache_ttl)
+            return self._caches[conf_file]
+
+    def get_osdmap(self, conf_file: str) -> Optional[CephOSDMap]:
+        """ Latest OSD map obtained from the cluster, if any. """
+        with self._lock:
+            return self._osdmaps.get(conf_file)
+
+    def set_osdmap(self, conf_file: str, osdmap: CephOSDMap) -> None:
+        with self._lock:
+            current = self._osdmaps.get(conf_file)
+            if current is None or current.epoch <= osdmap.epoch:
+                self._osdmaps[conf_file] = osdmap
+
+    @property
+    def trusted_models(self) -> bool:
+        """ Whether to build models from cluster replies without validating
+        them. """
+        return self._options.trusted_models
+
+    def configure(self, options: CephOptionsModel) -> None:
+        with self._lock:
+            self._options = options
+            for pool in self._pools.values():
+                self._configure_pool(pool)
+            for cache in self._caches.values():
+                cache.ttl = options.cache_ttl
+
+    def get_status(self) -> List[CephClientStatusModel]:
+        with self._lock:
+            pools = list(self._pools.values())
+        return [pool.get_status() for pool in pools]
+
+    async def run_async(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> T:
+        """ Run a blocking cluster operation without blocking the loop.
+
+        If 'timeout' is specified, commands issued by 'func' are bound by it
+        and we raise 'CephTimeoutError' once it expires. Should we time out
+        or be cancelled before 'func' gets to run, it will not run at all.
+        """
+        if self._is_shutdown:
+            raise CephNotConnectedError("connection manager has shut down")
+
+        deadline: Optional[float] = None
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+
+        def _run() -> T:
+            _cmd_deadline.value = deadline
+            try:
+                return func(*args)
+            finally:
+                _cmd_deadline.value = None
+
+        cfut = self._executor.submit(_run)
+        with self._lock:
+            self._running.add(cfut)
+        cfut.add_done_callback(self._done)
         try:
-            return self.cluster.get_fsid()
-        except Exception as e:
-            raise CephError(e)
+            return await asyncio.wait_for(asyncio.wrap_future(cfut), timeout)
+        except asyncio.TimeoutError as e:
+            raise CephTimeoutError(
+                f"timed out after {timeout} seconds"
+            ) from e
+
+    def _done(self, cfut: "Future[Any]") -> None:
+        with self._lock:
+            self._running.discard(cfut)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._is_shutdown = True
+            pools = list(self._pools.values())
+            running = list(self._running)
+        logger.info("=> ceph -- shutting down connections")
+        self._executor.shutdown(wait=False)
+        # drop what hasn't started, and give the rest a while to finish;
+        # handles still in use after that are shut down once released.
+        for cfut in running:
+            cfut.cancel()
+        wait_futures(running, timeout=CEPH_SHUTDOWN_TIMEOUT)
+        for pool in pools:
+            pool.shutdown()
 
-    def _cmd(self, func: Callable[[str, bytes], Any],
+
+_conn_mgr: CephConnMgr = CephConnMgr()
+
+
+def get_ceph_conn_mgr() -> CephConnMgr:
+    return _conn_mgr
+
+
+class Ceph(ABC):
+
+    _conf_file: str
+    _pool: CephConnectionPool
+    _cache: TTLCache
+
+    def __init__(self, conf_file: str = CEPH_CONF_FILE):
+
+        path = Path(conf_file)
+        if not path.exists():
+            raise FileNotFoundError(conf_file)
+
+        self._conf_file = conf_file
+        self._pool = get_ceph_conn_mgr().get_pool(conf_file)
+        self._cache = get_ceph_conn_mgr().get_cache(conf_file)
+
+    @contextmanager
+    def _use_cluster(self) -> Iterator[rados.Rados]:
+        """ A connected cluster handle, shared with other users, for the
+        duration of the 'with' block. """
+        self.assert_is_ready()
+        with self._pool.use() as cluster:
+            yield cluster
+
+    def is_connected(self) -> bool:
+        return self._pool.is_connected()
+
+    def assert_is_ready(self) -> None:
+        if self._pool.is_shutdown:
+            raise CephNotConnectedError()
+
+    @property
+    def fsid(self) -> str:
+        with self._use_cluster() as cluster:
+            try:
+                return cluster.get_fsid()
+            except Exception as e:
+                raise CephError(e)
+
+    def _cmd(self, cluster: rados.Rados,
+             func: Callable[..., Any],
              cmd: Dict[str, Any]
              ) -> Any:
-        self.assert_is_ready()
+        timeout: int = _get_cmd_timeout()
         try:
             cmdstr: str = json.dumps(cmd)
-            rc, out, outstr = func(cmdstr, b"")
+            rc, out, outstr = func(cmdstr, b"", timeout=timeout)
             res: Dict[str, Any] = {}
+            if rc == -errno.ETIMEDOUT and timeout > 0:
+                # our own deadline expired; says nothing of the connection.
+                raise CephTimeoutError(outstr)
+            if rc in _CONN_ERRNOS:
+                self._pool.breaker.record_failure()
+                self._pool.invalidate(cluster)
+            else:
+                self._pool.breaker.record_success()
             if rc != 0:
                 raise CephCommandError(outstr)
             if out:
                 try:
-                    res = json.loads(out)
+                    res = json_loads(out)
                 except JSONDecodeError:  # maybe free-form?
                     res = {"result": out}
             elif outstr:  # assume 'outstr' always as free-form text
                 res = {"result": outstr}
             return res
+        except CephTimeoutError:
+            raise
+        except rados.Error as e:
+            self._pool.breaker.record_failure()
+            self._pool.invalidate(cluster)
+            raise CephCommandError(e) from e
         except Exception as e:
             raise CephCommandError(e) from e
 
     def mon(self, cmd: Dict[str, Any]) -> Any:
-        return self._cmd(self.cluster.mon_command, cmd)
+        with self._use_cluster() as cluster:
+            return self._cmd(cluster, cluster.mon_command, cmd)
 
     def mgr(self, cmd: Dict[str, Any]) -> Any:
-        return self._cmd(self.cluster.mgr_command, cmd)
+        with self._use_cluster() as cluster:
+            return self._cmd(cluster, cluster.mgr_command, cmd)
 
     @abstractmethod
     def call(self, cmd: Dict[str, Any]) -> Any:
         raise NotImplementedError("method 'call' has not been implemented")
 
+    def parse_model(self, model: Type[M], data: Dict[str, Any]) -> M:
+        if get_ceph_conn_mgr().trusted_models:
+            return construct_model(model, data)
+        return model.parse_obj(data)
+
+    def parse_model_list(
+        self, model: Type[M], data: List[Dict[str, Any]]
+    ) -> List[M]:
+        if get_ceph_conn_mgr().trusted_models:
+            return construct_list(model, data)
+        return parse_obj_as(List[model], data)  # type: ignore
+
+    def cached(self, key: str, fetch: Callable[[], T]) -> T:
+        """ Result of read-only query 'key', shared with concurrent callers
+        and reused while fresh. """
+        return self._cache.get(key, fetch)
+
+    def invalidate_cache(self) -> None:
+        """ To be called after changing the cluster's state. """
+        self._cache.invalidate()
+
+    async def run_async(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> T:
+        # don't even queue requests that would fail fast anyway.
+        if self._pool.breaker.is_open:
+            raise CephNotConnectedError("circuit open")
+        return await get_ceph_conn_mgr().run_async(
+            func, *args, timeout=timeout
+        )
+
+    async def call_async(
+        self,
+        cmd: Dict[str, Any],
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> Any:
+        return await self.run_async(self.call, cmd, timeout=timeout)
+
+
+class CephBatch:
+    """ Independent cluster operations, run concurrently.
+
+    Operations may be raw commands, or blocking methods of 'Mon', 'Mgr' and
+    friends; they are run on the connection manager's executor, and the
+    whole batch takes as long as its slowest operation.
+    """
+
+    _ops: List[Tuple[Callable[..., Any], Tuple[Any, ...]]]
+    _timeout: Optional[float]
+
+    def __init__(self, timeout: Optional[float] = CEPH_CMD_TIMEOUT):
+        self._ops = []
+        self._timeout = timeout
+
+    def add(self, func: Callable[..., Any], *args: Any) -> int:
+        """ Add an operation, returning its index in the results. """
+        self._ops.append((func, args))
+        return len(self._ops) - 1
+
+    def add_cmd(self, ceph: "Ceph", cmd: Dict[str, Any]) -> int:
+        return self.add(ceph.call, cmd)
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    async def run(self, return_exceptions: bool = False) -> List[Any]:
+        """ Run all operations, returning their results in order.
+
+        Errors are returned in place of results if 'return_exceptions' is
+        set; otherwise we wait for all operations and then raise the first
+        error found.
+        """
+        mgr = get_ceph_conn_mgr()
+        results: List[Any] = await asyncio.gather(*[
+            mgr.run_async(func, *args, timeout=self._timeout)
+            for func, args in self._ops
+        ], return_exceptions=True)
+        if not return_exceptions:
+            for res in results:
+                if isinstance(res, BaseException):
+                    raise res
+        return results
+
 
 class Mgr(Ceph):
 
@@ -132,29 +820,65 @@ class Mon(Ceph):
             "prefix": "status",
             "format": "json"
         }
-        result: Dict[str, Any] = self.call(cmd)  # propagate exception
-        return CephStatusModel.parse_obj(result)
+        return self.cached(
+            "status",
+            lambda: self.parse_model(CephStatusModel, self.call(cmd))
+        )  # propagate exception
 
     def df(self) -> CephDFModel:
         cmd: Dict[str, str] = {
             "prefix": "df",
             "format": "json"
         }
-        result: Dict[str, Any] = self.call(cmd)
-        return CephDFModel.parse_obj(result)
+        return self.cached(
+            "df",
+            lambda: self.parse_model(CephDFModel, self.call(cmd))
+        )
+
+    def _get_osdmap(self) -> CephOSDMap:
+        """ Obtain the OSD map, re-downloading it only if its epoch moved. """
+        mgr = get_ceph_conn_mgr()
+
+        def _fetch() -> CephOSDMap:
+            stat = self.parse_model(
+                CephOSDStatModel,
+                self.call({"prefix": "osd stat", "format": "json"})
+            )
+            current = mgr.get_osdmap(self._conf_file)
+            if current is not None and current.epoch == stat.epoch:
+                return current
+
+            cmd: Dict[str, str] = {
+                "prefix": "osd dump",
+                "format": "json"
+            }
+            osdmap = CephOSDMap(
+                self.parse_model(CephOSDMapModel, self.call(cmd))
+            )
+            mgr.set_osdmap(self._conf_file, osdmap)
+            return osdmap
+
+        return self.cached("osd dump", _fetch)
 
     def get_osdmap(self) -> CephOSDMapModel:
-        cmd: Dict[str, str] = {
-            "prefix": "osd dump",
-            "format": "json"
-        }
-        result: Dict[str, Any] = self.call(cmd)
-        return CephOSDMapModel.parse_obj(result)
+        return self._get_osdmap().osdmap
 
     def get_pools(self) -> List[CephOSDPoolEntryModel]:
         osdmap = self.get_osdmap()
         return osdmap.pools
 
+    def get_pool(self, name: str) -> CephOSDPoolEntryModel:
+        pools = self._get_osdmap().pools_by_name
+        if name not in pools:
+            raise CephPoolNotFoundError(f"unknown pool {name}")
+        return pools[name]
+
+    def get_pool_by_id(self, id: int) -> CephOSDPoolEntryModel:
+        pools = self._get_osdmap().pools_by_id
+        if id not in pools:
+            raise CephPoolNotFoundError(f"unknown pool id {id}")
+        return pools[id]
+
     def set_pool_size(self, name: str, size: int) -> None:
         cmd: Dict[str, str] = {
             "prefix": "osd pool set",
@@ -162,4 +886,39 @@ class Mon(Ceph):
             "var": "size",
             "val": str(size)
         }
-        self.call(cmd)
+        try:
+            self.call(cmd)
+        finally:
+            self.invalidate_cache()
+
+    async def status_async(
+        self, timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> CephStatusModel:
+        return await self.run_async(lambda: self.status, timeout=timeout)
+
+    async def df_async(
+        self, timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> CephDFModel:
+        return await self.run_async(self.df, timeout=timeout)
+
+    async def get_osdmap_async(
+        self, timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> CephOSDMapModel:
+        return await self.run_async(self.get_osdmap, timeout=timeout)
+
+    async def get_pools_async(
+        self, timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> List[CephOSDPoolEntryModel]:
+        return await self.run_async(self.get_pools, timeout=timeout)
+
+    async def get_pool_async(
+        self, name: str,
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> CephOSDPoolEntryModel:
+        return await self.run_async(self.get_pool, name, timeout=timeout)
+
+    async def set_pool_size_async(
+        self, name: str, size: int,
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> None:
+        await self.run_async(self.set_pool_size, name, size, timeout=timeout)
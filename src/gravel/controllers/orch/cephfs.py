@@ -2,10 +2,14 @@
 # Copyright (C) 2021 SUSE, LLC.
 
 
-from typing import List
+from typing import List, Optional
 
-from pydantic.tools import parse_obj_as
-from gravel.controllers.orch.ceph import CephCommandError, Mgr, Mon
+from gravel.controllers.orch.ceph import (
+    CEPH_CMD_TIMEOUT,
+    CephCommandError,
+    Mgr,
+    Mon
+)
 
 from gravel.controllers.orch.models \
     import CephFSListEntryModel, CephFSNameModel, CephFSVolumeListModel
@@ -27,6 +31,12 @@ class CephFS:
         pass
 
     def create(self, name: str) -> None:
+        self.volume_create(name)
+        # schedule orchestrator to update the number of mds instances
+        orch = Orchestrator()
+        orch.apply_mds(name)
+
+    def volume_create(self, name: str) -> None:
 
         cmd = {
             "prefix": "fs volume create",
@@ -37,10 +47,8 @@ class CephFS:
             self.mgr.call(cmd)
         except CephCommandError as e:
             raise CephFSError(e) from e
-
-        # schedule orchestrator to update the number of mds instances
-        orch = Orchestrator()
-        orch.apply_mds(name)
+        finally:
+            self.mgr.invalidate_cache()
 
     def volume_ls(self) -> CephFSVolumeListModel:
 
@@ -53,7 +61,7 @@ class CephFS:
         except CephCommandError as e:
             raise CephFSError(e) from e
         return CephFSVolumeListModel(
-            volumes=parse_obj_as(List[CephFSNameModel], res)
+            volumes=self.mgr.parse_model_list(CephFSNameModel, res)
         )
 
     def ls(self) -> List[CephFSListEntryModel]:
@@ -62,10 +70,14 @@ class CephFS:
             "format": "json"
         }
         try:
-            res = self.mon.call(cmd)
+            return self.mon.cached(
+                "fs ls",
+                lambda: self.mon.parse_model_list(
+                    CephFSListEntryModel, self.mon.call(cmd)
+                )
+            )
         except CephCommandError as e:
             raise CephFSError(e) from e
-        return parse_obj_as(List[CephFSListEntryModel], res)
 
     def get_fs_info(self, name: str) -> CephFSListEntryModel:
         ls: List[CephFSListEntryModel] = self.ls()
@@ -73,3 +85,23 @@ class CephFS:
             if fs.name == name:
                 return fs
         raise CephFSError(f"unknown filesystem {name}")
+
+    async def create_async(
+        self, name: str,
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> None:
+        await self.mgr.run_async(self.create, name, timeout=timeout)
+
+    async def volume_create_async(
+        self, name: str,
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> None:
+        await self.mgr.run_async(self.volume_create, name, timeout=timeout)
+
+    async def get_fs_info_async(
+        self, name: str,
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> CephFSListEntryModel:
+        return await self.mon.run_async(
+            self.get_fs_info, name, timeout=timeout
+        )
@@ -0,0 +1,168 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import json
+from typing import Any, Callable, Dict, List, Tuple, Type, TypeVar, Union
+
+from pydantic import BaseModel, ValidationError
+from pydantic.tools import parse_obj_as
+
+from gravel.controllers.config import ParseOptionsModel
+from gravel.controllers.jobs import get_job_mgr
+
+
+try:
+    import orjson
+
+    def json_loads(data: Union[str, bytes]) -> Any:
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+        return orjson.loads(data)
+
+    JSON_BACKEND = "orjson"
+except ImportError:
+
+    def json_loads(data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    JSON_BACKEND = "json"
+
+
+M = TypeVar("M", bound=BaseModel)
+
+_Converter = Callable[[Any], Any]
+
+# per model, the fields that are present in it and how to build their values.
+_plans: Dict[Type[BaseModel], List[Tuple[str, str, _Converter]]] = {}
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _get_converter(tp: Any) -> _Converter:
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        model: Type[BaseModel] = tp
+
+        def _model(value: Any) -> Any:
+            if isinstance(value, dict):
+                return construct_model(model, value)
+            return value
+        return _model
+
+    origin = getattr(tp, "__origin__", None)
+    args: Tuple[Any, ...] = getattr(tp, "__args__", None) or ()
+    if origin is list and len(args) == 1:
+        conv = _get_converter(args[0])
+        if conv is _identity:
+            return _identity
+
+        def _list(value: Any) -> Any:
+            if isinstance(value, list):
+                return [conv(v) for v in value]
+            return value
+        return _list
+
+    if origin is dict and len(args) == 2:
+        conv = _get_converter(args[1])
+        if conv is _identity:
+            return _identity
+
+        def _dict(value: Any) -> Any:
+            if isinstance(value, dict):
+                return {k: conv(v) for k, v in value.items()}
+            return value
+        return _dict
+
+    return _identity
+
+
+def _get_plan(model: Type[BaseModel]) -> List[Tuple[str, str, _Converter]]:
+    plan = _plans.get(model)
+    if plan is None:
+        plan = [
+            (name, field.alias, _get_converter(field.outer_type_))
+            for name, field in model.__fields__.items()
+        ]
+        _plans[model] = plan
+    return plan
+
+
+def construct_model(model: Type[M], data: Dict[str, Any]) -> M:
+    """ Build 'model', and its nested models, from trusted data.
+
+    Unlike 'parse_obj()', values are neither validated nor coerced; fields
+    missing from 'data' take their defaults and unknown keys are dropped.
+    Only meant for data coming straight from the cluster.
+    """
+    values: Dict[str, Any] = {}
+    for name, alias, conv in _get_plan(model):
+        if alias in data:
+            values[name] = conv(data[alias])
+    return model.construct(**values)
+
+
+def construct_list(model: Type[M], data: List[Dict[str, Any]]) -> List[M]:
+    return [construct_model(model, entry) for entry in data]
+
+
+class DecodeError(ValueError):
+    """ Malformed or invalid data; unlike pydantic's 'ValidationError', it
+    survives being sent back from another process. """
+    pass
+
+
+def decode_obj_as(tp: Any, data: Any) -> Any:
+    try:
+        return parse_obj_as(tp, data)
+    except ValidationError as e:
+        raise DecodeError(str(e)) from None
+
+
+def decode_json_as(tp: Any, data: Union[str, bytes]) -> Any:
+    try:
+        return decode_obj_as(tp, json_loads(data))
+    except json.JSONDecodeError as e:
+        raise DecodeError(str(e)) from None
+
+
+class ParseOffloader:
+    """ Decides whether parsing a reply into models happens here, or in the
+    job manager's process pool so it doesn't stall the event loop.
+
+    Only large enough replies are worth sending to another process.
+    """
+
+    _options: ParseOptionsModel
+
+    def __init__(self):
+        self._options = ParseOptionsModel()
+
+    def configure(self, options: ParseOptionsModel) -> None:
+        self._options = options
+
+    async def parse_json_as(self, tp: Any, data: Union[str, bytes]) -> Any:
+        """ 'data' parsed as 'tp'; raises 'DecodeError'. """
+        if self._options.offload and \
+           len(data) >= self._options.offload_min_bytes:
+            return await get_job_mgr().run_in_process(
+                decode_json_as, tp, data
+            )
+        return decode_json_as(tp, data)
+
+    async def parse_obj_as(self, tp: Any, data: Any, items: int) -> Any:
+        """ Already decoded 'data', with 'items' entries worth of models,
+        parsed as 'tp'; raises 'DecodeError'. """
+        if self._options.offload and \
+           items >= self._options.offload_min_items:
+            return await get_job_mgr().run_in_process(
+                decode_obj_as, tp, data
+            )
+        return decode_obj_as(tp, data)
+
+
+_offloader = ParseOffloader()
+
+
+def get_parse_offloader() -> ParseOffloader:
+    global _offloader
+    return _offloader
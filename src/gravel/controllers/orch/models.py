@@ -95,6 +95,10 @@ class CephOSDPoolEntryModel(BaseModel):
     min_size: int
 
 
+class CephOSDStatModel(BaseModel):
+    epoch: int
+
+
 class CephOSDMapModel(BaseModel):
     epoch: int
     fsid: str
@@ -1,15 +1,17 @@
 # project aquarium's backend
 # Copyright (C) 2021 SUSE, LLC.
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from logging import Logger
 from fastapi.logger import logger as fastapi_logger
 from pydantic.tools import parse_obj_as
 from gravel.controllers.orch.ceph import (
+    CEPH_CMD_TIMEOUT,
     CephCommandError,
     Mgr
 )
+from gravel.controllers.orch.decode import get_parse_offloader
 from gravel.controllers.orch.models import (
     OrchDevicesPerHostModel,
     OrchHostListModel
@@ -41,17 +43,36 @@ class Orchestrator:
         res = self.call(cmd)
         return parse_obj_as(List[OrchDevicesPerHostModel], res)
 
+    async def devices_ls_async(
+        self, timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> List[OrchDevicesPerHostModel]:
+        """ As 'devices_ls()', but large replies may be parsed in another
+        process. """
+        cmd = {"prefix": "orch device ls"}
+        res = await self.cluster.run_async(self.call, cmd, timeout=timeout)
+        # always validated: ceph-volume's replies need coercing.
+        ndevs = sum(len(host.get("devices", [])) for host in res)
+        return await get_parse_offloader().parse_obj_as(
+            List[OrchDevicesPerHostModel], res, ndevs
+        )
+
     def assimilate_all_devices(self) -> None:
         cmd = {
             "prefix": "orch apply osd",
             "all_available_devices": True
         }
-        res = self.call(cmd)
+        try:
+            res = self.call(cmd)
+        finally:
+            self.cluster.invalidate_cache()
         assert "result" in res
 
     def all_devices_assimilated(self) -> bool:
-        res = self.devices_ls()
-        for host in res:
+        return self._all_assimilated(self.devices_ls())
+
+    @staticmethod
+    def _all_assimilated(hosts: List[OrchDevicesPerHostModel]) -> bool:
+        for host in hosts:
             for dev in host.devices:
                 if dev.available:
                     return False
@@ -89,3 +110,39 @@ class Orchestrator:
             )
             return False
         return True
+
+    async def call_async(
+        self,
+        cmd: Dict[str, Any],
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> Any:
+        return await self.cluster.run_async(self.call, cmd, timeout=timeout)
+
+    async def assimilate_all_devices_async(
+        self, timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> None:
+        await self.cluster.run_async(
+            self.assimilate_all_devices, timeout=timeout
+        )
+
+    async def all_devices_assimilated_async(
+        self, timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> bool:
+        return self._all_assimilated(
+            await self.devices_ls_async(timeout=timeout)
+        )
+
+    async def get_public_key_async(
+        self, timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> str:
+        return await self.cluster.run_async(
+            self.get_public_key, timeout=timeout
+        )
+
+    async def host_add_async(
+        self, hostname: str, address: str,
+        timeout: Optional[float] = CEPH_CMD_TIMEOUT
+    ) -> bool:
+        return await self.cluster.run_async(
+            self.host_add, hostname, address, timeout=timeout
+        )
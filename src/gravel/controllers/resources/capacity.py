@@ -0,0 +1,328 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import mmap
+import os
+import struct
+from array import array
+from logging import Logger
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi.logger import logger as fastapi_logger
+from pydantic.fields import Field
+from pydantic.main import BaseModel
+from gravel.controllers.config import CapacityTierOptionsModel
+
+
+logger: Logger = fastapi_logger
+
+
+_MAGIC = b"AQCAPRRD"
+_VERSION = 1
+# magic, version, max series, number of tiers
+_HEADER = struct.Struct("<8sIII")
+_TIER = struct.Struct("<II")  # step, rows
+_MAX_TIERS = 8
+# per series: name, and when it was last updated.
+_NAME_LEN = 56
+_SERIES = struct.Struct(f"<{_NAME_LEN}sd")
+
+
+class CapacityPointModel(BaseModel):
+    timestamp: float = Field(title="Slot start, since the epoch")
+    value: float = Field(title="Average over the slot")
+
+
+class CapacityStoreError(Exception):
+    pass
+
+
+def _align(n: int, to: int = 8) -> int:
+    return (n + to - 1) // to * to
+
+
+class _Tier:
+    """ Views into the store's file for one tier: each slot's start time,
+    and per series, the slot's average and how many samples it averages. """
+
+    step: int
+    rows: int
+    times: "memoryview[float]"
+    values: "memoryview[float]"
+    counts: "memoryview[int]"
+
+    def __init__(self, mm: mmap.mmap, offset: int, step: int, rows: int,
+                 max_series: int):
+        self.step = step
+        self.rows = rows
+        n = rows * 8
+        self.times = memoryview(mm)[offset:offset + n].cast("d")
+        offset += n
+        n = rows * max_series * 8
+        self.values = memoryview(mm)[offset:offset + n].cast("d")
+        offset += n
+        n = rows * max_series * 4
+        self.counts = memoryview(mm)[offset:offset + n].cast("I")
+
+    @staticmethod
+    def size(rows: int, max_series: int) -> int:
+        return _align(rows * 8 + rows * max_series * 12)
+
+    def release(self) -> None:
+        self.times.release()
+        self.values.release()
+        self.counts.release()
+
+
+class CapacityStore:
+    """ Round-robin store of capacity time series, RRD style.
+
+    Each tier keeps 'rows' slots of 'step' seconds, and samples falling into
+    a slot are averaged. All of it lives in a memory-mapped file, so that it
+    survives restarts without growing our heap. A file laid out for other
+    tiers, or for a different number of series, is started over.
+
+    Series are named; once 'max_series' are in use, a series not updated
+    for as long as the longest tier lasts is reclaimed for a new one. New
+    series finding no room are not kept, and listed in 'dropped'.
+    """
+
+    _path: Path
+    _tiers_cfg: List[CapacityTierOptionsModel]
+    _max_series: int
+    _file: Optional[int]
+    _mm: Optional[mmap.mmap]
+    _tiers: List[_Tier]
+    _series: Dict[str, int]
+    _series_off: int
+    _dropped: Set[str]
+
+    def __init__(
+        self,
+        path: Path,
+        tiers: List[CapacityTierOptionsModel],
+        max_series: int
+    ):
+        if not tiers or len(tiers) > _MAX_TIERS:
+            raise CapacityStoreError(f"between 1 and {_MAX_TIERS} tiers")
+        self._path = path
+        self._tiers_cfg = sorted(tiers, key=lambda t: t.step)
+        self._max_series = max_series
+        self._file = None
+        self._mm = None
+        self._tiers = []
+        self._series = {}
+        self._series_off = _HEADER.size + _TIER.size * _MAX_TIERS
+        self._dropped = set()
+
+    def _header(self) -> bytes:
+        hdr = _HEADER.pack(
+            _MAGIC, _VERSION, self._max_series, len(self._tiers_cfg)
+        )
+        for tier in self._tiers_cfg:
+            hdr += _TIER.pack(tier.step, tier.rows)
+        return hdr
+
+    def _size(self) -> Tuple[int, int]:
+        """ Offset of the first tier, and the file's size. """
+        data = _align(self._series_off + _SERIES.size * self._max_series)
+        size = data
+        for tier in self._tiers_cfg:
+            size += _Tier.size(tier.rows, self._max_series)
+        return data, size
+
+    def open(self) -> None:
+        if self._mm is not None:
+            return
+        header = self._header()
+        data, size = self._size()
+        self._path.parent.mkdir(0o700, parents=True, exist_ok=True)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fresh = os.fstat(fd).st_size != size or \
+                os.pread(fd, len(header), 0) != header
+            if fresh:
+                logger.info(f"=> capacity -- starting over at {self._path}")
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)  # sparse, and zeroed
+            self._mm = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+        self._file = fd
+
+        offset = data
+        for cfg in self._tiers_cfg:
+            tier = _Tier(
+                self._mm, offset, cfg.step, cfg.rows, self._max_series
+            )
+            self._tiers.append(tier)
+            offset += _Tier.size(cfg.rows, self._max_series)
+
+        if fresh:
+            # all zeroes is empty already: slots average no samples.
+            self._mm[0:len(header)] = header
+        else:
+            for idx in range(self._max_series):
+                name, _ = self._read_series(idx)
+                if name:
+                    self._series[name] = idx
+
+    def close(self) -> None:
+        if self._mm is None:
+            return
+        for tier in self._tiers:
+            tier.release()
+        self._tiers = []
+        self._series = {}
+        self._dropped = set()
+        self._mm.flush()
+        self._mm.close()
+        self._mm = None
+        assert self._file is not None
+        os.close(self._file)
+        self._file = None
+
+    def flush(self) -> None:
+        if self._mm is not None:
+            self._mm.flush()
+
+    def _read_series(self, idx: int) -> Tuple[str, float]:
+        assert self._mm is not None
+        raw, updated = _SERIES.unpack_from(
+            self._mm, self._series_off + idx * _SERIES.size
+        )
+        return raw.rstrip(b"\0").decode("utf-8"), updated
+
+    def _write_series(self, idx: int, name: str, updated: float) -> None:
+        assert self._mm is not None
+        _SERIES.pack_into(
+            self._mm, self._series_off + idx * _SERIES.size,
+            name.encode("utf-8"), updated
+        )
+
+    def _reset_slot(self, tier: _Tier, slot: int, start: float) -> None:
+        tier.times[slot] = start
+        for idx in range(self._max_series):
+            tier.counts[idx * tier.rows + slot] = 0
+
+    def _reset_series(self, idx: int) -> None:
+        for tier in self._tiers:
+            base = idx * tier.rows
+            tier.counts[base:base + tier.rows] = array("I", [0]) * tier.rows
+
+    def _get_series(self, name: str, now: float) -> Optional[int]:
+        idx = self._series.get(name)
+        if idx is not None:
+            return idx
+        if len(name.encode("utf-8")) > _NAME_LEN:
+            raise CapacityStoreError(f"series name too long: {name}")
+
+        used = set(self._series.values())
+        free = [i for i in range(self._max_series) if i not in used]
+        if not free:
+            longest = max(t.step * t.rows for t in self._tiers)
+            oldest: Optional[Tuple[float, str]] = None
+            for other, i in self._series.items():
+                _, updated = self._read_series(i)
+                if now - updated >= longest and \
+                   (oldest is None or updated < oldest[0]):
+                    oldest = (updated, other)
+            if oldest is None:
+                if name not in self._dropped:
+                    logger.warning(
+                        f"=> capacity -- no room for series {name}"
+                    )
+                    self._dropped.add(name)
+                return None
+            free = [self._series.pop(oldest[1])]
+            self._reset_series(free[0])
+
+        idx = free[0]
+        self._write_series(idx, name, now)
+        self._series[name] = idx
+        self._dropped.discard(name)
+        return idx
+
+    @property
+    def series(self) -> List[str]:
+        return list(self._series.keys())
+
+    @property
+    def dropped(self) -> List[str]:
+        """ Series not kept for lack of room, since the store was opened. """
+        return sorted(self._dropped)
+
+    @property
+    def tiers(self) -> List[CapacityTierOptionsModel]:
+        return list(self._tiers_cfg)
+
+    def update(self, timestamp: float, values: Dict[str, float]) -> None:
+        """ Add a sample of each series in 'values', taken at 'timestamp'. """
+        if self._mm is None:
+            raise CapacityStoreError("store is not open")
+        indices: List[Tuple[int, float]] = []
+        for name, value in values.items():
+            idx = self._get_series(name, timestamp)
+            if idx is not None:
+                indices.append((idx, value))
+                self._write_series(idx, name, timestamp)
+
+        for tier in self._tiers:
+            start = timestamp // tier.step * tier.step
+            slot = int(start // tier.step) % tier.rows
+            if tier.times[slot] != start:
+                if tier.times[slot] > start:
+                    continue  # clock went back; don't clobber newer data.
+                self._reset_slot(tier, slot, start)
+            for idx, value in indices:
+                pos = idx * tier.rows + slot
+                count = tier.counts[pos] + 1
+                prev = tier.values[pos]
+                tier.values[pos] = value if count == 1 \
+                    else prev + (value - prev) / count
+                tier.counts[pos] = count
+
+    def query(
+        self,
+        name: str,
+        start: float,
+        end: float
+    ) -> Tuple[int, List[CapacityPointModel]]:
+        """ Series 'name' between 'start' and 'end', from the finest tier
+        still covering 'start'; returns that tier's step, and the points. """
+        if self._mm is None:
+            raise CapacityStoreError("store is not open")
+        tier = self._tiers[-1]
+        for t in self._tiers:
+            if end - t.step * t.rows <= start:
+                tier = t
+                break
+        idx = self._series.get(name)
+        if idx is None:
+            return tier.step, []
+
+        points: List[CapacityPointModel] = []
+        first = max(start, end - tier.step * tier.rows) // tier.step
+        last = end // tier.step
+        bucket = first
+        while bucket <= last:
+            slot = int(bucket) % tier.rows
+            stamp = bucket * tier.step
+            pos = idx * tier.rows + slot
+            if tier.times[slot] == stamp and tier.counts[pos] > 0:
+                points.append(CapacityPointModel(
+                    timestamp=stamp, value=tier.values[pos]
+                ))
+            bucket += 1
+        return tier.step, points
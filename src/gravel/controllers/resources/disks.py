@@ -0,0 +1,175 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import time
+from collections import deque
+from logging import Logger
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+from fastapi.logger import logger as fastapi_logger
+from pydantic.fields import Field
+from pydantic.main import BaseModel
+from gravel.controllers.gstate import gstate, Ticker
+
+
+logger: Logger = fastapi_logger
+
+
+# /sys/block/*/stat always counts 512 byte sectors.
+SECTOR_SIZE = 512
+
+# not disks we could be deploying on.
+_IGNORED_PREFIXES = ("loop", "ram", "zram", "dm-", "md", "nbd")
+
+
+class DiskCounters(NamedTuple):
+    read_ios: int
+    read_sectors: int
+    read_ticks: int
+    write_ios: int
+    write_sectors: int
+    write_ticks: int
+    io_ticks: int
+
+
+class DiskStatsModel(BaseModel):
+    timestamp: float = Field(title="Sample time, since the epoch")
+    read_iops: float = Field(title="Reads per second")
+    write_iops: float = Field(title="Writes per second")
+    read_bps: float = Field(title="Bytes read per second")
+    write_bps: float = Field(title="Bytes written per second")
+    await_ms: float = Field(title="Average time per request, in ms")
+    utilization: float = Field(title="Time spent doing I/O, in %")
+
+
+def read_disk_counters(path: Path) -> DiskCounters:
+    f = [int(v) for v in path.read_text().split()]
+    return DiskCounters(
+        read_ios=f[0],
+        read_sectors=f[2],
+        read_ticks=f[3],
+        write_ios=f[4],
+        write_sectors=f[6],
+        write_ticks=f[7],
+        io_ticks=f[9]
+    )
+
+
+def compute_disk_stats(
+    prev: DiskCounters,
+    cur: DiskCounters,
+    interval: float
+) -> Optional[DiskStatsModel]:
+    """ Rates between two samples 'interval' seconds apart; None if the
+    counters went backwards, e.g. because the device went away. """
+    delta = DiskCounters(*[c - p for c, p in zip(cur, prev)])
+    if interval <= 0 or any(v < 0 for v in delta):
+        return None
+    ios = delta.read_ios + delta.write_ios
+    ticks = delta.read_ticks + delta.write_ticks
+    return DiskStatsModel(
+        timestamp=time.time(),
+        read_iops=delta.read_ios / interval,
+        write_iops=delta.write_ios / interval,
+        read_bps=delta.read_sectors * SECTOR_SIZE / interval,
+        write_bps=delta.write_sectors * SECTOR_SIZE / interval,
+        await_ms=(ticks / ios) if ios > 0 else 0.0,
+        utilization=min(100.0, delta.io_ticks / (interval * 10.0))
+    )
+
+
+class DiskStats(Ticker):
+    """ Samples I/O statistics of each disk, keyed by device path as found
+    in the inventory (e.g., '/dev/sda'). """
+
+    _sysfs: Path
+    _history_size: int
+    _prev: Dict[str, Tuple[float, DiskCounters]]
+    _history: Dict[str, Deque[DiskStatsModel]]
+
+    def __init__(self, sysfs: str = "/sys"):
+        super().__init__(
+            "disks",
+            gstate.config.options.disks.probe_interval
+        )
+        self._sysfs = Path(sysfs)
+        self._history_size = gstate.config.options.disks.history_size
+        self._prev = {}
+        self._history = {}
+
+    async def _do_tick(self) -> None:
+        try:
+            self.sample()
+        except OSError as e:
+            logger.debug(f"=> disks -- unable to sample: {e}")
+
+    async def _should_tick(self) -> bool:
+        return True
+
+    def _list_disks(self) -> Dict[str, Path]:
+        disks: Dict[str, Path] = {}
+        for entry in (self._sysfs / "block").iterdir():
+            if entry.name.startswith(_IGNORED_PREFIXES):
+                continue
+            # e.g., 'cciss!c0d0' is '/dev/cciss/c0d0'
+            path = "/dev/" + entry.name.replace("!", "/")
+            disks[path] = entry / "stat"
+        return disks
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        seen: Dict[str, Tuple[float, DiskCounters]] = {}
+        for path, statfile in self._list_disks().items():
+            try:
+                counters = read_disk_counters(statfile)
+            except (OSError, ValueError, IndexError):
+                continue  # went away, or not what we expected
+            seen[path] = (now, counters)
+
+            prev = self._prev.get(path)
+            if prev is None:
+                continue
+            stats = compute_disk_stats(prev[1], counters, now - prev[0])
+            if stats is None:
+                continue
+            if path not in self._history:
+                self._history[path] = deque(maxlen=self._history_size)
+            self._history[path].append(stats)
+
+        for path in list(self._history.keys()):
+            if path not in seen:
+                del self._history[path]
+        self._prev = seen
+
+    def get_latest(self) -> Dict[str, DiskStatsModel]:
+        return {
+            path: history[-1]
+            for path, history in self._history.items() if history
+        }
+
+    def get_history(
+        self,
+        path: Optional[str] = None
+    ) -> Dict[str, List[DiskStatsModel]]:
+        return {
+            p: list(history) for p, history in self._history.items()
+            if path is None or p == path
+        }
+
+
+_disk_stats = DiskStats()
+
+
+def get_disk_stats() -> DiskStats:
+    global _disk_stats
+    return _disk_stats
@@ -0,0 +1,143 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from typing import Dict, Iterable, Optional, Tuple
+from pydantic.fields import Field
+from pydantic.main import BaseModel
+
+
+class ForecastModel(BaseModel):
+    used: int = Field(0, title="Bytes used")
+    available: int = Field(0, title="Bytes available")
+    growth: Optional[float] = \
+        Field(None, title="Growth in bytes per second, if known")
+    time_to_full: Optional[float] = Field(
+        None, title="Seconds until full, if growing"
+    )
+
+
+class LinearTrend:
+    """ Least-squares line through a series' samples, kept as running sums.
+
+    Samples weigh less as they age, halving every 'half_life' seconds, so
+    the fit follows recent growth without having to keep the samples. The
+    sums are kept relative to the latest sample's time, which keeps them
+    well conditioned however long we run.
+    """
+
+    _half_life: float
+    _last: Optional[float]
+    _samples: int
+    # weighted sums of 1, t, y, t*t and t*y; t relative to '_last'.
+    _sw: float
+    _st: float
+    _sy: float
+    _stt: float
+    _sty: float
+
+    def __init__(self, half_life: float):
+        self._half_life = half_life
+        self._last = None
+        self._samples = 0
+        self._sw = self._st = self._sy = self._stt = self._sty = 0.0
+
+    @property
+    def samples(self) -> int:
+        return self._samples
+
+    def add(self, t: float, y: float) -> None:
+        if self._last is not None:
+            d = t - self._last
+            if d < 0:
+                return  # out of order
+            decay = 0.5 ** (d / self._half_life)
+            sw, st = self._sw * decay, self._st * decay
+            sy, stt = self._sy * decay, self._stt * decay
+            sty = self._sty * decay
+            # move the origin to 't'.
+            self._sw = sw
+            self._st = st - d * sw
+            self._sy = sy
+            self._stt = stt - 2 * d * st + d * d * sw
+            self._sty = sty - d * sy
+        self._last = t
+        self._samples += 1
+        # at the origin, 't' is 0: only the plain sums change.
+        self._sw += 1.0
+        self._sy += y
+
+    def add_many(self, samples: Iterable[Tuple[float, float]]) -> None:
+        for t, y in samples:
+            self.add(t, y)
+
+    @property
+    def slope(self) -> Optional[float]:
+        """ Growth per second, if there is enough to go by. """
+        if self._samples < 2:
+            return None
+        denom = self._sw * self._stt - self._st * self._st
+        if denom <= 1e-9 * self._sw * self._stt:
+            return None  # all samples at about the same time
+        return (self._sw * self._sty - self._st * self._sy) / denom
+
+
+def make_forecast(
+    used: int,
+    available: int,
+    growth: Optional[float]
+) -> ForecastModel:
+    ttf: Optional[float] = None
+    if growth is not None and growth > 0:
+        ttf = max(0.0, available / growth)
+    return ForecastModel(
+        used=used,
+        available=available,
+        growth=growth,
+        time_to_full=ttf
+    )
+
+
+class Forecaster:
+    """ Trends of named series, updated a sample at a time, so that a
+    forecast costs as much as the series it involves. """
+
+    _half_life: float
+    _trends: Dict[str, LinearTrend]
+
+    def __init__(self, half_life: float):
+        self._half_life = half_life
+        self._trends = {}
+
+    def _get(self, series: str) -> LinearTrend:
+        if series not in self._trends:
+            self._trends[series] = LinearTrend(self._half_life)
+        return self._trends[series]
+
+    def seed(
+        self,
+        series: str,
+        samples: Iterable[Tuple[float, float]]
+    ) -> None:
+        """ Fit past samples of 'series', oldest first. """
+        self._get(series).add_many(samples)
+
+    def add(self, t: float, values: Dict[str, float]) -> None:
+        for series, value in values.items():
+            self._get(series).add(t, value)
+        for series in list(self._trends.keys()):
+            if series not in values:
+                del self._trends[series]  # e.g., the pool went away
+
+    def growth(self, series: str) -> Optional[float]:
+        trend = self._trends.get(series)
+        return trend.slope if trend is not None else None
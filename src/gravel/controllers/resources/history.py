@@ -0,0 +1,146 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+
+class _TimeView:
+    """ Timestamps of a ring, oldest first, for bisecting. """
+
+    def __init__(self, ring: "SeriesRing"):
+        self._ring = ring
+
+    def __len__(self) -> int:
+        return self._ring.count
+
+    def __getitem__(self, pos: int) -> float:
+        return self._ring._times[self._ring._slot(pos)]
+
+
+class SeriesRing:
+    """ Fixed capacity time series of float columns, stored in preallocated
+    arrays; once full, each sample overwrites the oldest.
+
+    Columns are created as first seen, and hold NaN where a sample lacks
+    them. A column missing from every retained sample is dropped.
+    """
+
+    _capacity: int
+    _times: "array[float]"
+    _columns: Dict[str, "array[float]"]
+    _last_seen: Dict[str, int]
+    _head: int  # slot the next sample goes to
+    _seq: int  # samples appended, ever
+
+    def __init__(self, capacity: int):
+        assert capacity > 0
+        self._capacity = capacity
+        self._times = array("d", [0.0]) * capacity
+        self._columns = {}
+        self._last_seen = {}
+        self._head = 0
+        self._seq = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def count(self) -> int:
+        return min(self._seq, self._capacity)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns.keys())
+
+    def _slot(self, pos: int) -> int:
+        """ Slot of the 'pos'th retained sample, oldest first. """
+        return (self._head - self.count + pos) % self._capacity
+
+    def append(self, timestamp: float, values: Dict[str, float]) -> None:
+        if self.count > 0:
+            # keep timestamps ordered, should the clock go back.
+            timestamp = max(timestamp, self._times[self._slot(self.count - 1)])
+        slot = self._head
+        self._times[slot] = timestamp
+        for name, value in values.items():
+            if name not in self._columns:
+                self._columns[name] = array("d", [math.nan]) * self._capacity
+            self._columns[name][slot] = value
+            self._last_seen[name] = self._seq
+        for name in list(self._columns.keys()):
+            if name in values:
+                continue
+            if self._seq - self._last_seen[name] >= self._capacity:
+                del self._columns[name]
+                del self._last_seen[name]
+            else:
+                self._columns[name][slot] = math.nan
+        self._head = (self._head + 1) % self._capacity
+        self._seq += 1
+
+    def _range(
+        self,
+        start: Optional[float],
+        end: Optional[float]
+    ) -> Tuple[int, int]:
+        times = _TimeView(self)
+        lo = 0 if start is None else bisect_left(times, start)
+        hi = self.count if end is None else bisect_right(times, end)
+        return lo, hi
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        points: Optional[int] = None
+    ) -> List[Tuple[float, Dict[str, float]]]:
+        """ Samples between 'start' and 'end', inclusive.
+
+        With 'points', samples are averaged over as many equal time buckets,
+        with each bucket stamped by its last sample's time; buckets without
+        samples are left out, as are columns without values in a bucket.
+        """
+        lo, hi = self._range(start, end)
+        if lo >= hi:
+            return []
+        slots = [self._slot(pos) for pos in range(lo, hi)]
+        if points is None or points >= len(slots):
+            return [self._sample(slot, [slot]) for slot in slots]
+
+        first = self._times[slots[0]]
+        span = self._times[slots[-1]] - first
+        buckets: List[List[int]] = [[] for _ in range(max(1, points))]
+        for slot in slots:
+            n = 0
+            if span > 0:
+                n = int((self._times[slot] - first) / span * points)
+            buckets[min(n, len(buckets) - 1)].append(slot)
+        return [
+            self._sample(bucket[-1], bucket) for bucket in buckets if bucket
+        ]
+
+    def _sample(
+        self,
+        stamp_slot: int,
+        slots: List[int]
+    ) -> Tuple[float, Dict[str, float]]:
+        values: Dict[str, float] = {}
+        for name, column in self._columns.items():
+            seen = [column[s] for s in slots if not math.isnan(column[s])]
+            if seen:
+                values[name] = sum(seen) / len(seen)
+        return self._times[stamp_slot], values
@@ -0,0 +1,137 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import time
+from logging import Logger
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from fastapi.logger import logger as fastapi_logger
+from pydantic.fields import Field
+from pydantic.main import BaseModel
+from gravel.controllers.gstate import gstate, Ticker
+
+
+logger: Logger = fastapi_logger
+
+
+class HostMetricsModel(BaseModel):
+    timestamp: float = Field(title="Sample time, since the epoch")
+    uptime: float = Field(title="Host uptime, in seconds")
+    load_one_min: float = Field(title="Load average over 1 minute")
+    load_five_min: float = Field(title="Load average over 5 minutes")
+    load_fifteen_min: float = Field(title="Load average over 15 minutes")
+    cpu_utilization: Optional[float] = \
+        Field(None, title="CPU utilization since the previous sample, in %")
+    memory_total_kb: int = Field(title="Total memory, in kB")
+    memory_free_kb: int = Field(title="Free memory, in kB")
+    memory_available_kb: int = Field(title="Available memory, in kB")
+
+
+def read_loadavg(procfs: Path) -> Tuple[float, float, float]:
+    fields = (procfs / "loadavg").read_text().split()
+    return float(fields[0]), float(fields[1]), float(fields[2])
+
+
+def read_meminfo(procfs: Path) -> Dict[str, int]:
+    """ Values in kB, by name; e.g., 'MemTotal'. """
+    meminfo: Dict[str, int] = {}
+    for line in (procfs / "meminfo").read_text().splitlines():
+        name, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            meminfo[name] = int(fields[0])
+    return meminfo
+
+
+def read_uptime(procfs: Path) -> float:
+    return float((procfs / "uptime").read_text().split()[0])
+
+
+def read_cpu_times(procfs: Path) -> Tuple[int, int]:
+    """ Aggregated (busy, total) CPU time, in ticks. """
+    with (procfs / "stat").open() as f:
+        fields: List[str] = f.readline().split()
+    assert fields[0] == "cpu"
+    ticks = [int(v) for v in fields[1:]]
+    # guest time is already accounted for in user and nice.
+    total = sum(ticks[:8])
+    idle = ticks[3] + (ticks[4] if len(ticks) > 4 else 0)  # idle + iowait
+    return total - idle, total
+
+
+class HostMetrics(Ticker):
+    """ Samples volatile host metrics from procfs.
+
+    Cheap enough to run every few seconds, unlike gathering facts through
+    cephadm, which the inventory keeps doing for everything else.
+    """
+
+    _procfs: Path
+    _latest: Optional[HostMetricsModel]
+    _cpu_times: Optional[Tuple[int, int]]
+
+    def __init__(self, procfs: str = "/proc"):
+        super().__init__(
+            "host",
+            gstate.config.options.host.probe_interval
+        )
+        self._procfs = Path(procfs)
+        self._latest = None
+        self._cpu_times = None
+
+    async def _do_tick(self) -> None:
+        try:
+            self.sample()
+        except (OSError, ValueError, IndexError, AssertionError) as e:
+            logger.debug(f"=> host -- unable to sample metrics: {e}")
+
+    async def _should_tick(self) -> bool:
+        return True
+
+    def sample(self) -> HostMetricsModel:
+        one, five, fifteen = read_loadavg(self._procfs)
+        meminfo = read_meminfo(self._procfs)
+
+        utilization: Optional[float] = None
+        busy, total = read_cpu_times(self._procfs)
+        if self._cpu_times is not None:
+            prev_busy, prev_total = self._cpu_times
+            if total > prev_total:
+                utilization = \
+                    100.0 * (busy - prev_busy) / (total - prev_total)
+        self._cpu_times = (busy, total)
+
+        self._latest = HostMetricsModel(
+            timestamp=time.time(),
+            uptime=read_uptime(self._procfs),
+            load_one_min=one,
+            load_five_min=five,
+            load_fifteen_min=fifteen,
+            cpu_utilization=utilization,
+            memory_total_kb=meminfo.get("MemTotal", 0),
+            memory_free_kb=meminfo.get("MemFree", 0),
+            memory_available_kb=meminfo.get("MemAvailable", 0)
+        )
+        return self._latest
+
+    @property
+    def latest(self) -> Optional[HostMetricsModel]:
+        return self._latest
+
+
+_host_metrics = HostMetrics()
+
+
+def get_host_metrics() -> HostMetrics:
+    global _host_metrics
+    return _host_metrics
@@ -1,41 +1,175 @@
 # project aquarium's backend
 # Copyright (C) 2021 SUSE, LLC.
 
+import asyncio
 from logging import Logger
 import time
 from typing import (
     Awaitable,
     Callable,
+    Dict,
     List,
-    Optional
+    Optional,
+    Set
 )
 from fastapi.logger import logger as fastapi_logger
+from pydantic.fields import Field
 from pydantic.main import BaseModel
-from gravel.cephadm.models import NodeInfoModel
+from gravel.cephadm.models import (
+    HostFactsModel,
+    NodeCPULoadModel,
+    NodeInfoModel,
+    NodeMemoryInfoModel,
+    VolumeDeviceModel
+)
 from gravel.controllers.gstate import gstate, Ticker
+from gravel.controllers.resources.history import SeriesRing
+from gravel.controllers.resources.host import (
+    HostMetricsModel,
+    get_host_metrics
+)
+from gravel.controllers.orch.cache import AsyncTTLCache
 from gravel.cephadm.cephadm import Cephadm
+from gravel.cephadm.scheduler import CephadmPriorityEnum
 
 
 logger: Logger = fastapi_logger
 
 
-class Subscriber(BaseModel):
+# updates an 'InventoryUpdates' holds before dropping the oldest.
+UPDATES_MAX_QUEUED = 8
+
+
+class Subscriber:
+    """ A subscription, told apart from others by identity alone: the same
+    callback may well be subscribed more than once. """
+
     cb: Callable[[NodeInfoModel], Awaitable[None]]
     once: bool
 
+    def __init__(
+        self,
+        cb: Callable[[NodeInfoModel], Awaitable[None]],
+        once: bool
+    ):
+        self.cb = cb
+        self.once = once
+
+
+# numeric parts of each probe kept in the history, by column.
+_HISTORY_COLUMNS = (
+    "load_one_min",
+    "load_five_min",
+    "load_fifteen_min",
+    "memory_available_kb",
+    "memory_free_kb",
+    "uptime"
+)
+_DISK_COLUMN_PREFIX = "disk:"
+
+
+class InventoryHistoryPointModel(BaseModel):
+    timestamp: float = Field(title="Time of the last sample, since the epoch")
+    load_one_min: Optional[float] = Field(title="Load average over 1 minute")
+    load_five_min: Optional[float] = \
+        Field(title="Load average over 5 minutes")
+    load_fifteen_min: Optional[float] = \
+        Field(title="Load average over 15 minutes")
+    memory_available_kb: Optional[float] = \
+        Field(title="Available memory, in kB")
+    memory_free_kb: Optional[float] = Field(title="Free memory, in kB")
+    uptime: Optional[float] = Field(title="Host uptime, in seconds")
+    disks_available: Dict[str, float] = Field(
+        title="Per disk path, fraction of samples it was available in"
+    )
+
+
+class InventoryUpdates:
+    """ Inventory updates, as an async iterator.
+
+    Updates are queued until consumed; should the consumer fall behind, the
+    oldest are dropped, as newer ones supersede them anyway. Iteration ends
+    once closed.
+    """
+
+    _inventory: "Inventory"
+    _queue: "asyncio.Queue[Optional[NodeInfoModel]]"
+    _closed: bool
+    dropped: int
+
+    def __init__(self, inventory: "Inventory", maxsize: int):
+        self._inventory = inventory
+        self._queue = asyncio.Queue(maxsize)
+        self._closed = False
+        self.dropped = 0
+
+    def _put(self, nodeinfo: Optional[NodeInfoModel]) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(nodeinfo)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._inventory._updates.discard(self)
+        self._put(None)
+
+    def __enter__(self) -> "InventoryUpdates":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __aiter__(self) -> "InventoryUpdates":
+        return self
+
+    async def __anext__(self) -> NodeInfoModel:
+        nodeinfo = await self._queue.get()
+        if nodeinfo is None:
+            raise StopAsyncIteration
+        return nodeinfo
+
 
 class Inventory(Ticker):
 
     _latest: Optional[NodeInfoModel]
+    _latest_stamp: float
     _subscribers: List[Subscriber]
+    _subscriber_timeout: float
+    _updates: Set[InventoryUpdates]
+    _notifying: Set["asyncio.Future[None]"]
+    _probing: Optional["asyncio.Future[None]"]
+    _cache: AsyncTTLCache
+    _merged: Optional[NodeInfoModel]
+    _merged_from: Optional[HostMetricsModel]
+    _history: SeriesRing
 
     def __init__(self):
+        options = gstate.config.options.inventory
         super().__init__(
             "inventory",
-            gstate.config.options.inventory.probe_interval
+            options.probe_interval,
+            options.min_probe_interval,
+            options.max_probe_interval
         )
         self._latest = None
+        self._latest_stamp = 0
         self._subscribers = []
+        self._subscriber_timeout = \
+            gstate.config.options.inventory.subscriber_timeout
+        self._updates = set()
+        self._notifying = set()
+        self._probing = None
+        self._cache = AsyncTTLCache(
+            gstate.config.options.inventory.max_age
+        )
+        self._merged = None
+        self._merged_from = None
+        self._history = SeriesRing(
+            gstate.config.options.inventory.history_size
+        )
 
     async def _do_tick(self) -> None:
         await self.probe()
@@ -43,34 +177,224 @@ class Inventory(Ticker):
     async def _should_tick(self) -> bool:
         return True
 
-    async def probe(self) -> None:
-        cephadm: Cephadm = Cephadm()
+    async def probe(
+        self,
+        priority: CephadmPriorityEnum = CephadmPriorityEnum.BACKGROUND
+    ) -> None:
+        """ Probe this node, sharing a probe already being run. """
+        if self._probing is None:
+            self._probing = asyncio.ensure_future(self._probe(priority))
+
+            def _done(fut: "asyncio.Future[None]") -> None:
+                self._probing = None
+                if not fut.cancelled() and fut.exception() is not None:
+                    logger.debug(f"=> inventory probe failed: {fut.exception()}")
+
+            self._probing.add_done_callback(_done)
+        await asyncio.shield(self._probing)
+
+    async def _probe(self, priority: CephadmPriorityEnum) -> None:
+        cephadm: Cephadm = Cephadm(priority=priority)
         start: int = int(time.monotonic())
         nodeinfo = await cephadm.get_node_info()
         diff: int = int(time.monotonic()) - start
         logger.info(f"=> inventory probing took {diff} seconds")
+        if nodeinfo.disks_stale and self._latest is not None:
+            # keep what we knew, still flagged as stale.
+            nodeinfo.disks = self._latest.disks
+        if self._latest is not None:
+            # load and memory always change; disks and NICs seldom do.
+            self.record_change(
+                nodeinfo.disks != self._latest.disks or
+                nodeinfo.nics != self._latest.nics
+            )
         self._latest = nodeinfo
-        await self._publish()
+        self._latest_stamp = time.monotonic()
+        self._merged = None
+        latest = self.latest
+        assert latest
+        self._record(latest)
+        self._publish()
 
     @property
     def latest(self) -> Optional[NodeInfoModel]:
-        return self._latest
+        """ What we last probed, with the most recent host metrics. """
+        if self._latest is None:
+            return None
+        metrics = get_host_metrics().latest
+        if metrics is None:
+            return self._latest
+        if self._merged is None or self._merged_from is not metrics:
+            self._merged = self._merge(self._latest, metrics)
+            self._merged_from = metrics
+        return self._merged
+
+    def _merge(
+        self,
+        nodeinfo: NodeInfoModel,
+        metrics: HostMetricsModel
+    ) -> NodeInfoModel:
+        if metrics.timestamp < nodeinfo.current_time:
+            return nodeinfo  # probed after sampling
+        load = NodeCPULoadModel(
+            one_min=metrics.load_one_min,
+            five_min=metrics.load_five_min,
+            fifteen_min=metrics.load_fifteen_min
+        )
+        memory = NodeMemoryInfoModel(
+            available_kb=metrics.memory_available_kb,
+            free_kb=metrics.memory_free_kb,
+            total_kb=metrics.memory_total_kb
+        )
+        return nodeinfo.copy(update={
+            "system_uptime": metrics.uptime,
+            "current_time": int(metrics.timestamp),
+            "cpu": nodeinfo.cpu.copy(update={
+                "load": load,
+                "utilization": metrics.cpu_utilization
+            }),
+            "memory": memory
+        })
+
+    def _record(self, nodeinfo: NodeInfoModel) -> None:
+        values: Dict[str, float] = {
+            "load_one_min": nodeinfo.cpu.load.one_min,
+            "load_five_min": nodeinfo.cpu.load.five_min,
+            "load_fifteen_min": nodeinfo.cpu.load.fifteen_min,
+            "memory_available_kb": nodeinfo.memory.available_kb,
+            "memory_free_kb": nodeinfo.memory.free_kb,
+            "uptime": nodeinfo.system_uptime
+        }
+        if not nodeinfo.disks_stale:
+            for disk in nodeinfo.disks:
+                values[_DISK_COLUMN_PREFIX + disk.path] = \
+                    1.0 if disk.available else 0.0
+        self._history.append(time.time(), values)
+
+    def get_history(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        points: Optional[int] = None
+    ) -> List[InventoryHistoryPointModel]:
+        """ Probes between 'start' and 'end', downsampled to at most 'points'
+        averaged points if specified. """
+        history: List[InventoryHistoryPointModel] = []
+        for timestamp, values in self._history.query(start, end, points):
+            disks: Dict[str, float] = {}
+            for name, value in values.items():
+                if name.startswith(_DISK_COLUMN_PREFIX):
+                    disks[name[len(_DISK_COLUMN_PREFIX):]] = value
+            history.append(InventoryHistoryPointModel(
+                timestamp=timestamp,
+                disks_available=disks,
+                **{
+                    name: values[name]
+                    for name in _HISTORY_COLUMNS if name in values
+                }
+            ))
+        return history
+
+    def _get_fresh(self) -> Optional[NodeInfoModel]:
+        if self._latest is None:
+            return None
+        age = time.monotonic() - self._latest_stamp
+        if age >= self._cache.ttl:
+            return None
+        return self.latest
+
+    async def get_node_info(self) -> NodeInfoModel:
+        """ Obtain this node's info, probing only if what we have is older
+        than the configured max age. """
+        nodeinfo = self._get_fresh()
+        if nodeinfo is None:
+            await self.probe(CephadmPriorityEnum.INTERACTIVE)
+            nodeinfo = self.latest
+            assert nodeinfo
+        return nodeinfo
+
+    async def get_facts(self) -> HostFactsModel:
+        return await self._cache.get("facts", Cephadm().gather_facts)
+
+    async def get_volumes(self) -> List[VolumeDeviceModel]:
+        nodeinfo = self._get_fresh()
+        if nodeinfo is not None and not nodeinfo.disks_stale:
+            return nodeinfo.disks
+        return await self._cache.get(
+            "volumes", Cephadm().get_volume_inventory
+        )
 
     def subscribe(
         self,
         cb: Callable[[NodeInfoModel], Awaitable[None]],
         once: bool
-    ) -> None:
-        self._subscribers.append(Subscriber(cb=cb, once=once))
+    ) -> Subscriber:
+        """ Have 'cb' called with each new probe's result, or only the next
+        one if 'once'. Each call is bound by the subscriber timeout. """
+        subscriber = Subscriber(cb=cb, once=once)
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers = [
+            s for s in self._subscribers if s is not subscriber
+        ]
 
-    async def _publish(self) -> None:
-        assert self._latest
-        for subscriber in self._subscribers:
+    def updates(self, maxsize: int = UPDATES_MAX_QUEUED) -> InventoryUpdates:
+        """ Subscribe to updates as an async iterator, to be closed when no
+        longer needed, e.g.:
+
+            with inventory.updates() as updates:
+                async for nodeinfo in updates:
+                    ...
+        """
+        updates = InventoryUpdates(self, maxsize)
+        self._updates.add(updates)
+        return updates
+
+    async def _notify(
+        self,
+        subscriber: Subscriber,
+        nodeinfo: NodeInfoModel
+    ) -> None:
+        try:
             # ignore type because mypy is somehow broken when doing callbacks
             # see https://github.com/python/mypy/issues/5485
-            await subscriber.cb(self._latest)  # type: ignore
-            if subscriber.once:
-                self._subscribers.remove(subscriber)
+            await asyncio.wait_for(
+                subscriber.cb(nodeinfo),  # type: ignore
+                self._subscriber_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(
+                f"=> inventory -- subscriber {subscriber.cb} timed out after "
+                f"{self._subscriber_timeout} seconds"
+            )
+        except Exception as e:
+            logger.error(f"=> inventory -- subscriber {subscriber.cb}: {e}")
+
+    def _publish(self) -> "asyncio.Future[None]":
+        """ Hand the latest inventory to all subscribers, concurrently and
+        without waiting for them. """
+        latest = self.latest
+        assert latest
+        for updates in self._updates:
+            updates._put(latest)
+
+        subscribers = self._subscribers
+        self._subscribers = [s for s in subscribers if not s.once]
+        fut = asyncio.ensure_future(self._fan_out(subscribers, latest))
+        self._notifying.add(fut)
+        fut.add_done_callback(self._notifying.discard)
+        return fut
+
+    async def _fan_out(
+        self,
+        subscribers: List[Subscriber],
+        nodeinfo: NodeInfoModel
+    ) -> None:
+        await asyncio.gather(*[
+            self._notify(subscriber, nodeinfo) for subscriber in subscribers
+        ])
 
 
 _inventory = Inventory()
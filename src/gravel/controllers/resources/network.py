@@ -0,0 +1,187 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import time
+from collections import deque
+from logging import Logger
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+from fastapi.logger import logger as fastapi_logger
+from pydantic.fields import Field
+from pydantic.main import BaseModel
+from gravel.controllers.gstate import gstate, Ticker
+
+
+logger: Logger = fastapi_logger
+
+
+class NICCounters(NamedTuple):
+    rx_bytes: int
+    tx_bytes: int
+    rx_packets: int
+    tx_packets: int
+    rx_dropped: int
+    tx_dropped: int
+    rx_errors: int
+    tx_errors: int
+
+
+class NICStatsModel(BaseModel):
+    timestamp: float = Field(title="Sample time, since the epoch")
+    rx_bps: float = Field(title="Bytes received per second")
+    tx_bps: float = Field(title="Bytes sent per second")
+    rx_pps: float = Field(title="Packets received per second")
+    tx_pps: float = Field(title="Packets sent per second")
+    rx_dropped_ps: float = \
+        Field(title="Received packets dropped per second")
+    tx_dropped_ps: float = Field(title="Sent packets dropped per second")
+    rx_errors_ps: float = Field(title="Receive errors per second")
+    tx_errors_ps: float = Field(title="Send errors per second")
+    speed: Optional[int] = Field(None, title="Link speed, in Mb/s")
+    rx_utilization: Optional[float] = \
+        Field(None, title="Receive utilization of link speed, in %")
+    tx_utilization: Optional[float] = \
+        Field(None, title="Send utilization of link speed, in %")
+
+
+def read_nic_counters(statsdir: Path) -> NICCounters:
+    return NICCounters(*[
+        int((statsdir / name).read_text())
+        for name in NICCounters._fields
+    ])
+
+
+def read_nic_speed(nicdir: Path) -> Optional[int]:
+    """ Link speed in Mb/s, if the link is up and the driver knows it. """
+    try:
+        speed = int((nicdir / "speed").read_text())
+    except (OSError, ValueError):
+        return None
+    return speed if speed > 0 else None
+
+
+def compute_nic_stats(
+    prev: NICCounters,
+    cur: NICCounters,
+    interval: float,
+    speed: Optional[int]
+) -> Optional[NICStatsModel]:
+    """ Rates between two samples 'interval' seconds apart; None if the
+    counters went backwards, e.g. because the interface was recreated. """
+    delta = NICCounters(*[c - p for c, p in zip(cur, prev)])
+    if interval <= 0 or any(v < 0 for v in delta):
+        return None
+    rx_bps = delta.rx_bytes / interval
+    tx_bps = delta.tx_bytes / interval
+    rx_util: Optional[float] = None
+    tx_util: Optional[float] = None
+    if speed:
+        link_bps = speed * 1000 * 1000 / 8
+        rx_util = min(100.0, 100.0 * rx_bps / link_bps)
+        tx_util = min(100.0, 100.0 * tx_bps / link_bps)
+    return NICStatsModel(
+        timestamp=time.time(),
+        rx_bps=rx_bps,
+        tx_bps=tx_bps,
+        rx_pps=delta.rx_packets / interval,
+        tx_pps=delta.tx_packets / interval,
+        rx_dropped_ps=delta.rx_dropped / interval,
+        tx_dropped_ps=delta.tx_dropped / interval,
+        rx_errors_ps=delta.rx_errors / interval,
+        tx_errors_ps=delta.tx_errors / interval,
+        speed=speed,
+        rx_utilization=rx_util,
+        tx_utilization=tx_util
+    )
+
+
+class NetworkStats(Ticker):
+    """ Samples traffic and error counters of each network interface, keyed
+    by interface name as in the inventory's NICs. """
+
+    _sysfs: Path
+    _history_size: int
+    _prev: Dict[str, Tuple[float, NICCounters]]
+    _history: Dict[str, Deque[NICStatsModel]]
+
+    def __init__(self, sysfs: str = "/sys"):
+        super().__init__(
+            "network",
+            gstate.config.options.network.probe_interval
+        )
+        self._sysfs = Path(sysfs)
+        self._history_size = gstate.config.options.network.history_size
+        self._prev = {}
+        self._history = {}
+
+    async def _do_tick(self) -> None:
+        try:
+            self.sample()
+        except OSError as e:
+            logger.debug(f"=> network -- unable to sample: {e}")
+
+    async def _should_tick(self) -> bool:
+        return True
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        seen: Dict[str, Tuple[float, NICCounters]] = {}
+        for nicdir in (self._sysfs / "class" / "net").iterdir():
+            name = nicdir.name
+            if name == "lo":
+                continue
+            try:
+                counters = read_nic_counters(nicdir / "statistics")
+            except (OSError, ValueError):
+                continue  # went away, or not what we expected
+            seen[name] = (now, counters)
+
+            prev = self._prev.get(name)
+            if prev is None:
+                continue
+            stats = compute_nic_stats(
+                prev[1], counters, now - prev[0], read_nic_speed(nicdir)
+            )
+            if stats is None:
+                continue
+            if name not in self._history:
+                self._history[name] = deque(maxlen=self._history_size)
+            self._history[name].append(stats)
+
+        for name in list(self._history.keys()):
+            if name not in seen:
+                del self._history[name]
+        self._prev = seen
+
+    def get_latest(self) -> Dict[str, NICStatsModel]:
+        return {
+            name: history[-1]
+            for name, history in self._history.items() if history
+        }
+
+    def get_history(
+        self,
+        name: Optional[str] = None
+    ) -> Dict[str, List[NICStatsModel]]:
+        return {
+            n: list(history) for n, history in self._history.items()
+            if name is None or n == name
+        }
+
+
+_network_stats = NetworkStats()
+
+
+def get_network_stats() -> NetworkStats:
+    global _network_stats
+    return _network_stats
@@ -11,8 +11,11 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+import time
+from collections import deque
+from enum import Enum
 from logging import Logger
-from typing import Dict
+from typing import Callable, Deque, Dict, List, Optional, Set
 from fastapi.logger import logger as fastapi_logger
 from pydantic.fields import Field
 from pydantic.main import BaseModel
@@ -23,11 +26,24 @@ from gravel.controllers.nodes.mgr import (
     get_node_mgr
 )
 from gravel.controllers.orch.ceph import Mon
+from gravel.controllers.resources.capacity import (
+    CapacityPointModel,
+    CapacityStore
+)
+from gravel.controllers.resources.forecast import (
+    Forecaster,
+    ForecastModel,
+    make_forecast
+)
 
 
 logger: Logger = fastapi_logger
 
 
+# pool events kept for those polling for them.
+STORAGE_MAX_EVENTS = 256
+
+
 class StorageError(Exception):
     pass
 
@@ -53,20 +69,67 @@ class StoragePoolModel(BaseModel):
 
 
 class StorageModel(BaseModel):
+    revision: int = Field(0, title="Bumped whenever anything changes")
     stats: StorageStatsModel = Field(StorageStatsModel(), title="statistics")
     pools_by_id: Dict[int, StoragePoolModel] = Field({}, title="Pool by ID")
     pools_by_name: Dict[str, StoragePoolModel] = \
         Field({}, title="Pool by name")
 
 
+class StoragePoolEventEnum(str, Enum):
+    ADDED = "added"
+    CHANGED = "changed"
+    REMOVED = "removed"
+
+
+class StoragePoolEventModel(BaseModel):
+    revision: int = Field(title="Storage revision it happened in")
+    type: StoragePoolEventEnum = Field(title="What happened")
+    pool_id: int = Field(title="Pool ID")
+    pool: Optional[StoragePoolModel] = \
+        Field(None, title="The pool, unless removed")
+
+
+StoragePoolSubscriber = Callable[[StoragePoolEventModel], None]
+
+
+class StorageForecastModel(BaseModel):
+    cluster: ForecastModel = Field(title="Raw capacity forecast")
+    pools: Dict[int, ForecastModel] = Field(title="Forecast by pool ID")
+
+
+class CapacitySeriesModel(BaseModel):
+    series: List[str] = Field(title="Series kept")
+    dropped: List[str] = Field(title="Series not kept, for lack of room")
+
+
+class CapacityHistoryModel(BaseModel):
+    step: int = Field(title="Seconds per point")
+    points: List[CapacityPointModel] = Field(title="Points, oldest first")
+
+
 class Storage(Ticker):
 
+    _capacity: Optional[CapacityStore]
+    _flushed: float
+    _forecaster: Optional[Forecaster]
+    _events: Deque[StoragePoolEventModel]
+    _subscribers: List[StoragePoolSubscriber]
+
     def __init__(self):
+        options = gstate.config.options.storage
         super().__init__(
             "storage",
-            gstate.config.options.storage.probe_interval
+            options.probe_interval,
+            options.min_probe_interval,
+            options.max_probe_interval
         )
         self._state: StorageModel = StorageModel()
+        self._capacity = None
+        self._flushed = 0.0
+        self._forecaster = None
+        self._events = deque(maxlen=STORAGE_MAX_EVENTS)
+        self._subscribers = []
 
     async def _do_tick(self) -> None:
         await self._update()
@@ -95,25 +158,188 @@ class Storage(Ticker):
         return self._state.stats.total
 
     async def usage(self) -> StorageModel:
+        """ The state as of the latest revision; it is replaced, not
+        changed, on updates. """
         return self._state
 
+    def _get_capacity(self) -> CapacityStore:
+        if self._capacity is None:
+            options = gstate.config.options.storage
+            store = CapacityStore(
+                gstate.config.confdir.joinpath("capacity.rrd"),
+                options.capacity_tiers,
+                options.capacity_max_series
+            )
+            store.open()
+            self._capacity = store
+            self._flushed = time.monotonic()
+        return self._capacity
+
+    def _flush(self, capacity: CapacityStore) -> None:
+        """ The store's file is only written back as the kernel sees fit;
+        have it written every so often, lest a crash lose it. """
+        interval = gstate.config.options.storage.capacity_flush_interval
+        if time.monotonic() - self._flushed < interval:
+            return
+        capacity.flush()
+        self._flushed = time.monotonic()
+
+    def shutdown(self) -> None:
+        if self._capacity is not None:
+            self._capacity.close()
+            self._capacity = None
+
+    def _record(self) -> None:
+        """ Keep the cluster's totals, and each pool's usage, by pool ID. """
+        if gstate.is_shutting_down:
+            return  # the store may be closed already.
+        stats = self._state.stats
+        values: Dict[str, float] = {
+            "cluster.total": stats.total,
+            "cluster.available": stats.available,
+            "cluster.used": stats.used,
+            "cluster.raw_used": stats.raw_used
+        }
+        for pool in self._state.pools_by_id.values():
+            values[f"pool.{pool.id}.used"] = pool.stats.used
+            values[f"pool.{pool.id}.max_available"] = \
+                pool.stats.max_available
+        now = time.time()
+        try:
+            capacity = self._get_capacity()
+            if self._forecaster is None:
+                self._forecaster = self._seed_forecaster(capacity, now)
+            capacity.update(now, values)
+            self._flush(capacity)
+        except Exception as e:
+            logger.error(f"=> storage -- unable to record capacity: {e}")
+        if self._forecaster is not None:
+            self._forecaster.add(now, values)
+
+    def _seed_forecaster(
+        self,
+        capacity: CapacityStore,
+        now: float
+    ) -> Forecaster:
+        """ Pick up trends from the capacity history, as far back as it
+        still weighs in. """
+        half_life = gstate.config.options.storage.forecast_half_life
+        forecaster = Forecaster(half_life)
+        for series in capacity.series:
+            _, points = capacity.query(series, now - 4 * half_life, now)
+            forecaster.seed(
+                series, [(p.timestamp, p.value) for p in points]
+            )
+        return forecaster
+
+    def forecast(self) -> StorageForecastModel:
+        """ When the cluster, and each pool, should fill up at the rate
+        they have been growing. """
+        forecaster = self._forecaster
+        stats = self._state.stats
+
+        def _growth(series: str) -> Optional[float]:
+            return forecaster.growth(series) if forecaster else None
+
+        return StorageForecastModel(
+            cluster=make_forecast(
+                stats.raw_used, stats.available, _growth("cluster.raw_used")
+            ),
+            pools={
+                pool.id: make_forecast(
+                    pool.stats.used,
+                    pool.stats.max_available,
+                    _growth(f"pool.{pool.id}.used")
+                )
+                for pool in self._state.pools_by_id.values()
+            }
+        )
+
+    def capacity_series(self) -> CapacitySeriesModel:
+        capacity = self._get_capacity()
+        return CapacitySeriesModel(
+            series=capacity.series, dropped=capacity.dropped
+        )
+
+    def capacity_history(
+        self,
+        series: str,
+        start: float,
+        end: float
+    ) -> CapacityHistoryModel:
+        step, points = self._get_capacity().query(series, start, end)
+        return CapacityHistoryModel(step=step, points=points)
+
+    @property
+    def revision(self) -> int:
+        return self._state.revision
+
+    def subscribe(self, cb: StoragePoolSubscriber) -> None:
+        """ Have 'cb' called with each pool event, as it happens. """
+        self._subscribers.append(cb)
+
+    def unsubscribe(self, cb: StoragePoolSubscriber) -> None:
+        if cb in self._subscribers:
+            self._subscribers.remove(cb)
+
+    def events(self, since: int = 0) -> List[StoragePoolEventModel]:
+        """ Pool events after revision 'since', as far back as we keep. """
+        return [e for e in self._events if e.revision > since]
+
+    def _emit(self, events: List[StoragePoolEventModel]) -> None:
+        for event in events:
+            self._events.append(event)
+            for cb in list(self._subscribers):
+                try:
+                    cb(event)
+                except Exception as e:
+                    logger.error(f"=> storage -- pool subscriber {cb}: {e}")
+
     async def _update(self) -> None:
         try:
             mon = Mon()
-            df = mon.df()
+            df = await mon.df_async()
         except Exception as e:
             raise StorageError("error obtaining info from cluster") from e
 
-        self._state.stats = StorageStatsModel(
-            total=df.stats.total_bytes,
-            available=df.stats.total_avail_bytes,
-            used=df.stats.total_used_bytes,
-            raw_used=df.stats.total_used_raw_bytes,
-            raw_used_ratio=df.stats.total_used_raw_ratio
+        # changes go into a copy, swapped in once complete, so that those
+        # holding the current state never see it half updated.
+        prev = self._state
+        revision = prev.revision + 1
+        changed = False
+        pools_by_id = dict(prev.pools_by_id)
+        pools_by_name = dict(prev.pools_by_name)
+
+        stats = prev.stats
+        current = (
+            stats.total, stats.available, stats.used,
+            stats.raw_used, stats.raw_used_ratio
+        )
+        latest = (
+            df.stats.total_bytes, df.stats.total_avail_bytes,
+            df.stats.total_used_bytes, df.stats.total_used_raw_bytes,
+            df.stats.total_used_raw_ratio
         )
-        by_id: Dict[int, StoragePoolModel] = {}
-        by_name: Dict[str, StoragePoolModel] = {}
+        if current != latest:
+            stats = StorageStatsModel(
+                total=df.stats.total_bytes,
+                available=df.stats.total_avail_bytes,
+                used=df.stats.total_used_bytes,
+                raw_used=df.stats.total_used_raw_bytes,
+                raw_used_ratio=df.stats.total_used_raw_ratio
+            )
+            changed = True
+
+        events: List[StoragePoolEventModel] = []
+        seen: Set[int] = set()
         for p in df.pools:
+            seen.add(p.id)
+            old = pools_by_id.get(p.id)
+            if old is not None and old.name == p.name and \
+               old.stats.used == p.stats.bytes_used and \
+               old.stats.percent_used == p.stats.percent_used and \
+               old.stats.max_available == p.stats.max_avail:
+                continue
             pool: StoragePoolModel = StoragePoolModel(
                 id=p.id,
                 name=p.name,
@@ -123,10 +349,40 @@ class Storage(Ticker):
                     max_available=p.stats.max_avail
                 )
             )
-            by_id[p.id] = pool
-            by_name[p.name] = pool
-        self._state.pools_by_name = by_name
-        self._state.pools_by_id = by_id
+            # another pool may have taken the old name in the meantime.
+            if old is not None and old.name != p.name and \
+               pools_by_name.get(old.name) is old:
+                del pools_by_name[old.name]
+            pools_by_id[p.id] = pool
+            pools_by_name[p.name] = pool
+            events.append(StoragePoolEventModel(
+                revision=revision,
+                type=StoragePoolEventEnum.ADDED if old is None
+                else StoragePoolEventEnum.CHANGED,
+                pool_id=p.id,
+                pool=pool
+            ))
+
+        for pool_id in [i for i in pools_by_id if i not in seen]:
+            gone = pools_by_id.pop(pool_id)
+            if pools_by_name.get(gone.name) is gone:
+                del pools_by_name[gone.name]
+            events.append(StoragePoolEventModel(
+                revision=revision,
+                type=StoragePoolEventEnum.REMOVED,
+                pool_id=pool_id
+            ))
+
+        if changed or events:
+            self._state = StorageModel.construct(
+                revision=revision,
+                stats=stats,
+                pools_by_id=pools_by_id,
+                pools_by_name=pools_by_name
+            )
+            self._emit(events)
+        self.record_change(changed or bool(events))
+        self._record()
 
 
 _storage = Storage()
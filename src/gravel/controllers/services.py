@@ -1,18 +1,26 @@
 # project aquarium's backend
 # Copyright (C) 2021 SUSE, LLC.
 
+import asyncio
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from pydantic import BaseModel
 from pydantic.fields import Field
-from gravel.controllers.orch.ceph import Mon
+from gravel.controllers.orch.ceph import (
+    CephBatch,
+    CephPoolNotFoundError,
+    Mon
+)
 from gravel.controllers.orch.cephfs import CephFS, CephFSError
 from gravel.controllers.orch.models \
     import CephFSListEntryModel, CephOSDPoolEntryModel
+from gravel.controllers.orch.orchestrator import Orchestrator
 from gravel.controllers.gstate import gstate
+from gravel.controllers.resources.forecast import ForecastModel
 from gravel.controllers.resources.storage import (
     Storage,
+    StorageForecastModel,
     get_storage
 )
 
@@ -49,6 +57,13 @@ class ServiceModel(BaseModel):
     replicas: int
 
 
+class ServiceForecastModel(ForecastModel):
+    reservation: int = Field(0, title="Bytes reserved for the service")
+    time_to_reservation: Optional[float] = Field(
+        None, title="Seconds until using up its reservation, if growing"
+    )
+
+
 class StateModel(BaseModel):
     state: Dict[str, ServiceModel]
 
@@ -59,6 +74,19 @@ class ServiceRequirementsModel(BaseModel):
     required: int = Field(0, title="Required additional storage space (bytes)")
 
 
+# services are created one at a time, each checked against what those before
+# it saved; names being created are reserved from when they are accepted.
+_create_lock: Optional[asyncio.Lock] = None
+_creating: Set[str] = set()
+
+
+def _get_create_lock() -> asyncio.Lock:
+    global _create_lock
+    if _create_lock is None:
+        _create_lock = asyncio.Lock()
+    return _create_lock
+
+
 class Services:
 
     _services: Dict[str, ServiceModel]
@@ -67,11 +95,58 @@ class Services:
         self._services = {}
         self._load()
 
-    def create(self, name: str,
-               type: ServiceTypeEnum,
-               size: int,
-               replicas: int
-               ) -> ServiceModel:
+    async def create(self, name: str,
+                     type: ServiceTypeEnum,
+                     size: int,
+                     replicas: int,
+                     reserved: bool = False
+                     ) -> ServiceModel:
+        """ Create a service. Unless the caller 'reserved' its name with
+        'check_create()', and will release it, we reserve it here. """
+        if not reserved:
+            self.check_create(name, type, size, replicas, reserve=True)
+        try:
+            async with _get_create_lock():
+                # others may have created services while we waited.
+                self._load()
+                self._check_create(name, type, size, replicas)
+                svc: ServiceModel = ServiceModel(
+                    name=name,
+                    reservation=size,
+                    type=type,
+                    pools=[],
+                    replicas=replicas
+                )
+                await self._create_service(svc)
+                self._load()
+                self._services[name] = svc
+                self._save()
+        finally:
+            if not reserved:
+                self.release(name)
+        # new pools, soon filling up.
+        gstate.fast_probe("storage")
+        return svc
+
+    def check_create(self, name: str,
+                     type: ServiceTypeEnum,
+                     size: int,
+                     replicas: int,
+                     reserve: bool = False
+                     ) -> None:
+        """ Raise if a service can't be created with these parameters. With
+        'reserve', no one else may create 'name' until it is released. """
+        if name in _creating:
+            raise ServiceExistsError(f"service {name} is being created")
+        self._check_create(name, type, size, replicas)
+        if reserve:
+            _creating.add(name)
+
+    def _check_create(self, name: str,
+                      type: ServiceTypeEnum,
+                      size: int,
+                      replicas: int
+                      ) -> None:
         if type != ServiceTypeEnum.CEPHFS:
             raise NotImplementedError("only cephfs is currently supported")
         if name in self._services:
@@ -81,17 +156,9 @@ class Services:
         if not feasible:
             raise NotEnoughSpaceError(requirements.json())
 
-        svc: ServiceModel = ServiceModel(
-            name=name,
-            reservation=size,
-            type=type,
-            pools=[],
-            replicas=replicas
-        )
-        self._create_service(svc)
-        self._services[name] = svc
-        self._save()
-        return svc
+    @staticmethod
+    def release(name: str) -> None:
+        _creating.discard(name)
 
     def remove(self, name: str):
         pass
@@ -119,6 +186,36 @@ class Services:
         total_storage: int = storage.total
         return (total_storage - self.total_raw_reservation)
 
+    def forecast(
+        self,
+        storage: StorageForecastModel
+    ) -> Dict[str, ServiceForecastModel]:
+        """ Forecast each service from its pools' forecasts. The pools share
+        the same raw space, so the service has as much room left as the
+        most constrained of them. """
+        forecasts: Dict[str, ServiceForecastModel] = {}
+        for svc in self._services.values():
+            pools = [storage.pools[p] for p in svc.pools if p in storage.pools]
+            used = sum(p.used for p in pools)
+            available = min((p.available for p in pools), default=0)
+            growths = [p.growth for p in pools if p.growth is not None]
+            growth: Optional[float] = sum(growths) if growths else None
+
+            ttf: Optional[float] = None
+            ttr: Optional[float] = None
+            if growth is not None and growth > 0:
+                ttf = available / growth
+                ttr = max(0.0, (svc.reservation - used) / growth)
+            forecasts[svc.name] = ServiceForecastModel(
+                used=used,
+                available=available,
+                growth=growth,
+                time_to_full=ttf,
+                reservation=svc.reservation,
+                time_to_reservation=ttr
+            )
+        return forecasts
+
     def __contains__(self, name: str) -> bool:
         return name in self._services
 
@@ -141,44 +238,51 @@ class Services:
         )
         return feasible, requirements
 
-    def _create_service(self, svc: ServiceModel) -> None:
+    async def _create_service(self, svc: ServiceModel) -> None:
         if svc.type == ServiceTypeEnum.CEPHFS:
-            self._create_cephfs(svc)
+            await self._create_cephfs(svc)
         else:
             raise NotImplementedError("only cephfs is currently supported")
 
-    def _create_cephfs(self, svc: ServiceModel) -> None:
+    async def _create_cephfs(self, svc: ServiceModel) -> None:
         cephfs = CephFS()
         try:
-            cephfs.create(svc.name)
+            await cephfs.volume_create_async(svc.name)
         except CephFSError as e:
             raise ServiceError("unable to create cephfs service") from e
 
-        try:
-            fs: CephFSListEntryModel = cephfs.get_fs_info(svc.name)
-        except CephFSError as e:
-            raise ServiceError("unable to list cephfs filesystems") from e
+        # none of these depend on each other, only on the volume existing.
+        mon = Mon()
+        orch = Orchestrator()
+        batch = CephBatch()
+        batch.add(orch.apply_mds, svc.name)
+        fs_idx = batch.add(cephfs.get_fs_info, svc.name)
+        batch.add(mon.get_osdmap)
+        results: List[Any] = await batch.run(return_exceptions=True)
+
+        for res in results:
+            if isinstance(res, CephFSError):
+                raise ServiceError("unable to list cephfs filesystems") \
+                    from res
+            elif isinstance(res, Exception):
+                raise ServiceError("unable to create cephfs service") \
+                    from res
+        fs: CephFSListEntryModel = results[fs_idx]
         assert fs.name == svc.name
 
-        mon = Mon()
-        pools: List[CephOSDPoolEntryModel] = mon.get_pools()
-
-        def get_pool(name: str) -> CephOSDPoolEntryModel:
-            for pool in pools:
-                if pool.pool_name == name:
-                    return pool
-            raise ServiceError(f"unknown pool {name}")
-
-        metadata_pool = get_pool(fs.metadata_pool)
-        if metadata_pool.size != svc.replicas:
-            mon.set_pool_size(metadata_pool.pool_name, svc.replicas)
-        svc.pools.append(metadata_pool.pool)
-
-        for name in fs.data_pools:
-            data_pool = get_pool(name)
-            if data_pool.size != svc.replicas:
-                mon.set_pool_size(data_pool.pool_name, svc.replicas)
-            svc.pools.append(data_pool.pool)
+        pools: List[CephOSDPoolEntryModel] = []
+        for name in [fs.metadata_pool] + fs.data_pools:
+            try:
+                pools.append(await mon.get_pool_async(name))
+            except CephPoolNotFoundError as e:
+                raise ServiceError(f"unknown pool {name}") from e
+
+        batch = CephBatch()
+        for pool in pools:
+            if pool.size != svc.replicas:
+                batch.add(mon.set_pool_size, pool.pool_name, svc.replicas)
+            svc.pools.append(pool.pool)
+        await batch.run()
 
     def _save(self) -> None:
         assert gstate.config.options.service_state_path
@@ -27,6 +27,36 @@ def mock_ceph_modules():
 mock_ceph_modules()
 
 
+@pytest.fixture(autouse=True)
+def ceph_conn_mgr(mocker):
+    """ Connections and cached cluster state are process-wide; give each
+    test its own. """
+    from gravel.controllers.orch.ceph import CephConnMgr
+    conn_mgr = CephConnMgr()
+    mocker.patch('gravel.controllers.orch.ceph._conn_mgr', conn_mgr)
+    yield conn_mgr
+    conn_mgr.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def cephadm_scheduler(mocker):
+    """ As above, commands queued or running are tracked process-wide. """
+    from gravel.cephadm.scheduler import CephadmScheduler
+    scheduler = CephadmScheduler()
+    mocker.patch('gravel.cephadm.scheduler._scheduler', scheduler)
+    yield scheduler
+
+
+@pytest.fixture(autouse=True)
+def job_mgr(mocker):
+    """ As above, for jobs and the pools running them. """
+    from gravel.controllers.jobs import JobMgr
+    mgr = JobMgr()
+    mocker.patch('gravel.controllers.jobs._job_mgr', mgr)
+    yield mgr
+    mgr.shutdown()
+
+
 @pytest.fixture(params=['default_ceph.conf'])
 def ceph_conf_file_fs(request, fs):
     """ This fixture uses pyfakefs to stub filesystem calls and return
@@ -59,8 +89,26 @@ def get_data_contents(fs):
 @pytest.fixture()
 def gstate(mocker):
     mocker.patch('gravel.controllers.config.Config')
+    from gravel.controllers.config import (
+        InventoryOptionsModel,
+        JobsOptionsModel
+    )
     from gravel.controllers.gstate import gstate as _gstate
+    # sizes of pools and rings are taken from these, and must be numbers.
+    mocker.patch.object(_gstate.config.options, 'jobs', JobsOptionsModel())
+    mocker.patch.object(
+        _gstate.config.options, 'inventory', InventoryOptionsModel()
+    )
+    # don't have tickers set up by modules imported elsewhere tick here.
+    saved = dict(_gstate.tickers)
+    for desc in saved:
+        _gstate.rm_ticker(desc)
     yield _gstate
+    _gstate.is_shutting_down = False
+    for desc in list(_gstate.tickers):
+        _gstate.rm_ticker(desc)
+    for desc, ticker in saved.items():
+        _gstate.add_ticker(desc, ticker)
 
 
 @pytest.fixture()
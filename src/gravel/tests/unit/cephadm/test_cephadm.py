@@ -1,9 +1,11 @@
 from typing import Any, Dict, List, Tuple
+import asyncio
 import json
 import os
 import pytest
+import time
 
-from gravel.cephadm.cephadm import Cephadm, CephadmError
+from gravel.cephadm.cephadm import Cephadm, CephadmError, CephadmTimeoutError
 from gravel.cephadm.models \
     import HostFactsModel, NodeInfoModel, VolumeDeviceModel
 
@@ -14,7 +16,7 @@ DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 @pytest.mark.asyncio
 async def test_bootstrap(mocker):
 
-    async def mock_call(cmd: str) -> Tuple[str, str, int]:
+    async def mock_call(cmd: str, progress=None) -> Tuple[str, str, int]:
         return "foo", "bar", 0
 
     cephadm = Cephadm()
@@ -131,3 +133,52 @@ async def test_get_node_info(mocker, get_data_contents):
     info: NodeInfoModel = await cephadm.get_node_info()
     assert info.hostname == facts_result.hostname
     assert info.disks == inventory_result
+
+
+@pytest.mark.asyncio
+async def test_get_node_info_concurrent(mocker, get_data_contents):
+    facts = HostFactsModel.parse_raw(
+        get_data_contents(DATA_DIR, 'gather_facts_real.json'))
+
+    async def mock_facts() -> HostFactsModel:
+        await asyncio.sleep(0.2)
+        return facts
+
+    async def mock_inventory_fail() -> List[VolumeDeviceModel]:
+        await asyncio.sleep(0.2)
+        raise CephadmTimeoutError("timed out")
+
+    cephadm = Cephadm()
+    mocker.patch.object(cephadm, 'gather_facts', side_effect=mock_facts)
+    mocker.patch.object(
+        cephadm, 'get_volume_inventory', side_effect=mock_inventory_fail
+    )
+
+    start = time.monotonic()
+    info: NodeInfoModel = await cephadm.get_node_info()
+    assert time.monotonic() - start < 0.4
+    assert info.hostname == facts.hostname
+    assert info.disks == []
+    assert info.disks_stale
+
+    async def mock_facts_fail() -> HostFactsModel:
+        raise CephadmError("failed")
+
+    mocker.patch.object(cephadm, 'gather_facts', side_effect=mock_facts_fail)
+    with pytest.raises(CephadmError):
+        await cephadm.get_node_info()
+
+
+@pytest.mark.asyncio
+async def test_call_timeout(mocker):
+    cephadm = Cephadm()
+    cephadm.cephadm = "sleep"
+    terminate = mocker.spy(cephadm, '_terminate')
+
+    start = time.monotonic()
+    with pytest.raises(CephadmTimeoutError):
+        await cephadm._call_with_timeout("10", 0.2)
+    assert time.monotonic() - start < 5
+    terminate.assert_called_once()
+    process = terminate.call_args[0][0]
+    assert process.returncode is not None
@@ -0,0 +1,107 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Tuple
+
+import pytest
+
+import gravel
+from gravel.cephadm.cephadm import Cephadm, CephadmTimeoutError
+
+
+FAKE_CEPHADM = """
+import os
+import sys
+import time
+
+def main():
+    pidfile = os.path.join(os.path.dirname(__file__), "pid")
+    if os.path.exists(pidfile):
+        with open(pidfile, "w") as f:
+            f.write(str(os.getpid()))
+        time.sleep(30)
+    print(" ".join(sys.argv[1:]))
+    print("some log", file=sys.stderr)
+    if sys.argv[1] == "ceph-volume":
+        sys.exit(3)
+"""
+
+
+@pytest.fixture
+def helper(tmp_path):
+    script = tmp_path / "cephadm"
+    script.write_text(FAKE_CEPHADM)
+    path = os.path.join(str(tmp_path), "helper", "cephadm.sock")
+    srcdir = os.path.dirname(os.path.dirname(gravel.__file__))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gravel.cephadm.helper",
+         "--cephadm", str(script), "--socket", path],
+        cwd=srcdir
+    )
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.1)
+    yield path
+    process.terminate()
+    process.wait()
+
+
+@pytest.mark.asyncio
+async def test_call_helper(helper, mocker):
+    cephadm = Cephadm(helper_socket=helper)
+    execmock = mocker.patch.object(cephadm, "_exec")
+
+    out, err, rc = await cephadm.call("gather-facts")
+    assert out == "gather-facts\n"
+    assert err == "some log\n"
+    assert rc == 0
+
+    out, _, rc = await cephadm.call("ceph-volume inventory --format=json")
+    assert out == "ceph-volume inventory --format=json\n"
+    assert rc == 3
+    execmock.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_call_fallback(helper, tmp_path, mocker):
+
+    async def mock_exec(cmd: str, progress=None) -> Tuple[str, str, int]:
+        return "exec", "", 0
+
+    # not served by the helper
+    cephadm = Cephadm(helper_socket=helper)
+    mocker.patch.object(cephadm, "_exec", side_effect=mock_exec)
+    assert await cephadm.call("bootstrap --mon-ip 127.0.0.1") == \
+        ("exec", "", 0)
+
+    # helper not running
+    cephadm = Cephadm(helper_socket=str(tmp_path / "missing.sock"))
+    mocker.patch.object(cephadm, "_exec", side_effect=mock_exec)
+    assert await cephadm.call("gather-facts") == ("exec", "", 0)
+
+
+@pytest.mark.asyncio
+async def test_call_helper_cancelled(helper, tmp_path):
+    pidfile = tmp_path / "pid"
+    pidfile.write_text("")
+
+    cephadm = Cephadm(helper_socket=helper)
+    with pytest.raises(CephadmTimeoutError):
+        await cephadm.gather_facts(timeout=1.0)
+
+    # the helper terminates the command once we're gone
+    pid = int(pidfile.read_text())
+    for _ in range(50):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        await asyncio.sleep(0.1)
+    else:
+        pytest.fail("command not terminated")
@@ -0,0 +1,81 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import asyncio
+from typing import List
+
+import pytest
+
+from gravel.cephadm.cephadm import Cephadm
+from gravel.cephadm.models import CephadmEventModel, CephadmEventTypeEnum
+from gravel.cephadm.output import CephadmProgress, LineSplitter, OutputBuffer
+
+
+def test_output_buffer():
+    buf = OutputBuffer(max_bytes=8)
+    buf.append(b"abc")
+    buf.append(b"def")
+    assert buf.getvalue() == "abcdef"
+    assert not buf.truncated
+
+    buf.append(b"ghijk")
+    assert len(buf) == 8
+    assert buf.getvalue() == "defghijk"
+    assert buf.truncated
+
+
+def test_line_splitter():
+    splitter = LineSplitter()
+    assert splitter.feed(b"foo\nba") == ["foo"]
+    # a multi-byte character split across chunks
+    assert splitter.feed(b"r\xc3") == []
+    assert splitter.feed(b"\xa9\nbaz") == ["baré"]
+    assert splitter.flush() == ["baz"]
+
+
+@pytest.mark.asyncio
+async def test_progress_events():
+    progress = CephadmProgress(max_events=3)
+    progress.add_line("stderr", "Pulling container image...")
+    progress.add_line("stdout", "")
+
+    seen: List[CephadmEventModel] = []
+
+    async def subscribe() -> None:
+        async for event in progress.events():
+            seen.append(event)
+
+    task = asyncio.ensure_future(subscribe())
+    await asyncio.sleep(0)
+    progress.add_line("stdout", "some output")
+    await asyncio.sleep(0)
+    progress.finish(0)
+    await asyncio.wait_for(task, 1)
+
+    assert [e.type for e in seen] == [
+        CephadmEventTypeEnum.STEP,
+        CephadmEventTypeEnum.OUTPUT,
+        CephadmEventTypeEnum.DONE
+    ]
+    assert seen[0].msg == "Pulling container image"
+    assert seen[-1].rc == 0
+    assert progress.last_step == "Pulling container image"
+
+    # late subscribers only get what is retained
+    late = [e.seq async for e in progress.events(since=2)]
+    assert late == [2]
+
+
+@pytest.mark.asyncio
+async def test_call_progress():
+    cephadm = Cephadm(helper_socket=None)
+    cephadm.cephadm = "echo"
+    progress = CephadmProgress()
+
+    out, _, rc = await cephadm.call("Creating keys...", progress=progress)
+    progress.finish(rc)
+    assert out == "Creating keys...\n"
+    events = [e async for e in progress.events()]
+    assert events[0].type == CephadmEventTypeEnum.STEP
+    assert events[0].msg == "Creating keys"
+    assert events[0].stream == "stdout"
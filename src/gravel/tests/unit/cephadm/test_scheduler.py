@@ -0,0 +1,73 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import asyncio
+from typing import List
+
+import pytest
+
+from gravel.cephadm.scheduler import CephadmPriorityEnum, CephadmScheduler
+
+
+@pytest.mark.asyncio
+async def test_priorities():
+    scheduler = CephadmScheduler(max_concurrent=1)
+    order: List[str] = []
+    resume = asyncio.Event()
+
+    async def run(name: str, prio: CephadmPriorityEnum) -> None:
+        async with scheduler.slot(prio):
+            order.append(name)
+            await resume.wait()
+
+    first = asyncio.ensure_future(run("first", CephadmPriorityEnum.BACKGROUND))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.ensure_future(run(name, prio)) for name, prio in [
+            ("bg", CephadmPriorityEnum.BACKGROUND),
+            ("bootstrap", CephadmPriorityEnum.BOOTSTRAP),
+            ("api1", CephadmPriorityEnum.INTERACTIVE),
+            ("api2", CephadmPriorityEnum.INTERACTIVE),
+        ]
+    ]
+    await asyncio.sleep(0)
+
+    stats = scheduler.get_stats()
+    assert stats.running == 1
+    assert stats.queues[CephadmPriorityEnum.INTERACTIVE].queued == 2
+    assert stats.queues[CephadmPriorityEnum.BACKGROUND].queued == 1
+
+    resume.set()
+    await asyncio.gather(first, *tasks)
+    assert order == ["first", "api1", "api2", "bootstrap", "bg"]
+
+    stats = scheduler.get_stats()
+    assert stats.running == 0
+    assert stats.queues[CephadmPriorityEnum.INTERACTIVE].started == 2
+    assert stats.queues[CephadmPriorityEnum.BACKGROUND].started == 2
+    assert stats.queues[CephadmPriorityEnum.BACKGROUND].wait_max > 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_waiting():
+    scheduler = CephadmScheduler(max_concurrent=1)
+    resume = asyncio.Event()
+
+    async def run() -> None:
+        async with scheduler.slot(CephadmPriorityEnum.INTERACTIVE):
+            await resume.wait()
+
+    running = asyncio.ensure_future(run())
+    await asyncio.sleep(0)
+    waiting = asyncio.ensure_future(run())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.get_stats().queues[
+        CephadmPriorityEnum.INTERACTIVE].queued == 0
+
+    resume.set()
+    await running
+    # the cancelled waiter didn't take the slot with it
+    await asyncio.wait_for(run(), 1)
+    assert scheduler.get_stats().running == 0
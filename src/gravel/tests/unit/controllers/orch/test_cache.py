@@ -0,0 +1,142 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import asyncio
+import threading
+import time
+import pytest
+from typing import List
+
+from gravel.controllers.orch.cache import AsyncTTLCache, TTLCache
+
+
+def test_ttl(mocker):
+    now = 100.0
+    mocker.patch("time.monotonic", side_effect=lambda: now)
+    calls: List[int] = []
+
+    def fetch() -> int:
+        calls.append(1)
+        return len(calls)
+
+    cache = TTLCache(ttl=5.0)
+    assert cache.get("foo", fetch) == 1
+    assert cache.get("foo", fetch) == 1
+    assert cache.get("bar", fetch) == 2
+
+    now += 5.0
+    assert cache.get("foo", fetch) == 3
+
+    cache.invalidate()
+    assert cache.get("foo", fetch) == 4
+
+    # no ttl, no caching
+    cache.ttl = 0
+    assert cache.get("foo", fetch) == 5
+    assert cache.get("foo", fetch) == 6
+
+
+def test_error_not_cached():
+    cache = TTLCache(ttl=5.0)
+
+    def fail() -> int:
+        raise Exception("foo")
+
+    with pytest.raises(Exception, match="foo"):
+        cache.get("foo", fail)
+    assert cache.get("foo", lambda: 42) == 42
+
+
+def test_coalescing():
+    cache = TTLCache(ttl=5.0)
+    started = threading.Event()
+    calls: List[int] = []
+    results: List[int] = []
+
+    def fetch() -> int:
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 42
+
+    def run() -> None:
+        results.append(cache.get("foo", fetch))
+
+    threads = [threading.Thread(target=run) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [42] * 5
+
+
+def test_invalidate_in_flight():
+    cache = TTLCache(ttl=5.0)
+    started = threading.Event()
+    resume = threading.Event()
+
+    def slow_fetch() -> int:
+        started.set()
+        resume.wait()
+        return 1
+
+    t = threading.Thread(target=cache.get, args=("foo", slow_fetch))
+    t.start()
+    started.wait()
+    cache.invalidate()
+    resume.set()
+    t.join()
+
+    # the result obtained before invalidating must not be kept
+    assert cache.get("foo", lambda: 2) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_coalescing():
+    cache = AsyncTTLCache(ttl=5.0)
+    calls: List[int] = []
+
+    async def fetch() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return len(calls)
+
+    results = await asyncio.gather(*[cache.get("foo", fetch) for _ in range(5)])
+    assert results == [1] * 5
+    assert await cache.get("foo", fetch) == 1
+    assert len(calls) == 1
+
+    cache.invalidate()
+    assert await cache.get("foo", fetch) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_cancelled_caller():
+    cache = AsyncTTLCache(ttl=5.0)
+    calls: List[int] = []
+
+    async def fetch() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return 42
+
+    first = asyncio.ensure_future(cache.get("foo", fetch))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(cache.get("foo", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    # one caller giving up does not abort the fetch for the other
+    assert await second == 42
+    assert len(calls) == 1
+
+    async def fail() -> int:
+        raise Exception("foo")
+
+    with pytest.raises(Exception, match="foo"):
+        await cache.get("bar", fail)
+    assert await cache.get("bar", fetch) == 42
@@ -4,8 +4,9 @@
 import json
 import os
 import pytest
+import time
 
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from gravel.controllers.orch.ceph import Mgr, Mon
 
@@ -84,3 +85,373 @@ def test_set_pool_size(ceph_conf_file_fs, mocker):
     )
     mon = Mon()
     mon.set_pool_size("foobar", 2)
+
+
+def test_cached_queries(ceph_conf_file_fs, mocker, get_data_contents):
+    callmock = mocker.MagicMock(
+        return_value=json.loads(get_data_contents(DATA_DIR, 'mon_df_raw.json'))
+    )
+    mon = Mon()
+    mocker.patch.object(mon, "call", new=callmock)
+    first = mon.df()
+    assert Mon().df() is first
+    assert callmock.call_count == 1
+
+    # writes drop what we know about the cluster
+    mon.set_pool_size("foobar", 2)
+    assert callmock.call_count == 2
+    assert mon.df() is not first
+    assert callmock.call_count == 3
+
+
+def test_conn_pool(mocker):
+    import rados
+    from gravel.controllers.orch.ceph import (
+        CephConnectionPool,
+        CephNotConnectedError
+    )
+
+    handles: List[Any] = []
+
+    def new_handle(**kwargs: Any) -> Any:
+        handles.append(mocker.MagicMock())
+        return handles[-1]
+
+    radosmock = mocker.patch(
+        "gravel.controllers.orch.ceph.rados.Rados", side_effect=new_handle
+    )
+    pool = CephConnectionPool("/etc/ceph/ceph.conf", size=2)
+    assert not pool.is_connected()
+
+    first = pool.get()
+    second = pool.get()
+    assert first is not second
+    assert pool.get() is first
+    assert pool.get() is second
+    assert radosmock.call_count == 2
+    assert pool.is_connected()
+    for cluster in [first, second, first, second]:
+        pool.put(cluster)
+
+    # broken handles are replaced on next use
+    pool.invalidate(first)
+    handles[0].shutdown.assert_called_once()
+    third = pool.get()
+    assert third is not first
+    assert radosmock.call_count == 3
+    pool.put(third)
+
+    # as are handles that are no longer connected
+    handles[1].require_state.side_effect = rados.Error("not connected")
+    fourth = pool.get()
+    assert fourth is not second
+    assert radosmock.call_count == 4
+    handles[1].shutdown.assert_called_once()
+
+    # handles in use are taken out of rotation, but only shut down once
+    # their last user is done with them
+    with pool.use() as cluster:
+        assert cluster is third
+        with pool.use() as again:
+            assert again is fourth
+        pool.invalidate(third)
+        assert pool.get() is not third
+        handles[2].shutdown.assert_not_called()
+    handles[2].shutdown.assert_called_once()
+
+    # the same goes for shutting down
+    pool.shutdown()
+    handles[4].shutdown.assert_not_called()
+    pool.put(fourth)
+    handles[3].shutdown.assert_called_once()
+    pool.put(handles[4])
+    handles[4].shutdown.assert_called_once()
+    with pytest.raises(CephNotConnectedError):
+        pool.get()
+
+
+def test_conn_mgr(ceph_conf_file_fs):
+    from gravel.controllers.orch.ceph import (
+        CephConnMgr,
+        CephNotConnectedError
+    )
+
+    mgr = CephConnMgr()
+    pool = mgr.get_pool("/etc/ceph/ceph.conf")
+    assert mgr.get_pool("/etc/ceph/ceph.conf") is pool
+    assert mgr.get_pool("/foo/bar.conf") is not pool
+
+    # Mon and Mgr share the process-wide pool
+    assert Mon()._pool is Mgr()._pool
+
+    mgr.shutdown()
+    assert pool.is_shutdown
+    with pytest.raises(CephNotConnectedError):
+        mgr.get_pool("/etc/ceph/ceph.conf")
+
+
+@pytest.mark.asyncio
+async def test_conn_mgr_shutdown(mocker):
+    import asyncio
+    from gravel.controllers.orch.ceph import CephConnMgr
+
+    mgr = CephConnMgr()
+    pool = mgr.get_pool("/etc/ceph/ceph.conf")
+    events: List[str] = []
+
+    def slow() -> None:
+        time.sleep(0.2)
+        events.append("done")
+
+    mocker.patch.object(
+        pool, "shutdown", side_effect=lambda: events.append("shutdown")
+    )
+    task = asyncio.ensure_future(mgr.run_async(slow, timeout=None))
+    await asyncio.sleep(0.05)
+    # connections are only shut down once commands under way are done
+    await asyncio.get_event_loop().run_in_executor(None, mgr.shutdown)
+    assert events == ["done", "shutdown"]
+    await task
+
+
+@pytest.mark.asyncio
+async def test_call_async(ceph_conf_file_fs, mocker):
+    from gravel.controllers.orch.ceph import CephTimeoutError
+
+    mon = Mon()
+    cluster = mocker.MagicMock()
+    cluster.mon_command.return_value = (0, b'{"foo": "bar"}', "")
+    mocker.patch.object(mon._pool, "get", return_value=cluster)
+
+    res = await mon.call_async({"prefix": "foo"}, timeout=10.0)
+    assert res == {"foo": "bar"}
+    # the deadline is handed down to librados
+    _, kwargs = cluster.mon_command.call_args
+    assert 0 < kwargs["timeout"] <= 10
+
+    # no deadline, no librados timeout
+    await mon.call_async({"prefix": "foo"}, timeout=None)
+    _, kwargs = cluster.mon_command.call_args
+    assert kwargs["timeout"] == 0
+
+    def slow_call(cmd: Dict[str, Any]) -> Any:
+        time.sleep(0.5)
+        return {}
+
+    mocker.patch.object(mon, "call", side_effect=slow_call)
+    with pytest.raises(CephTimeoutError):
+        await mon.call_async({"prefix": "foo"}, timeout=0.1)
+
+
+def test_osdmap_epoch(ceph_conf_file_fs, mocker, get_data_contents):
+    from gravel.controllers.orch.ceph import CephPoolNotFoundError
+
+    osdmap: Dict[str, Any] = json.loads(
+        get_data_contents(DATA_DIR, 'mon_osdmap_raw.json')
+    )
+    osdmap["pools"] = [
+        {"pool": 1, "pool_name": "foo", "size": 3, "min_size": 2},
+        {"pool": 2, "pool_name": "bar", "size": 2, "min_size": 1},
+    ]
+    cmds: List[str] = []
+
+    def mock_call(cmd: Dict[str, Any]) -> Any:
+        cmds.append(cmd["prefix"])
+        if cmd["prefix"] == "osd stat":
+            return {"epoch": osdmap["epoch"]}
+        return osdmap
+
+    mon = Mon()
+    mocker.patch.object(mon, "call", side_effect=mock_call)
+
+    assert mon.get_pool("foo").pool == 1
+    assert mon.get_pool_by_id(2).pool_name == "bar"
+    with pytest.raises(CephPoolNotFoundError):
+        mon.get_pool("baz")
+    assert cmds == ["osd stat", "osd dump"]
+
+    # same epoch, no need to download the map again
+    mon.invalidate_cache()
+    first = mon.get_osdmap()
+    assert cmds == ["osd stat", "osd dump", "osd stat"]
+    assert mon.get_osdmap() is first
+
+    osdmap["epoch"] += 1
+    mon.invalidate_cache()
+    assert mon.get_osdmap().epoch == 5
+    assert cmds[-2:] == ["osd stat", "osd dump"]
+
+
+def test_circuit_breaker(mocker):
+    from gravel.controllers.orch.ceph import (
+        CephCircuitBreaker,
+        CephCircuitStateEnum,
+        CephNotConnectedError
+    )
+
+    now = 100.0
+    mocker.patch("time.monotonic", side_effect=lambda: now)
+
+    breaker = CephCircuitBreaker(threshold=2, cooldown=10.0)
+    breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CephCircuitStateEnum.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CephCircuitStateEnum.OPEN
+    assert breaker.is_open
+    with pytest.raises(CephNotConnectedError):
+        breaker.allow_request()
+    assert breaker.get_status().retry_in == 10.0
+
+    # cooldown expired, only one probe is let through
+    now += 10.0
+    assert not breaker.is_open
+    breaker.allow_request()
+    assert breaker.state == CephCircuitStateEnum.HALF_OPEN
+    with pytest.raises(CephNotConnectedError):
+        breaker.allow_request()
+
+    # failed probe opens the circuit right away
+    breaker.record_failure()
+    assert breaker.state == CephCircuitStateEnum.OPEN
+    now += 10.0
+    breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CephCircuitStateEnum.CLOSED
+    assert breaker.get_status().failures == 0
+
+
+def test_connect_timeout(mocker):
+    import threading
+    from gravel.controllers.orch.ceph import (
+        CephCircuitStateEnum,
+        CephConnectionPool,
+        CephNotConnectedError
+    )
+
+    resume = threading.Event()
+    cluster = mocker.MagicMock()
+    cluster.connect.side_effect = lambda: resume.wait()
+    mocker.patch(
+        "gravel.controllers.orch.ceph.rados.Rados", return_value=cluster
+    )
+
+    pool = CephConnectionPool("/etc/ceph/ceph.conf", connect_timeout=0.1)
+    pool.breaker.threshold = 1
+    with pytest.raises(CephNotConnectedError, match="timed out"):
+        pool.get()
+    assert pool.breaker.state == CephCircuitStateEnum.OPEN
+    # fails fast from now on
+    with pytest.raises(CephNotConnectedError, match="circuit open"):
+        pool.get()
+    assert cluster.connect.call_count == 1
+
+    # late connections are dropped by the watchdog
+    resume.set()
+    for _ in range(50):
+        if cluster.shutdown.called:
+            break
+        time.sleep(0.01)
+    cluster.shutdown.assert_called_once()
+
+
+def test_connect_unlocked(mocker):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from gravel.controllers.orch.ceph import CephConnectionPool
+
+    resume = threading.Event()
+    connecting = threading.Event()
+    cluster = mocker.MagicMock()
+
+    def connect() -> None:
+        connecting.set()
+        resume.wait()
+
+    cluster.connect.side_effect = connect
+    radosmock = mocker.patch(
+        "gravel.controllers.orch.ceph.rados.Rados", return_value=cluster
+    )
+
+    pool = CephConnectionPool("/etc/ceph/ceph.conf", size=1)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(pool.get)
+        assert connecting.wait(1)
+        # status is available while connecting, and doesn't wait for it
+        assert not pool.is_connected()
+        assert not pool.get_status().connected
+        # others wait for the same handle rather than connecting again
+        second = executor.submit(pool.get)
+        time.sleep(0.05)
+        assert not second.done()
+        resume.set()
+        assert first.result(1) is cluster
+        assert second.result(1) is cluster
+    assert radosmock.call_count == 1
+    assert pool.is_connected()
+    pool.shutdown()
+
+
+def test_cmd_deadline(ceph_conf_file_fs, mocker):
+    import errno
+    from gravel.controllers.orch.ceph import (
+        CephCommandError,
+        CephTimeoutError,
+        _cmd_deadline
+    )
+
+    mon = Mon()
+    mon._pool.breaker.threshold = 1
+    cluster = mocker.MagicMock()
+    cluster.mon_command.return_value = (-errno.ETIMEDOUT, b"", "timed out")
+    mocker.patch.object(mon._pool, "get", return_value=cluster)
+
+    # our own deadline expiring is no sign of a broken connection
+    _cmd_deadline.value = time.monotonic() + 10
+    try:
+        with pytest.raises(CephTimeoutError):
+            mon.call({"prefix": "foo"})
+    finally:
+        _cmd_deadline.value = None
+    assert mon._pool.breaker.get_status().failures == 0
+    assert not mon._pool.breaker.is_open
+
+    # librados giving up on its own is
+    with pytest.raises(CephCommandError):
+        mon.call({"prefix": "foo"})
+    assert mon._pool.breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_batch(ceph_conf_file_fs, mocker):
+    from gravel.controllers.orch.ceph import CephBatch, CephCommandError
+
+    def slow_call(cmd: Dict[str, Any]) -> Any:
+        time.sleep(0.2)
+        if cmd["prefix"] == "fail":
+            raise CephCommandError("failed")
+        return {"prefix": cmd["prefix"]}
+
+    mon = Mon()
+    mocker.patch.object(mon, "call", side_effect=slow_call)
+
+    batch = CephBatch()
+    for prefix in ["foo", "bar", "baz"]:
+        batch.add_cmd(mon, {"prefix": prefix})
+    idx = batch.add(lambda x: x * 2, 21)
+    assert len(batch) == 4
+
+    start = time.monotonic()
+    res = await batch.run()
+    assert time.monotonic() - start < 0.5
+    assert [r["prefix"] for r in res[:3]] == ["foo", "bar", "baz"]
+    assert res[idx] == 42
+
+    batch = CephBatch()
+    batch.add_cmd(mon, {"prefix": "foo"})
+    batch.add_cmd(mon, {"prefix": "fail"})
+    res = await batch.run(return_exceptions=True)
+    assert res[0] == {"prefix": "foo"}
+    assert isinstance(res[1], CephCommandError)
+    with pytest.raises(CephCommandError):
+        await batch.run()
@@ -0,0 +1,151 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import json
+import os
+import pytest
+from typing import Any, Dict, List, Type
+
+from pydantic import BaseModel
+from pydantic.tools import parse_obj_as
+
+from gravel.controllers.config import ParseOptionsModel
+from gravel.controllers.orch.decode import (
+    DecodeError,
+    ParseOffloader,
+    construct_list,
+    construct_model,
+    json_loads
+)
+from gravel.controllers.orch.models import (
+    CephDFModel,
+    CephFSListEntryModel,
+    CephOSDMapModel,
+    CephStatusModel
+)
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def test_json_loads():
+    assert json_loads(b'{"foo": [1, 2]}') == {"foo": [1, 2]}
+    with pytest.raises(json.JSONDecodeError):
+        json_loads(b"free-form")
+
+
+@pytest.mark.parametrize("model,fn", [
+    (CephDFModel, 'mon_df_raw.json'),
+    (CephOSDMapModel, 'mon_osdmap_raw.json')
+])
+def test_construct_model(
+    get_data_contents, model: Type[BaseModel], fn: str
+):
+    raw = json_loads(get_data_contents(DATA_DIR, fn))
+    assert construct_model(model, raw) == model.parse_obj(raw)
+
+
+def test_construct_nested():
+    raw: Dict[str, Any] = {
+        "fsid": "foo",
+        "election_epoch": 3,
+        "quorum": [0],
+        "quorum_names": ["a"],
+        "quorum_age": 42,
+        "health": {
+            "status": "HEALTH_WARN",
+            "checks": {
+                "OSD_DOWN": {
+                    "severity": "HEALTH_WARN",
+                    "summary": {"message": "1 osds down", "count": 1}
+                }
+            }
+        },
+        "not_a_field": True
+    }
+    status = construct_model(CephStatusModel, raw)
+    assert status == CephStatusModel.parse_obj(raw)
+    assert status.health.checks["OSD_DOWN"].summary.count == 1
+
+    fs: List[Dict[str, Any]] = [{
+        "name": "foo",
+        "metadata_pool": "cephfs.foo.meta",
+        "metadata_pool_id": 1,
+        "data_pool_ids": [2],
+        "data_pools": ["cephfs.foo.data"]
+    }]
+    assert construct_list(CephFSListEntryModel, fs) == \
+        parse_obj_as(List[CephFSListEntryModel], fs)
+
+
+@pytest.mark.asyncio
+async def test_parse_offloader(mocker, job_mgr):
+    fs: List[Dict[str, Any]] = [{
+        "name": "foo",
+        "metadata_pool": "cephfs.foo.meta",
+        "metadata_pool_id": 1,
+        "data_pool_ids": [2],
+        "data_pools": ["cephfs.foo.data"]
+    }]
+    raw = json.dumps(fs)
+    expected = parse_obj_as(List[CephFSListEntryModel], fs)
+    spy = mocker.spy(job_mgr, "run_in_process")
+
+    offloader = ParseOffloader()
+    offloader.configure(ParseOptionsModel(
+        offload=True, offload_min_bytes=len(raw) + 1, offload_min_items=2
+    ))
+    tp = List[CephFSListEntryModel]
+    # too small to be worth another process.
+    assert await offloader.parse_json_as(tp, raw) == expected
+    assert await offloader.parse_obj_as(tp, fs, 1) == expected
+    assert spy.call_count == 0
+
+    offloader.configure(ParseOptionsModel(
+        offload=True, offload_min_bytes=len(raw), offload_min_items=1
+    ))
+    assert await offloader.parse_json_as(tp, raw) == expected
+    assert await offloader.parse_obj_as(tp, fs, 1) == expected
+    assert spy.call_count == 2
+
+    # errors make it back from the other process.
+    with pytest.raises(DecodeError):
+        await offloader.parse_json_as(tp, "free-form" + " " * len(raw))
+    with pytest.raises(DecodeError):
+        await offloader.parse_obj_as(tp, [{"name": "foo"}], 1)
+
+
+@pytest.mark.asyncio
+async def test_devices_ls_async_coerces(ceph_conn_mgr, mocker):
+    from gravel.controllers.config import CephOptionsModel
+    from gravel.controllers.orch.orchestrator import Orchestrator
+
+    sys_api = {
+        "human_readable_size": "10.00 GB", "locked": 0, "model": "foo",
+        "nr_requests": 256, "partitions": {}, "removable": "0",
+        "rev": "1", "ro": "0", "rotational": "1", "sas_address": "",
+        "sas_device_handle": "", "scheduler_mode": "mq-deadline",
+        "sectors": 0, "sectorsize": "512", "size": 10737418240.0,
+        "support_discard": "0", "vendor": "foo"
+    }
+    devs = [{
+        "addr": "127.0.0.1", "labels": [], "name": "foo",
+        "devices": [{
+            "available": True, "device_id": "foo", "lsm_data": {},
+            "lvs": [], "path": "/dev/foo", "rejected_reasons": [],
+            "sys_api": sys_api
+        }]
+    }]
+    # device listings are validated even when other replies are trusted.
+    ceph_conn_mgr.configure(CephOptionsModel(trusted_models=True))
+    mocker.patch("gravel.controllers.orch.orchestrator.Mgr")
+    orch = Orchestrator()
+    mocker.patch.object(
+        orch.cluster, "run_async", mocker.AsyncMock(return_value=devs)
+    )
+
+    hosts = await orch.devices_ls_async()
+    dev = hosts[0].devices[0].sys_api
+    assert dev.removable is False and dev.ro is False
+    assert dev.rotational is True
+    assert dev.size == 10737418240 and isinstance(dev.size, int)
@@ -0,0 +1,84 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+from pathlib import Path
+
+from gravel.controllers.config import CapacityTierOptionsModel
+from gravel.controllers.resources.capacity import CapacityStore
+
+
+def _store(path: Path, max_series: int = 4) -> CapacityStore:
+    store = CapacityStore(path, [
+        CapacityTierOptionsModel(step=60, rows=10),
+        CapacityTierOptionsModel(step=10, rows=6)
+    ], max_series)
+    store.open()
+    return store
+
+
+def test_capacity_tiers(tmp_path: Path):
+    store = _store(tmp_path / "capacity.rrd")
+    base = 6000.0
+    for n in range(12):
+        store.update(base + n * 10, {"used": float(n)})
+
+    # the last minute, at the finest resolution; slots are averaged.
+    step, points = store.query("used", base + 60, base + 110)
+    assert step == 10
+    assert [(p.timestamp, p.value) for p in points] == [
+        (base + 60 + n * 10, float(6 + n)) for n in range(6)
+    ]
+
+    # older than the finest tier keeps, at a coarser resolution.
+    step, points = store.query("used", base, base + 110)
+    assert step == 60
+    assert [(p.timestamp, p.value) for p in points] == [
+        (base, 2.5), (base + 60, 8.5)
+    ]
+    assert store.query("foobar", base, base + 110)[1] == []
+
+
+def test_capacity_persists(tmp_path: Path):
+    path = tmp_path / "capacity.rrd"
+    store = _store(path)
+    store.update(6000.0, {"used": 1.0, "total": 10.0})
+    store.close()
+
+    store = _store(path)
+    assert sorted(store.series) == ["total", "used"]
+    assert store.query("total", 6000.0, 6000.0)[1][0].value == 10.0
+    store.close()
+
+    # laid out for a different number of series; start over.
+    store = _store(path, max_series=8)
+    assert store.series == []
+    store.close()
+
+
+def test_capacity_reclaim(tmp_path: Path):
+    store = _store(tmp_path / "capacity.rrd", max_series=2)
+    store.update(6000.0, {"a": 1.0, "b": 2.0})
+    # no room, and 'a' and 'b' are too recent to be reclaimed.
+    store.update(6010.0, {"b": 2.0, "c": 3.0})
+    assert sorted(store.series) == ["a", "b"]
+
+    # 'a' has not been updated for as long as we keep anything.
+    store.update(6600.0, {"b": 2.0, "c": 3.0})
+    assert sorted(store.series) == ["b", "c"]
+    assert store.query("c", 6600.0, 6600.0)[1][0].value == 3.0
+    assert store.query("c", 6000.0, 6010.0)[1] == []
+    store.close()
+
+
+def test_capacity_dropped(tmp_path: Path):
+    store = _store(tmp_path / "capacity.rrd", max_series=1)
+    store.update(6000.0, {"a": 1.0, "b": 2.0})
+    store.update(6010.0, {"a": 1.0, "b": 2.0})
+    assert store.series == ["a"]
+    assert store.dropped == ["b"]
+
+    # 'b' finds room once 'a' can be reclaimed.
+    store.update(6610.0, {"b": 2.0})
+    assert store.series == ["b"]
+    assert store.dropped == []
+    store.close()
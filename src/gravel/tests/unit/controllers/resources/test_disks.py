@@ -0,0 +1,71 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+from pathlib import Path
+
+import pytest
+
+
+def _write_stat(sysfs: Path, name: str, fields: str) -> None:
+    devdir = sysfs / "block" / name
+    devdir.mkdir(parents=True, exist_ok=True)
+    (devdir / "stat").write_text(fields + "\n")
+
+
+def test_compute_disk_stats(gstate):
+    from gravel.controllers.resources.disks import (
+        DiskCounters,
+        compute_disk_stats
+    )
+
+    prev = DiskCounters(100, 800, 50, 10, 80, 30, 400)
+    cur = DiskCounters(300, 2400, 250, 110, 880, 130, 1400)
+    stats = compute_disk_stats(prev, cur, 2.0)
+    assert stats is not None
+    assert stats.read_iops == 100.0
+    assert stats.write_iops == 50.0
+    assert stats.read_bps == 1600 * 512 / 2.0
+    assert stats.write_bps == 800 * 512 / 2.0
+    assert stats.await_ms == pytest.approx(300 / 300)
+    assert stats.utilization == 50.0
+
+    # counters reset
+    assert compute_disk_stats(cur, prev, 2.0) is None
+
+
+def test_sample(gstate, tmp_path, mocker):
+    from gravel.controllers.resources.disks import DiskStats
+
+    now = 100.0
+    mocker.patch("time.monotonic", side_effect=lambda: now)
+
+    _write_stat(tmp_path, "sda", "10 0 80 5 0 0 0 0 0 10 5 0 0 0 0")
+    _write_stat(tmp_path, "loop0", "10 0 80 5 0 0 0 0 0 10 5")
+    _write_stat(tmp_path, "cciss!c0d0", "0 0 0 0 0 0 0 0 0 0 0")
+
+    disks = DiskStats(sysfs=str(tmp_path))
+    disks._history_size = 2
+    disks.sample()
+    assert disks.get_latest() == {}
+
+    for i in range(1, 4):
+        now += 1.0
+        _write_stat(
+            tmp_path, "sda",
+            f"{10 + i * 10} 0 80 5 0 0 0 0 0 {10 + i * 100} 5 0 0 0 0"
+        )
+        disks.sample()
+
+    latest = disks.get_latest()
+    assert set(latest.keys()) == {"/dev/sda", "/dev/cciss/c0d0"}
+    assert latest["/dev/sda"].read_iops == 10.0
+    assert latest["/dev/sda"].utilization == 10.0
+    history = disks.get_history("/dev/sda")
+    assert len(history["/dev/sda"]) == 2
+
+    # gone devices are forgotten
+    (tmp_path / "block" / "sda" / "stat").unlink()
+    (tmp_path / "block" / "sda").rmdir()
+    now += 1.0
+    disks.sample()
+    assert "/dev/sda" not in disks.get_history()
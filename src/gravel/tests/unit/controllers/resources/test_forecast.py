@@ -0,0 +1,88 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import pytest
+
+from gravel.controllers.resources.forecast import (
+    Forecaster,
+    LinearTrend,
+    make_forecast
+)
+
+
+def test_linear_trend():
+    trend = LinearTrend(half_life=3600)
+    assert trend.slope is None
+    trend.add(1e9, 100.0)
+    assert trend.slope is None
+
+    # a straight line, however the samples are weighed.
+    trend.add_many([(1e9 + n * 30, 100.0 + n * 60) for n in range(1, 5000)])
+    assert trend.slope == pytest.approx(2.0)
+
+    # recent growth wins over the past.
+    t = 1e9 + 5000 * 30
+    for n in range(2000):
+        trend.add(t + n * 30, 0.0)
+    assert abs(trend.slope) < 0.01  # type: ignore
+
+    # all at the same time.
+    trend = LinearTrend(half_life=3600)
+    trend.add(10.0, 1.0)
+    trend.add(10.0, 2.0)
+    assert trend.slope is None
+
+
+def test_forecaster():
+    forecaster = Forecaster(half_life=86400)
+    forecaster.seed("pool.1.used", [(0.0, 0.0), (10.0, 100.0)])
+    forecaster.add(20.0, {"pool.1.used": 200.0, "pool.2.used": 5.0})
+    assert forecaster.growth("pool.1.used") == pytest.approx(10.0)
+    assert forecaster.growth("pool.2.used") is None
+
+    forecaster.add(30.0, {"pool.2.used": 5.0})
+    assert forecaster.growth("pool.1.used") is None
+    assert forecaster.growth("pool.2.used") == pytest.approx(0.0)
+
+    forecast = make_forecast(200, 1000, 10.0)
+    assert forecast.time_to_full == 100.0
+    assert make_forecast(200, 1000, 0.0).time_to_full is None
+    assert make_forecast(200, 1000, None).time_to_full is None
+
+
+def test_service_forecast(gstate, mocker):
+    from gravel.controllers.resources.forecast import ForecastModel
+    from gravel.controllers.resources.storage import StorageForecastModel
+    from gravel.controllers.services import (
+        ServiceModel,
+        Services,
+        ServiceTypeEnum
+    )
+
+    mocker.patch.object(Services, "_load")
+    services = Services()
+    services._services = {
+        "foo": ServiceModel(
+            name="foo", reservation=1000, type=ServiceTypeEnum.CEPHFS,
+            pools=[1, 2], replicas=2
+        )
+    }
+    storage = StorageForecastModel(
+        cluster=make_forecast(0, 0, None),
+        pools={
+            1: make_forecast(100, 4000, 1.0),
+            2: make_forecast(300, 3000, 4.0),
+            3: make_forecast(0, 3000, 100.0)
+        }
+    )
+    forecast = services.forecast(storage)["foo"]
+    assert forecast.used == 400
+    assert forecast.available == 3000
+    assert forecast.growth == 5.0
+    assert forecast.time_to_full == 600.0
+    assert forecast.time_to_reservation == 120.0
+
+    storage.pools = {1: ForecastModel(used=100, available=4000)}
+    forecast = services.forecast(storage)["foo"]
+    assert forecast.growth is None
+    assert forecast.time_to_full is None
@@ -0,0 +1,82 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+from pathlib import Path
+
+import pytest
+
+from gravel.cephadm.models import NodeInfoModel
+
+
+MEMINFO = """MemTotal:        8048404 kB
+MemFree:          512000 kB
+MemAvailable:    4096000 kB
+HugePages_Total:       0
+"""
+
+
+def _write_procfs(procfs: Path, user: int, idle: int) -> None:
+    (procfs / "loadavg").write_text("0.50 0.25 0.10 1/123 4567\n")
+    (procfs / "meminfo").write_text(MEMINFO)
+    (procfs / "uptime").write_text("1234.56 4321.00\n")
+    (procfs / "stat").write_text(
+        f"cpu  {user} 0 0 {idle} 0 0 0 0 0 0\n"
+        f"cpu0 {user} 0 0 {idle} 0 0 0 0 0 0\n"
+    )
+
+
+def test_sample(gstate, tmp_path):
+    from gravel.controllers.resources.host import HostMetrics
+
+    _write_procfs(tmp_path, user=100, idle=900)
+    host = HostMetrics(procfs=str(tmp_path))
+    metrics = host.sample()
+    assert metrics.load_one_min == 0.5
+    assert metrics.load_fifteen_min == 0.1
+    assert metrics.memory_total_kb == 8048404
+    assert metrics.memory_available_kb == 4096000
+    assert metrics.uptime == 1234.56
+    assert metrics.cpu_utilization is None  # nothing to compare with yet
+
+    _write_procfs(tmp_path, user=175, idle=925)
+    metrics = host.sample()
+    assert metrics.cpu_utilization == pytest.approx(75.0)
+    assert host.latest is metrics
+
+
+def test_merge_into_inventory(gstate, tmp_path, mocker):
+    from gravel.controllers.resources.host import HostMetrics
+    from gravel.controllers.resources.inventory import Inventory
+
+    _write_procfs(tmp_path, user=100, idle=900)
+    host = HostMetrics(procfs=str(tmp_path))
+    mocker.patch(
+        "gravel.controllers.resources.inventory.get_host_metrics",
+        return_value=host
+    )
+
+    inventory = Inventory()
+    nodeinfo = NodeInfoModel.parse_obj({
+        "hostname": "foo", "model": "", "vendor": "", "kernel": "",
+        "operating_system": "", "system_uptime": 1.0, "current_time": 10,
+        "cpu": {
+            "model": "", "cores": 1, "count": 1, "threads": 1,
+            "load": {"one_min": 9, "five_min": 9, "fifteen_min": 9}
+        },
+        "nics": {},
+        "memory": {"available_kb": 1, "free_kb": 1, "total_kb": 1},
+        "disks": []
+    })
+    inventory._latest = nodeinfo
+    assert inventory.latest is nodeinfo
+
+    host.sample()
+    latest = inventory.latest
+    assert latest is not None
+    assert latest.cpu.load.one_min == 0.5
+    assert latest.memory.total_kb == 8048404
+    assert latest.system_uptime == 1234.56
+    assert latest.hostname == "foo"
+    # what we probed is left untouched, and merging is done once per sample
+    assert nodeinfo.cpu.load.one_min == 9
+    assert inventory.latest is latest
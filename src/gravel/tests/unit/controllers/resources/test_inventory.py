@@ -0,0 +1,237 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import asyncio
+import pytest
+from typing import List
+
+from gravel.cephadm.models import (
+    NodeCPUInfoModel,
+    NodeCPULoadModel,
+    NodeInfoModel,
+    NodeMemoryInfoModel,
+    VolumeDeviceModel
+)
+
+
+def _nodeinfo(
+    stale: bool = False,
+    load: float = 0.0,
+    disks: List[VolumeDeviceModel] = []
+) -> NodeInfoModel:
+    return NodeInfoModel.construct(
+        hostname="foo",
+        system_uptime=1.0,
+        current_time=0,
+        cpu=NodeCPUInfoModel.construct(
+            load=NodeCPULoadModel(one_min=load, five_min=0, fifteen_min=0)
+        ),
+        memory=NodeMemoryInfoModel(available_kb=1, free_kb=2, total_kb=3),
+        nics={},
+        disks=disks,
+        disks_stale=stale
+    )
+
+
+@pytest.fixture(autouse=True)
+def inventory_options(gstate):
+    options = gstate.config.options.inventory
+    options.history_size = 4
+    options.subscriber_timeout = 30.0
+    options.max_age = 10.0
+    yield options
+
+
+@pytest.mark.asyncio
+async def test_coalesced_probes(gstate, mocker):
+    from gravel.controllers.resources.inventory import Inventory
+
+    calls: List[int] = []
+
+    async def mock_node_info() -> NodeInfoModel:
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return _nodeinfo()
+
+    cephadm = mocker.patch("gravel.controllers.resources.inventory.Cephadm")
+    cephadm.return_value.get_node_info.side_effect = mock_node_info
+
+    inventory = Inventory()
+    inventory._cache.ttl = 10.0
+
+    results = await asyncio.gather(
+        *[inventory.get_node_info() for _ in range(5)],
+        inventory.probe()
+    )
+    assert len(calls) == 1
+    assert all(r is inventory.latest for r in results[:5])
+
+    # fresh enough, served from what the last probe found
+    await inventory.get_node_info()
+    assert await inventory.get_volumes() == []
+    assert len(calls) == 1
+    cephadm.return_value.get_volume_inventory.assert_not_called()
+
+    # too old, probe again
+    inventory._cache.ttl = 0
+    await inventory.get_node_info()
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_disks(gstate, mocker):
+    from gravel.controllers.resources.inventory import Inventory
+
+    async def mock_node_info() -> NodeInfoModel:
+        return _nodeinfo(stale=True)
+
+    async def mock_volumes() -> List[str]:
+        return ["bar"]
+
+    cephadm = mocker.patch("gravel.controllers.resources.inventory.Cephadm")
+    cephadm.return_value.get_node_info.side_effect = mock_node_info
+    cephadm.return_value.get_volume_inventory.side_effect = mock_volumes
+
+    inventory = Inventory()
+    inventory._cache.ttl = 10.0
+    await inventory.probe()
+
+    # disks from the last probe are not to be trusted; get them anew, once.
+    assert await inventory.get_volumes() == ["bar"]
+    assert await inventory.get_volumes() == ["bar"]
+    assert cephadm.return_value.get_volume_inventory.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_subscribers(gstate, mocker):
+    from gravel.controllers.resources.inventory import Inventory
+
+    async def mock_node_info() -> NodeInfoModel:
+        return _nodeinfo()
+
+    cephadm = mocker.patch("gravel.controllers.resources.inventory.Cephadm")
+    cephadm.return_value.get_node_info.side_effect = mock_node_info
+
+    inventory = Inventory()
+    inventory._subscriber_timeout = 0.1
+    calls: List[str] = []
+
+    async def _slow(nodeinfo: NodeInfoModel) -> None:
+        calls.append("slow")
+        await asyncio.sleep(1)
+        calls.append("slow done")
+
+    async def _failing(nodeinfo: NodeInfoModel) -> None:
+        calls.append("failing")
+        raise Exception("oops")
+
+    def _subscriber(name: str):
+        async def _cb(nodeinfo: NodeInfoModel) -> None:
+            calls.append(name)
+        return _cb
+
+    inventory.subscribe(_slow, once=False)
+    inventory.subscribe(_subscriber("first"), once=True)
+    inventory.subscribe(_failing, once=True)
+    inventory.subscribe(_subscriber("second"), once=True)
+    sub = inventory.subscribe(_subscriber("always"), once=False)
+
+    # neither a slow, nor a failing, subscriber hold back the others, and
+    # one-shot subscribers are all called, once.
+    await inventory.probe()
+    await asyncio.wait_for(
+        asyncio.gather(*inventory._notifying), timeout=0.5
+    )
+    assert sorted(calls) == ["always", "failing", "first", "second", "slow"]
+
+    calls.clear()
+    inventory.unsubscribe(sub)
+    await inventory.probe()
+    await asyncio.gather(*inventory._notifying)
+    assert calls == ["slow"]
+
+    # the same callback, subscribed twice; only the one asked for goes.
+    twice = _subscriber("twice")
+    first = inventory.subscribe(twice, once=False)
+    second = inventory.subscribe(twice, once=False)
+    inventory.unsubscribe(second)
+    assert any(s is first for s in inventory._subscribers)
+    assert not any(s is second for s in inventory._subscribers)
+
+
+@pytest.mark.asyncio
+async def test_updates(gstate, mocker):
+    from gravel.controllers.resources.inventory import Inventory
+
+    probed: List[NodeInfoModel] = []
+
+    async def mock_node_info() -> NodeInfoModel:
+        probed.append(_nodeinfo())
+        return probed[-1]
+
+    cephadm = mocker.patch("gravel.controllers.resources.inventory.Cephadm")
+    cephadm.return_value.get_node_info.side_effect = mock_node_info
+
+    inventory = Inventory()
+    with inventory.updates(maxsize=2) as updates:
+        for _ in range(3):
+            await inventory.probe()
+        # fell behind; the oldest update was dropped.
+        assert updates.dropped == 1
+        assert await updates.__anext__() is probed[1]
+        assert await updates.__anext__() is probed[2]
+
+    assert not inventory._updates
+    assert [n async for n in updates] == []
+
+
+@pytest.mark.asyncio
+async def test_history(gstate, mocker):
+    from gravel.controllers.resources.inventory import Inventory
+
+    def _disk(path: str, available: bool) -> VolumeDeviceModel:
+        return VolumeDeviceModel.construct(path=path, available=available)
+
+    probes = [
+        _nodeinfo(load=1.0, disks=[_disk("/dev/sda", True)]),
+        _nodeinfo(load=2.0, disks=[_disk("/dev/sda", False)]),
+        _nodeinfo(load=3.0, disks=[_disk("/dev/sdb", True)]),
+        _nodeinfo(load=4.0, stale=True),
+        _nodeinfo(load=5.0, disks=[_disk("/dev/sdb", True)]),
+    ]
+    pending = iter(probes)
+
+    async def mock_node_info() -> NodeInfoModel:
+        return next(pending)
+
+    cephadm = mocker.patch("gravel.controllers.resources.inventory.Cephadm")
+    cephadm.return_value.get_node_info.side_effect = mock_node_info
+    mocker.patch(
+        "gravel.controllers.resources.inventory.get_host_metrics"
+    ).return_value.latest = None
+    clock = mocker.patch("gravel.controllers.resources.inventory.time")
+    clock.monotonic.return_value = 0
+
+    inventory = Inventory()
+    for stamp in range(len(probes)):
+        clock.time.return_value = 100.0 + stamp
+        await inventory.probe()
+
+    # only 4 kept; '/dev/sda' went away with the oldest.
+    history = inventory.get_history()
+    assert [p.timestamp for p in history] == [101.0, 102.0, 103.0, 104.0]
+    assert [p.load_one_min for p in history] == [2.0, 3.0, 4.0, 5.0]
+    assert history[0].disks_available == {"/dev/sda": 0.0}
+    assert history[2].disks_available == {}
+    assert history[3].memory_free_kb == 2
+    assert inventory._history.columns.count("disk:/dev/sda") == 1
+
+    history = inventory.get_history(start=102.0, end=103.0)
+    assert [p.timestamp for p in history] == [102.0, 103.0]
+
+    # averaged down; the first bucket holds 101 and 102.
+    history = inventory.get_history(points=2)
+    assert [p.timestamp for p in history] == [102.0, 104.0]
+    assert history[0].load_one_min == 2.5
+    assert history[0].disks_available == {"/dev/sda": 0.0, "/dev/sdb": 1.0}
+    assert history[1].load_one_min == 4.5
@@ -0,0 +1,69 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+from pathlib import Path
+from typing import Optional
+
+
+def _write_nic(
+    sysfs: Path,
+    name: str,
+    rx_bytes: int,
+    speed: Optional[str] = "1000",
+    rx_errors: int = 1
+) -> None:
+    nicdir = sysfs / "class" / "net" / name
+    statsdir = nicdir / "statistics"
+    statsdir.mkdir(parents=True, exist_ok=True)
+    counters = {
+        "rx_bytes": rx_bytes, "tx_bytes": rx_bytes // 2,
+        "rx_packets": rx_bytes // 1000, "tx_packets": 0,
+        "rx_dropped": 0, "tx_dropped": 0,
+        "rx_errors": rx_errors, "tx_errors": 0
+    }
+    for counter, value in counters.items():
+        (statsdir / counter).write_text(f"{value}\n")
+    if speed is not None:
+        (nicdir / "speed").write_text(f"{speed}\n")
+
+
+def test_sample(gstate, tmp_path, mocker):
+    from gravel.controllers.resources.network import NetworkStats
+
+    now = 100.0
+    mocker.patch("time.monotonic", side_effect=lambda: now)
+
+    _write_nic(tmp_path, "eth0", 0)
+    _write_nic(tmp_path, "eth1", 0, speed="-1")
+    _write_nic(tmp_path, "lo", 0)
+
+    network = NetworkStats(sysfs=str(tmp_path))
+    network._history_size = 10
+    network.sample()
+    assert network.get_latest() == {}
+
+    now += 2.0
+    _write_nic(tmp_path, "eth0", 125_000_000, rx_errors=9)
+    _write_nic(tmp_path, "eth1", 2000, speed="-1")
+    network.sample()
+
+    latest = network.get_latest()
+    assert set(latest.keys()) == {"eth0", "eth1"}
+    eth0 = latest["eth0"]
+    assert eth0.rx_bps == 62_500_000
+    assert eth0.tx_bps == 31_250_000
+    assert eth0.rx_pps == 62_500
+    assert eth0.rx_utilization == 50.0
+    assert eth0.tx_utilization == 25.0
+    # as rates, comparable whatever the interval.
+    assert eth0.rx_errors_ps == 4.0
+    assert eth0.tx_errors_ps == 0.0
+    # link speed not known
+    assert latest["eth1"].speed is None
+    assert latest["eth1"].rx_utilization is None
+
+    # counters reset, e.g. interface recreated
+    now += 2.0
+    _write_nic(tmp_path, "eth0", 0)
+    network.sample()
+    assert len(network.get_history("eth0")["eth0"]) == 1
@@ -0,0 +1,157 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import pytest
+from pathlib import Path
+from typing import Any, Dict, List
+
+from gravel.controllers.config import CapacityTierOptionsModel
+from gravel.controllers.orch.models import CephDFModel
+
+
+def _df(pools: Dict[int, Any], used: int = 10) -> CephDFModel:
+    return CephDFModel.parse_obj({
+        "stats": {
+            "total_bytes": 1000,
+            "total_avail_bytes": 1000 - used,
+            "total_used_bytes": used,
+            "total_used_raw_bytes": used,
+            "total_used_raw_ratio": used / 1000,
+            "num_osds": 1,
+            "num_per_pool_osds": 1,
+            "num_per_pool_omap_osds": 1
+        },
+        "stats_by_class": {},
+        "pools": [{
+            "id": pool_id,
+            "name": name,
+            "stats": {
+                "stored": used, "objects": 1, "kb_used": 1,
+                "bytes_used": used, "percent_used": 0.1, "max_avail": 500
+            }
+        } for pool_id, (name, used) in pools.items()]
+    })
+
+
+async def _async(value: Any) -> Any:
+    return value
+
+
+@pytest.mark.asyncio
+async def test_incremental_update(gstate, mocker):
+    from gravel.controllers.resources.storage import (
+        Storage,
+        StoragePoolEventEnum,
+        StoragePoolEventModel
+    )
+
+    dfs: List[CephDFModel] = []
+
+    async def mock_df() -> CephDFModel:
+        return dfs.pop(0)
+
+    mon = mocker.patch("gravel.controllers.resources.storage.Mon")
+    mon.return_value.df_async.side_effect = mock_df
+    mocker.patch.object(Storage, "_record")
+
+    storage = Storage()
+    seen: List[StoragePoolEventModel] = []
+    storage.subscribe(seen.append)
+
+    dfs.append(_df({1: ("foo", 1), 2: ("bar", 2)}))
+    await storage._update()
+    assert storage.revision == 1
+    assert [(e.type, e.pool_id) for e in seen] == [
+        (StoragePoolEventEnum.ADDED, 1), (StoragePoolEventEnum.ADDED, 2)
+    ]
+    state = await storage.usage()
+    foo, bar = state.pools_by_id[1], state.pools_by_id[2]
+    stats = state.stats
+
+    # nothing changed; nothing touched.
+    dfs.append(_df({1: ("foo", 1), 2: ("bar", 2)}))
+    await storage._update()
+    assert storage.revision == 1
+    assert len(seen) == 2
+    assert await storage.usage() is state
+    assert state.pools_by_id[1] is foo and state.pools_by_id[2] is bar
+
+    # 'bar' grows and is renamed, 'foo' goes away and 'baz' shows up.
+    dfs.append(_df({2: ("qux", 3), 3: ("baz", 0)}, used=20))
+    await storage._update()
+    assert storage.revision == 2
+    # the previous state is left as it was.
+    assert state.revision == 1 and state.stats is stats
+    assert sorted(state.pools_by_name.keys()) == ["bar", "foo"]
+    state = await storage.usage()
+    assert state.stats is not stats and state.stats.used == 20
+    assert sorted(state.pools_by_name.keys()) == ["baz", "qux"]
+    assert sorted(state.pools_by_id.keys()) == [2, 3]
+    assert state.pools_by_id[2].stats.used == 3
+    assert sorted((e.type, e.pool_id) for e in storage.events(since=1)) == [
+        (StoragePoolEventEnum.ADDED, 3),
+        (StoragePoolEventEnum.CHANGED, 2),
+        (StoragePoolEventEnum.REMOVED, 1)
+    ]
+    assert storage.events(since=2) == []
+
+    # only the cluster's stats changed.
+    dfs.append(_df({2: ("qux", 3), 3: ("baz", 0)}, used=30))
+    await storage._update()
+    assert storage.revision == 3
+    assert storage.events(since=2) == []
+
+    # 'qux' and 'baz' swap names, and a new pool takes one of them.
+    dfs.append(_df({2: ("baz", 3), 3: ("qux", 0)}, used=30))
+    await storage._update()
+    state = await storage.usage()
+    assert storage.revision == 4
+    assert {n: p.id for n, p in state.pools_by_name.items()} == \
+        {"baz": 2, "qux": 3}
+
+    dfs.append(_df({2: ("foo", 3), 3: ("qux", 0), 4: ("baz", 0)}, used=30))
+    await storage._update()
+    state = await storage.usage()
+    assert {n: p.id for n, p in state.pools_by_name.items()} == \
+        {"foo": 2, "qux": 3, "baz": 4}
+    dfs.append(_df({2: ("quux", 3), 3: ("foo", 0), 4: ("baz", 0)}, used=30))
+    await storage._update()
+    state = await storage.usage()
+    assert {n: p.id for n, p in state.pools_by_name.items()} == \
+        {"quux": 2, "foo": 3, "baz": 4}
+
+
+@pytest.mark.asyncio
+async def test_capacity_flush(gstate, mocker, tmp_path: Path):
+    from gravel.controllers.resources.capacity import CapacityStore
+    from gravel.controllers.resources.storage import Storage
+
+    gstate.config.confdir = tmp_path
+    options = gstate.config.options.storage
+    options.capacity_tiers = [CapacityTierOptionsModel(step=10, rows=6)]
+    options.capacity_max_series = 8
+    options.capacity_flush_interval = 300.0
+    options.forecast_half_life = 3600.0
+    mon = mocker.patch("gravel.controllers.resources.storage.Mon")
+    mon.return_value.df_async.side_effect = \
+        lambda: _async(_df({1: ("foo", 1)}))
+    flush = mocker.spy(CapacityStore, "flush")
+    close = mocker.spy(CapacityStore, "close")
+
+    storage = Storage()
+    await storage._update()
+    await storage._update()
+    assert flush.call_count == 0
+    # flushed once it's been a while.
+    storage._flushed -= 300.0
+    await storage._update()
+    assert flush.call_count == 1
+    await storage._update()
+    assert flush.call_count == 1
+
+    storage.shutdown()
+    assert close.call_count == 1
+    assert (tmp_path / "capacity.rrd").exists()
+    gstate.is_shutting_down = True
+    await storage._update()
+    assert close.call_count == 1 and storage._capacity is None
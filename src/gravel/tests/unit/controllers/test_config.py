@@ -1,6 +1,13 @@
+import pytest
 from pathlib import Path
 
-from gravel.controllers.config import Config
+from pydantic import ValidationError
+
+from gravel.controllers.config import (
+    Config,
+    NetworkOptionsModel,
+    StorageOptionsModel
+)
 
 
 def test_config_version(fs):
@@ -11,7 +18,33 @@ def test_config_version(fs):
 def test_config_options(fs):
     opts = Config().options
     assert opts.inventory.probe_interval == 60
+    assert opts.inventory.min_probe_interval == 15.0
+    assert opts.inventory.max_probe_interval == 300.0
+    assert opts.inventory.max_age == 10.0
+    assert opts.inventory.subscriber_timeout == 30.0
+    assert opts.inventory.history_size == 1440
+    assert opts.host.probe_interval == 2.0
+    assert opts.disks.probe_interval == 5.0
+    assert opts.disks.history_size == 120
+    assert opts.network.probe_interval == 5.0
+    assert opts.network.history_size == 120
     assert opts.storage.probe_interval == 30.0
+    assert opts.storage.min_probe_interval == 10.0
+    assert opts.storage.max_probe_interval == 120.0
+    assert [(t.step, t.rows) for t in opts.storage.capacity_tiers] == \
+        [(30, 2880), (300, 8640), (3600, 8760)]
+    assert opts.storage.capacity_max_series == 128
+    assert opts.storage.forecast_half_life == 7 * 86400
+    assert opts.ceph.cache_ttl == 5.0
+    assert opts.ceph.trusted_models is False
+    assert opts.ceph.connect_timeout == 10.0
+    assert opts.cephadm.max_concurrent == 2
+    assert opts.jobs.max_threads == 4
+    assert opts.jobs.max_processes == 2
+    assert opts.jobs.retention == 100
+    assert not opts.parse.offload
+    assert opts.parse.offload_min_bytes == 256 * 1024
+    assert opts.parse.offload_min_items == 64
 
 
 def test_config_path(fs):
@@ -30,3 +63,10 @@ def test_config_path(fs):
     config._saveConfig(config.config)
     config = Config(path='bar')
     assert config.options.service_state_path == Path('baz')
+
+
+def test_config_options_positive():
+    with pytest.raises(ValidationError):
+        NetworkOptionsModel(history_size=0)
+    with pytest.raises(ValidationError):
+        StorageOptionsModel(min_probe_interval=-1.0)
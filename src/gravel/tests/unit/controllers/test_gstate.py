@@ -18,6 +18,7 @@ async def test_tickers(gstate):
         def __init__(self, name):
             super().__init__(name, 1.0)
             self.has_ticked = False
+            self.is_shut_down = False
 
         async def _do_tick(self) -> None:
             self.has_ticked = True
@@ -25,6 +26,9 @@ async def test_tickers(gstate):
         async def _should_tick(self) -> bool:
             return not self.has_ticked
 
+        def shutdown(self) -> None:
+            self.is_shut_down = True
+
     ticker = TestTicker("test")
     assert "test" in gstate.tickers
 
@@ -41,3 +45,160 @@ async def test_tickers(gstate):
     await asyncio.sleep(1)  # let ticker tick
     await gstate.shutdown()
     assert ticker.has_ticked is True
+    assert ticker.is_shut_down is True
+
+
+@pytest.mark.asyncio
+async def test_ticker_failure(gstate):
+    from gravel.controllers.gstate import Ticker
+
+    class FailingTicker(Ticker):
+        def __init__(self, name):
+            super().__init__(name, 10.0)
+            self.ticks = 0
+
+        async def _do_tick(self) -> None:
+            self.ticks += 1
+            raise Exception("foo")
+
+        async def _should_tick(self) -> bool:
+            return True
+
+    ticker = FailingTicker("failing")
+    await ticker.tick()
+    await ticker.tick()
+    assert ticker.ticks == 2
+    assert not ticker.is_ticking
+
+    stats = gstate.get_ticker_stats()["failing"]
+    assert stats.ticks == 2
+    assert stats.failures == 2
+    assert stats.consecutive_failures == 2
+    assert stats.since_success is None
+    assert stats.last_duration is not None
+
+    # back off, with jitter, up to a limit
+    assert 36.0 <= ticker.next_interval() <= 44.0
+    ticker._failures = 100
+    assert ticker.next_interval() <= 300.0 * 1.1
+    gstate.rm_ticker("failing")
+
+
+async def _ticked(ticker) -> None:
+    """ Wait for a tick the scheduler started; it's rescheduled by then. """
+    await asyncio.wait_for(ticker.ticked.wait(), 5.0)
+    ticker.ticked.clear()
+
+
+@pytest.mark.asyncio
+async def test_ticker_deadlines(gstate, mocker):
+    from gravel.controllers.gstate import Ticker
+
+    class CountingTicker(Ticker):
+        def __init__(self, name):
+            super().__init__(name, 60.0)
+            self.ticks = 0
+            self.ticked = asyncio.Event()
+
+        async def _do_tick(self) -> None:
+            self.ticks += 1
+            self.ticked.set()
+
+        async def _should_tick(self) -> bool:
+            return True
+
+    clock = mocker.patch(
+        "gravel.controllers.gstate.time.monotonic", return_value=1000.0
+    )
+    ticker = CountingTicker("counting")
+    await gstate._do_ticks()
+    await _ticked(ticker)
+    assert ticker.ticks == 1  # first tick right away
+
+    # next one due in a minute, give or take the jitter.
+    assert 1054.0 <= gstate._deadlines["counting"] <= 1066.0
+    clock.return_value = 1050.0
+    await gstate._do_ticks()
+    assert "counting" in gstate._deadlines
+    assert ticker.ticks == 1
+
+    ticker.trigger()
+    await gstate._do_ticks()
+    await _ticked(ticker)
+    assert ticker.ticks == 2
+
+    stats = ticker.get_stats()
+    assert stats.ticks == 2
+    assert stats.failures == 0
+    assert stats.since_success is not None
+    assert stats.last_lag is not None and stats.last_lag >= 0
+
+    clock.return_value = 1200.0
+    await gstate._do_ticks()
+    await _ticked(ticker)
+    assert ticker.ticks == 3
+    lag = ticker.get_stats().last_lag
+    assert lag is not None and lag > 0
+    gstate.rm_ticker("counting")
+
+
+def test_ticker_percentiles(gstate):
+    from gravel.controllers.gstate import _percentile
+
+    values = [float(v) for v in range(1, 101)]
+    assert _percentile([], 0.5) is None
+    assert _percentile(values, 0.5) == 50.0
+    assert _percentile(values, 0.9) == 90.0
+    assert _percentile(values, 0.99) == 99.0
+    assert _percentile([3.0], 0.99) == 3.0
+
+
+@pytest.mark.asyncio
+async def test_ticker_adaptive(gstate, mocker):
+    from gravel.controllers.gstate import Ticker
+
+    class AdaptiveTicker(Ticker):
+        def __init__(self, name):
+            super().__init__(name, 60.0, 10.0, 300.0)
+            self.ticks = 0
+            self.ticked = asyncio.Event()
+
+        async def _do_tick(self) -> None:
+            self.ticks += 1
+            self.ticked.set()
+
+        async def _should_tick(self) -> bool:
+            return True
+
+    clock = mocker.patch(
+        "gravel.controllers.gstate.time.monotonic", return_value=1000.0
+    )
+    ticker = AdaptiveTicker("adaptive")
+    assert ticker.interval == 60.0
+
+    # results keep changing; down to the shortest interval, and no further.
+    for _ in range(5):
+        ticker.record_change(True)
+    assert ticker.interval == 10.0
+
+    # nothing changing; up to the longest.
+    for _ in range(20):
+        ticker.record_change(False)
+    assert ticker.interval == 300.0
+
+    await gstate._do_ticks()
+    await _ticked(ticker)
+    assert ticker.ticks == 1
+
+    # cluster events have us tick right away, and often for a while.
+    gstate.fast_probe("adaptive", duration=60.0)
+    assert ticker.interval == 10.0
+    assert ticker.get_stats().fast_remaining == 60.0
+    await gstate._do_ticks()
+    await _ticked(ticker)
+    assert ticker.ticks == 2
+    assert gstate._deadlines["adaptive"] <= 1000.0 + 10.0 * 1.1
+
+    clock.return_value = 1060.0
+    assert ticker.interval == 300.0
+    gstate.rm_ticker("adaptive")
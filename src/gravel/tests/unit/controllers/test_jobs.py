@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+import pytest
+
+from gravel.controllers.config import JobsOptionsModel
+from gravel.controllers.jobs import (
+    Job,
+    JobMgr,
+    JobNotFoundError,
+    JobStateEnum
+)
+
+
+@pytest.mark.asyncio
+async def test_job_result(job_mgr: JobMgr) -> None:
+
+    async def _work(job: Job) -> int:
+        job.set_progress(0.5, "halfway")
+        assert job.model.state == JobStateEnum.RUNNING
+        return 42
+
+    job = job_mgr.submit("work", _work)
+    assert job_mgr.get(job.id) is job
+    assert await job.wait() == 42
+    assert job.model.state == JobStateEnum.DONE
+    assert job.model.progress == 1.0
+    assert job.model.progress_msg == "halfway"
+    assert job.model.result == 42
+    assert job.model.started is not None
+    assert job.model.finished is not None
+    assert [j.id for j in job_mgr.ls()] == [job.id]
+
+    with pytest.raises(JobNotFoundError):
+        job_mgr.get("foobar")
+
+
+@pytest.mark.asyncio
+async def test_job_failure(job_mgr: JobMgr) -> None:
+
+    async def _fail(job: Job) -> None:
+        raise Exception("oops")
+
+    job = job_mgr.submit("fail", _fail)
+    with pytest.raises(Exception, match="oops"):
+        await job.wait()
+    assert job.model.state == JobStateEnum.FAILED
+    assert job.model.error == "oops"
+    assert not job_mgr.cancel(job.id)
+
+
+@pytest.mark.asyncio
+async def test_job_cancel(job_mgr: JobMgr) -> None:
+
+    async def _forever(job: Job) -> None:
+        await asyncio.sleep(3600)
+
+    job = job_mgr.submit("forever", _forever)
+    await asyncio.sleep(0)
+    assert job_mgr.cancel(job.id)
+    with pytest.raises(asyncio.CancelledError):
+        await job.wait()
+    assert job.model.state == JobStateEnum.CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_job_thread(job_mgr: JobMgr) -> None:
+
+    job_mgr.configure(JobsOptionsModel(max_threads=1))
+    release = threading.Event()
+
+    def _blocked() -> str:
+        release.wait(5)
+        return "done"
+
+    first = job_mgr.submit_thread("first", _blocked)
+    second = job_mgr.submit_thread("second", lambda: "second")
+    await asyncio.sleep(0.1)
+    assert first.model.state == JobStateEnum.RUNNING
+    assert second.model.state == JobStateEnum.QUEUED
+
+    # only one thread; the second job hasn't started and can be cancelled,
+    # unlike the first.
+    assert job_mgr.cancel(second.id)
+    assert not job_mgr.cancel(first.id)
+    release.set()
+    assert await first.wait() == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await second.wait()
+    assert second.model.state == JobStateEnum.CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_job_retention(job_mgr: JobMgr) -> None:
+
+    job_mgr.configure(JobsOptionsModel(retention=2))
+
+    async def _work(job: Job) -> None:
+        pass
+
+    jobs = [job_mgr.submit(f"job {n}", _work) for n in range(4)]
+    for job in jobs:
+        await job.wait()
+    await asyncio.sleep(0)
+    assert [j.id for j in job_mgr.ls()] == [j.id for j in jobs[2:]]
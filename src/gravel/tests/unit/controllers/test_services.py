@@ -0,0 +1,77 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+
+import asyncio
+import pytest
+from pathlib import Path
+
+
+@pytest.mark.asyncio
+async def test_create_concurrently(gstate, job_mgr, mocker, tmp_path: Path):
+    from gravel.controllers.services import (
+        NotEnoughSpaceError,
+        ServiceExistsError,
+        ServiceModel,
+        Services,
+        ServiceTypeEnum,
+        _creating
+    )
+
+    path = tmp_path / "services.json"
+    gstate.config.options.service_state_path = str(path)
+    mocker.patch(
+        "gravel.controllers.services.get_storage",
+        return_value=mocker.MagicMock(total=3000)
+    )
+
+    async def _create_service(self, svc: ServiceModel) -> None:
+        await asyncio.sleep(0.01)
+        svc.pools.append(len(svc.name))
+
+    mocker.patch.object(Services, "_create_service", _create_service)
+    cephfs = ServiceTypeEnum.CEPHFS
+
+    # each saves what the other created, too.
+    await asyncio.gather(
+        Services().create("foo", cephfs, 500, 2),
+        Services().create("barbaz", cephfs, 500, 2)
+    )
+    assert sorted(s.name for s in Services().ls()) == ["barbaz", "foo"]
+
+    # both got past the checks, but there's room left for one only.
+    first, second = Services(), Services()
+    first.check_create("qux", cephfs, 400, 2, reserve=True)
+    second.check_create("quux", cephfs, 400, 2, reserve=True)
+    res = await asyncio.gather(
+        first.create("qux", cephfs, 400, 2, reserved=True),
+        second.create("quux", cephfs, 400, 2, reserved=True),
+        return_exceptions=True
+    )
+    assert isinstance(res[0], ServiceModel)
+    assert isinstance(res[1], NotEnoughSpaceError)
+    Services.release("qux")
+    Services.release("quux")
+
+    # a name being created can't be taken.
+    task = asyncio.ensure_future(Services().create("a", cephfs, 1, 1))
+    await asyncio.sleep(0)
+    assert "a" in _creating
+    with pytest.raises(ServiceExistsError):
+        Services().check_create("a", cephfs, 1, 1)
+    await task
+    assert not _creating
+    with pytest.raises(ServiceExistsError):
+        Services().check_create("a", cephfs, 1, 1)
+
+    # released, even if the job never got to run.
+    Services().check_create("b", cephfs, 1, 1, reserve=True)
+    job = job_mgr.submit(
+        "create b",
+        lambda _: Services().create("b", cephfs, 1, 1, reserved=True)
+    )
+    job.add_done_callback(lambda _: Services.release("b"))
+    assert job_mgr.cancel(job.id)
+    with pytest.raises(asyncio.CancelledError):
+        await job.wait()
+    assert not _creating
+    assert "b" not in Services()
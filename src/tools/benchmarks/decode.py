@@ -0,0 +1,95 @@
+# project aquarium's backend
+# Copyright (C) 2021 SUSE, LLC.
+#
+# Compares decoding and model building of recorded cluster replies, as done
+# by 'Ceph._cmd()' and 'Mon', with and without the fast paths.
+#
+#   $ cd src && python -m tools.benchmarks.decode [--pools N] [--rounds N]
+
+import argparse
+import json
+import os
+import timeit
+from typing import Any, Callable, Dict, List, Type
+
+from pydantic import BaseModel
+
+from gravel.controllers.orch.decode import (
+    JSON_BACKEND,
+    construct_model,
+    json_loads
+)
+from gravel.controllers.orch.models import CephDFModel, CephOSDMapModel
+
+
+DATA_DIR = os.path.join(
+    os.path.dirname(__file__),
+    "../../gravel/tests/unit/controllers/orch/data"
+)
+
+
+def _with_pools(fn: str, num: int) -> bytes:
+    """ Recorded reply, grown with 'num' pools to resemble a busy cluster. """
+    with open(os.path.join(DATA_DIR, fn), "rb") as fd:
+        raw: Dict[str, Any] = json.loads(fd.read())
+
+    pools: List[Dict[str, Any]] = []
+    for i in range(num):
+        if fn == "mon_df_raw.json":
+            pools.append({
+                "name": f"pool-{i}", "id": i,
+                "stats": {
+                    "stored": 1 << 30, "objects": 1024, "kb_used": 1 << 20,
+                    "bytes_used": 1 << 30, "percent_used": 0.1,
+                    "max_avail": 1 << 40
+                }
+            })
+        else:
+            pools.append({
+                "pool": i, "pool_name": f"pool-{i}", "size": 3,
+                "min_size": 2, "crush_rule": 0, "pg_num": 32,
+                "application_metadata": {"cephfs": {"data": "foo"}},
+                "options": {}, "flags_names": "hashpspool"
+            })
+    raw["pools"] = pools
+    return json.dumps(raw).encode("utf-8")
+
+
+def _bench(what: str, rounds: int, func: Callable[[], Any]) -> float:
+    best = min(timeit.repeat(func, number=rounds, repeat=5)) / rounds
+    print(f"  {what:<28} {best * 1e6:10.1f} us")
+    return best
+
+
+def bench(fn: str, model: Type[BaseModel], pools: int, rounds: int) -> None:
+    data = _with_pools(fn, pools)
+    decoded = json.loads(data)
+    print(f"{fn} ({len(data)} bytes, {pools} pools)")
+
+    json_time = _bench("decode: json", rounds, lambda: json.loads(data))
+    fast_time = _bench(
+        f"decode: {JSON_BACKEND}", rounds, lambda: json_loads(data)
+    )
+    parse_time = _bench(
+        "model: parse_obj", rounds, lambda: model.parse_obj(decoded)
+    )
+    construct_time = _bench(
+        "model: construct_model", rounds,
+        lambda: construct_model(model, decoded)
+    )
+    print(f"  decode speedup:       {json_time / fast_time:6.1f}x")
+    print(f"  model speedup:        {parse_time / construct_time:6.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pools", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    bench("mon_df_raw.json", CephDFModel, args.pools, args.rounds)
+    bench("mon_osdmap_raw.json", CephOSDMapModel, args.pools, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
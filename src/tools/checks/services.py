@@ -9,7 +9,7 @@ from gravel.controllers.resources import storage
 async def main():
     await storage.tick()
     services = Services()
-    services.create("test-svc", ServiceTypeEnum.CEPHFS, 1000, 2)
+    await services.create("test-svc", ServiceTypeEnum.CEPHFS, 1000, 2)
 
 
 if __name__ == "__main__":
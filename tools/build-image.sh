@@ -175,6 +175,7 @@ bundle() {
   popd
 
   cp ${rootdir}/systemd/aquarium.service ${bundle_unit} || exit 1
+  cp ${rootdir}/systemd/aquarium-cephadm-helper.service ${bundle_unit} || exit 1
 
   pushd ${build}
   tar -C ${bundledir} usr -cf aquarium.tar || exit 1